@@ -0,0 +1,110 @@
+"""
+Size of the document sent to the browser, and the time taken to encode and decode
+it, with the numeric columns sent as JSON numbers or as binary arrays (see the
+binary_columns preference)
+
+The transcripts are placed 100Mb into a chromosome, so that positions have as
+many digits as in most of the genome. Run directly, this prints the document
+size and times for both encodings. If node is installed, the time taken to parse
+the document in javascript, including decoding the binary arrays, is also shown,
+as an estimate of the time taken by the browser:
+
+    python -m benchmarks.bench_document
+
+Written as an asv suite, but can also be run directly.
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import timeit
+
+from gene_viz import GenePlot
+
+from .bench_update import document_json
+from .synthetic import synthetic_transcripts
+
+
+# parse the document and decode its binary arrays, printing the best time of several runs in seconds
+node_parse = """
+const text = require("fs").readFileSync(process.argv[1], "utf8");
+const decode = (key, value) => value !== null && value.__ndarray__ !== undefined
+    ? new Uint8Array(Buffer.from(value.__ndarray__, "base64")) : value;
+let best = Infinity;
+for (let i = 0; i < 5; i++) {
+    const started = process.hrtime.bigint();
+    JSON.parse(text, decode);
+    best = Math.min(best, Number(process.hrtime.bigint() - started) / 1e9);
+}
+console.log(best);
+"""
+
+
+def node_parse_time(text):
+    """
+    The time taken to parse a document with node, or None if node isn't installed
+    """
+    node = shutil.which("node")
+    if node is None:
+        return None
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        f.write(text)
+    try:
+        output = subprocess.run([node, "-e", node_parse, f.name], stdout=subprocess.PIPE,
+                                universal_newlines=True, check=True).stdout
+    finally:
+        os.remove(f.name)
+    return float(output)
+
+
+class DocumentSuite(object):
+    params = ([1000, 10000], [False, True])
+    param_names = ["num_transcripts", "binary_columns"]
+    timeout = 600
+
+    def setup(self, num_transcripts, binary_columns):
+        self.transcripts = synthetic_transcripts(num_transcripts, locus_start=100000000)
+        self.plot = GenePlot(dict(pack=True, binary_columns=binary_columns))
+        self.plot.x_range = (min(t.start for t in self.transcripts), max(t.end for t in self.transcripts))
+        self.plot.transcripts = self.transcripts
+        self.plot.update()
+        self.document = document_json(self.plot)
+
+    def time_update(self, num_transcripts, binary_columns):
+        self.plot.transcripts = self.transcripts
+        self.plot.update()
+
+    def time_document_json(self, num_transcripts, binary_columns):
+        document_json(self.plot)
+
+    def time_parse(self, num_transcripts, binary_columns):
+        json.loads(self.document)
+
+    def track_document_bytes(self, num_transcripts, binary_columns):
+        return len(self.document.encode("utf-8"))
+
+    track_document_bytes.unit = "bytes"
+
+
+def main():
+    suite = DocumentSuite()
+    print("{:>12} {:>7} {:>10} {:>10} {:>10} {:>12}".format(
+        "transcripts", "binary", "update", "json", "node parse", "json bytes"))
+    for num_transcripts in DocumentSuite.params[0]:
+        for binary_columns in DocumentSuite.params[1]:
+            suite.setup(num_transcripts, binary_columns)
+            update = min(timeit.repeat(lambda: suite.time_update(num_transcripts, binary_columns),
+                                       number=1, repeat=3))
+            serialize = min(timeit.repeat(lambda: suite.time_document_json(num_transcripts, binary_columns),
+                                          number=1, repeat=3))
+            parse = node_parse_time(suite.document)
+            print("{:>12} {:>7} {:>10.4f} {:>10.4f} {:>10} {:>12}".format(
+                num_transcripts, str(binary_columns), update, serialize,
+                "-" if parse is None else "{:.4f}".format(parse), suite.track_document_bytes(num_transcripts,
+                                                                                          binary_columns)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmarks for building the glyph data of a plot
+
+Written as an asv suite, but can also be run directly:
+
+    python -m benchmarks.bench_geometry
+"""
+import timeit
+
+from bokeh.models import ColumnDataSource as CDS
+
+from gene_viz import GenePlot
+from gene_viz.dataframes import data_frame_from_columns, exon_data_frame, intron_data_frame
+from gene_viz.geometry import build_columns, GeometryCache
+
+from .synthetic import synthetic_transcripts
+
+
+def make_plot(transcripts, prefs=None):
+    """
+    A packed GenePlot showing all of the transcripts
+    """
+    plot = GenePlot(dict(pack=True, **(prefs or {})))
+    plot.transcripts = transcripts
+    plot.x_range = (min(t.start for t in transcripts), max(t.end for t in transcripts))
+    plot.pack(transcripts, True)
+    return plot
+
+
+class GeometrySuite(object):
+    # the per-transcript dataframe helpers are timed over this many transcripts
+    num_helper_transcripts = 1000
+
+    params = ([1000, 10000], [4, 16])
+    param_names = ["num_transcripts", "exons_per_transcript"]
+    timeout = 600
+
+    def setup(self, num_transcripts, exons_per_transcript):
+        self.transcripts = synthetic_transcripts(num_transcripts, exons_per_transcript=exons_per_transcript)
+        # the list columns, which the data frame helpers build, see bench_document for binary columns
+        self.plot = make_plot(self.transcripts, dict(binary_columns=False))
+        self.columns = build_columns(self.transcripts, self.plot.prefs, self.plot._get_intron_width())
+
+        # a cache holding the shapes of all of the transcripts
+        self.cache = GeometryCache(num_transcripts)
+        build_columns(self.transcripts, self.plot.prefs, self.plot._get_intron_width(), self.cache)
+
+    def time_get_exon_data(self, num_transcripts, exons_per_transcript):
+        for transcript in self.transcripts[:self.num_helper_transcripts]:
+            self.plot._get_exon_data(transcript)
+
+    def time_get_intron_data(self, num_transcripts, exons_per_transcript):
+        for transcript in self.transcripts[:self.num_helper_transcripts]:
+            self.plot._get_intron_data(transcript)
+
+    def time_build_columns(self, num_transcripts, exons_per_transcript):
+        build_columns(self.transcripts, self.plot.prefs, self.plot._get_intron_width())
+
+    def time_build_columns_cached(self, num_transcripts, exons_per_transcript):
+        build_columns(self.transcripts, self.plot.prefs, self.plot._get_intron_width(), self.cache)
+
+    def time_build_columns_uncached(self, num_transcripts, exons_per_transcript):
+        # every transcript misses the cache
+        build_columns(self.transcripts, self.plot.prefs, self.plot._get_intron_width(), GeometryCache())
+
+    def time_source_exons(self, num_transcripts, exons_per_transcript):
+        CDS(data=self.columns["exons"])
+
+    def time_source_introns(self, num_transcripts, exons_per_transcript):
+        CDS(data=self.columns["introns"])
+
+    def time_from_df_exons(self, num_transcripts, exons_per_transcript):
+        CDS.from_df(data_frame_from_columns(self.columns["exons"], exon_data_frame))
+
+    def time_from_df_introns(self, num_transcripts, exons_per_transcript):
+        CDS.from_df(data_frame_from_columns(self.columns["introns"], intron_data_frame))
+
+
+def main():
+    suite = GeometrySuite()
+    names = [name for name in sorted(dir(suite)) if name.startswith("time_")]
+    print("{:>12} {:>6} {:>22} {:>10}".format("transcripts", "exons", "benchmark", "seconds"))
+    for num_transcripts in GeometrySuite.params[0]:
+        for exons_per_transcript in GeometrySuite.params[1]:
+            suite.setup(num_transcripts, exons_per_transcript)
+            for name in names:
+                method = getattr(suite, name)
+                seconds = min(timeit.repeat(lambda: method(num_transcripts, exons_per_transcript),
+                                            number=1, repeat=3))
+                print("{:>12} {:>6} {:>22} {:>10.4f}".format(num_transcripts, exons_per_transcript, name[5:], seconds))
+
+
+if __name__ == "__main__":
+    main()
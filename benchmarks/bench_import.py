@@ -0,0 +1,89 @@
+"""
+Import time of the gene_viz modules which don't plot
+
+Modules such as the features, loaders and annotation readers are used by command
+line tools and worker processes, and shouldn't load bokeh or pandas, which is
+checked by tests/test_import.py. Run directly, this checks that each of them
+imports within a time budget, and exits with a non-zero status otherwise:
+
+    python -m benchmarks.bench_import
+
+The times are taken from the output of python -X importtime, in a new interpreter
+for each module. Written as an asv suite, but can also be run directly.
+"""
+import subprocess
+import sys
+
+
+# modules which must not load the plotting dependencies, and the dependencies they may load
+light_modules = {
+    "gene_viz": (),
+    "gene_viz.features": (),
+    "gene_viz.utils": (),
+    "gene_viz.colors": (),
+    "gene_viz.columns": (),
+    "gene_viz.gff": (),
+    "gene_viz.tabix": (),
+    "gene_viz.cache": (),
+    "gene_viz.packing": (),
+    "gene_viz.instrument": (),
+    "gene_viz.batch": (),
+    "gene_viz.aio": (),
+    "gene_viz.prefetch": (),
+    "gene_viz.index": ("numpy",),
+    "gene_viz.snapshot": ("numpy",),
+}
+
+# packages which are only needed for plotting and data frames
+heavy_packages = ("bokeh", "pandas", "numpy", "interval")
+
+# maximum cumulative import time of a light module, in seconds
+budget = 0.25
+
+
+def import_time(module):
+    """
+    Import a module in a new interpreter
+
+    :param module: The name of the module
+    :return: The cumulative import time of the module in seconds, and the set of top-level packages imported
+    """
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True).stderr
+
+    seconds = None
+    packages = set()
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.strip() == module and not name.startswith("  "):
+            seconds = int(cumulative) / 1e6
+        packages.add(name.strip().split(".")[0])
+    return seconds, packages
+
+
+class ImportSuite(object):
+    params = sorted(light_modules)
+    param_names = ["module"]
+
+    def timeraw_import(self, module):
+        return "import " + module
+
+
+def main():
+    failures = 0
+    print("{:>22} {:>10}".format("module", "seconds"))
+    for module in sorted(light_modules):
+        seconds, _ = min((import_time(module) for _ in range(3)), key=lambda result: result[0])
+        failed = seconds > budget
+        failures += failed
+        print("{:>22} {:>10.4f}{}".format(module, seconds, "  FAILED" if failed else ""))
+
+    if failures > 0:
+        print("{} modules exceeded the {}s import time budget".format(failures, budget), file=sys.stderr)
+    return 1 if failures > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Benchmarks comparing the streaming GTF reader, the tabix and snapshot loaders,
+and the gffutils and pyensembl loaders
+
+By default a synthetic annotation is generated. To benchmark a real-size file,
+such as a GENCODE release, set GENE_VIZ_BENCH_GTF to its path, and optionally
+GENE_VIZ_BENCH_REGION to the region to query:
+
+    GENE_VIZ_BENCH_GTF=gencode.v27.basic.annotation.gtf.gz \
+    GENE_VIZ_BENCH_REGION=chr22:42124000-42180000 python -m benchmarks.bench_loaders
+
+The tabix loader is only benchmarked if pysam, used to build the index, is installed,
+and the gffutils and pyensembl loaders if their packages are installed.
+
+Written as an asv suite, but can also be run directly.
+"""
+import os
+import shutil
+import tempfile
+import timeit
+
+from gene_viz.gff import read_transcripts, open_annotation, detect_format
+from gene_viz.snapshot import write_snapshot, Snapshot
+from gene_viz.tabix import open_tabix
+from gene_viz.utils import (
+    transcripts_from_gffutils,
+    transcripts_from_pyensembl,
+    transcripts_from_tabix,
+    transcripts_from_snapshot,
+)
+
+from .synthetic import synthetic_transcripts, write_gtf
+
+
+loaders = dict(
+    tabix=transcripts_from_tabix,
+    snapshot=transcripts_from_snapshot,
+    gffutils=transcripts_from_gffutils,
+    pyensembl=transcripts_from_pyensembl,
+)
+
+def annotation_file(directory):
+    """
+    The annotation file and (contig, start, end) region to benchmark with
+    """
+    path = os.environ.get("GENE_VIZ_BENCH_GTF")
+    if path is None:
+        path = os.path.join(directory, "synthetic.gtf.gz")
+        transcripts = synthetic_transcripts(20000, transcripts_per_gene=1)
+        write_gtf(transcripts, path)
+        middle = transcripts[len(transcripts) // 2].start
+        return path, ("chr1", middle, middle + 50000)
+
+    contig, _, span = os.environ.get("GENE_VIZ_BENCH_REGION", "chr22:42124000-42180000").partition(":")
+    start, end = (int(x) for x in span.split("-"))
+    return path, (contig, start, end)
+
+
+def tabix_file(path, directory):
+    """
+    Write a position sorted, bgzip compressed and tabix indexed copy of an annotation file
+
+    :return: The path of the copy, or None if pysam isn't installed
+    """
+    try:
+        import pysam
+    except ImportError:
+        return None
+
+    with open_annotation(path) as f:
+        lines = [line for line in f if not line.startswith("#")]
+    lines.sort(key=lambda x: (x.split("\t", 1)[0], int(x.split("\t", 4)[3])))
+
+    sorted_path = os.path.join(directory, "sorted." + detect_format(path))
+    with open(sorted_path, "w") as f:
+        f.writelines(lines)
+    return pysam.tabix_index(sorted_path, preset="gff", force=True)
+
+
+def pyensembl_genome(path, directory):
+    """
+    A pyensembl Genome for an annotation file, indexed in directory
+
+    :return: The Genome, or None if pyensembl isn't installed
+    """
+    try:
+        import pyensembl
+    except ImportError:
+        return None
+
+    genome = pyensembl.Genome(reference_name="benchmark", annotation_name="benchmark",
+                              gtf_path_or_url=path, cache_directory_path=directory)
+    genome.index()
+    return genome
+
+
+class LoaderSuite(object):
+    params = ["gtf", "tabix", "snapshot", "gffutils", "pyensembl"]
+    param_names = ["loader"]
+    timeout = 3600
+    number = 1
+    repeat = 3
+
+    def setup_cache(self):
+        directory = tempfile.mkdtemp()
+        path, region = annotation_file(directory)
+        files = dict(path=path, region=region, tabix=tabix_file(path, directory), gffutils=None,
+                     snapshot=os.path.join(directory, "annotation.snapshot"),
+                     pyensembl=os.path.join(directory, "pyensembl"))
+
+        if pyensembl_genome(path, files["pyensembl"]) is None:
+            files["pyensembl"] = None
+
+        write_snapshot(files["snapshot"], read_transcripts(path))
+
+        # the database build is part of the cost of the gffutils loader
+        try:
+            import gffutils
+        except ImportError:
+            return files
+
+        files["gffutils"] = os.path.join(directory, "annotation.db")
+        with open_annotation(path) as f:
+            gffutils.create_db(f.read(), files["gffutils"], from_string=True, disable_infer_genes=True,
+                               disable_infer_transcripts=True, merge_strategy="create_unique")
+        return files
+
+    def setup(self, files, loader):
+        self.path, self.region = files["path"], files["region"]
+        if loader == "tabix":
+            if files["tabix"] is None:
+                raise NotImplementedError("pysam is not installed")
+            self.db = open_tabix(files["tabix"])
+        elif loader == "snapshot":
+            self.db = Snapshot(files["snapshot"])
+        elif loader == "gffutils":
+            if files["gffutils"] is None:
+                raise NotImplementedError("gffutils is not installed")
+            import gffutils
+            self.db = gffutils.FeatureDB(files["gffutils"])
+        elif loader == "pyensembl":
+            if files["pyensembl"] is None:
+                raise NotImplementedError("pyensembl is not installed")
+            # the index was built in setup_cache, so this only opens it
+            self.db = pyensembl_genome(self.path, files["pyensembl"])
+
+    def load(self, loader):
+        if loader == "gtf":
+            return list(read_transcripts(self.path, *self.region))
+        return loaders[loader](self.db, *self.region)
+
+    def time_region(self, files, loader):
+        self.load(loader)
+
+    def time_contig(self, files, loader):
+        if loader != "gtf":
+            raise NotImplementedError
+        list(read_transcripts(self.path, self.region[0]))
+
+    def time_open(self, files, loader):
+        if loader != "snapshot":
+            raise NotImplementedError
+        Snapshot(files["snapshot"]).close()
+
+    def track_num_transcripts(self, files, loader):
+        return len(self.load(loader))
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        path, region = annotation_file(directory)
+        print("{}  {}:{}-{}".format(path, *region))
+
+        seconds = min(timeit.repeat(lambda: list(read_transcripts(path, *region)), number=1, repeat=3))
+        count = len(list(read_transcripts(path, *region)))
+        print("{:>30} {:>10.3f}s {:>8} transcripts".format("gtf region", seconds, count))
+
+        seconds = min(timeit.repeat(lambda: list(read_transcripts(path, region[0])), number=1, repeat=3))
+        print("{:>30} {:>10.3f}s".format("gtf contig", seconds))
+
+        tabix_path = tabix_file(path, directory)
+        if tabix_path is None:
+            print("pysam is not installed, skipping tabix")
+        else:
+            db = open_tabix(tabix_path)
+            seconds = min(timeit.repeat(lambda: transcripts_from_tabix(db, *region), number=1, repeat=3))
+            count = len(transcripts_from_tabix(db, *region))
+            print("{:>30} {:>10.3f}s {:>8} transcripts".format("tabix region", seconds, count))
+
+        snapshot_path = os.path.join(directory, "annotation.snapshot")
+        seconds = timeit.default_timer()
+        write_snapshot(snapshot_path, read_transcripts(path))
+        seconds = timeit.default_timer() - seconds
+        print("{:>30} {:>10.3f}s".format("write_snapshot", seconds))
+
+        seconds = min(timeit.repeat(lambda: Snapshot(snapshot_path).close(), number=1, repeat=3))
+        print("{:>30} {:>10.6f}s".format("snapshot open", seconds))
+
+        db = Snapshot(snapshot_path)
+        seconds = min(timeit.repeat(lambda: transcripts_from_snapshot(db, *region), number=1, repeat=3))
+        count = len(transcripts_from_snapshot(db, *region))
+        print("{:>30} {:>10.6f}s {:>8} transcripts".format("snapshot region", seconds, count))
+        db.close()
+
+        try:
+            import gffutils
+        except ImportError:
+            print("gffutils is not installed, skipping")
+        else:
+            db_path = os.path.join(directory, "annotation.db")
+            seconds = timeit.default_timer()
+            with open_annotation(path) as f:
+                gffutils.create_db(f.read(), db_path, from_string=True, disable_infer_genes=True,
+                                   disable_infer_transcripts=True, merge_strategy="create_unique")
+            seconds = timeit.default_timer() - seconds
+            print("{:>30} {:>10.3f}s".format("gffutils create_db", seconds))
+
+            db = gffutils.FeatureDB(db_path)
+            seconds = min(timeit.repeat(lambda: transcripts_from_gffutils(db, *region), number=1, repeat=3))
+            count = len(transcripts_from_gffutils(db, *region))
+            print("{:>30} {:>10.3f}s {:>8} transcripts".format("gffutils region", seconds, count))
+
+        seconds = timeit.default_timer()
+        genome = pyensembl_genome(path, os.path.join(directory, "pyensembl"))
+        seconds = timeit.default_timer() - seconds
+        if genome is None:
+            print("pyensembl is not installed, skipping")
+            return
+        print("{:>30} {:>10.3f}s".format("pyensembl index", seconds))
+
+        seconds = min(timeit.repeat(lambda: transcripts_from_pyensembl(genome, *region), number=1, repeat=3))
+        count = len(transcripts_from_pyensembl(genome, *region))
+        print("{:>30} {:>10.3f}s {:>8} transcripts".format("pyensembl region", seconds, count))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Benchmarks comparing the transcript packing algorithms
+
+Written as an asv suite, but can also be run directly:
+
+    python -m benchmarks.bench_packing
+"""
+import timeit
+
+from gene_viz.packing import packers
+
+from .synthetic import synthetic_transcripts
+
+
+class PackingSuite(object):
+    params = ([1000, 10000, 100000], sorted(packers))
+    param_names = ["num_transcripts", "method"]
+    timeout = 600
+
+    def setup(self, num_transcripts, method):
+        self.transcripts = synthetic_transcripts(num_transcripts)
+
+    def time_pack(self, num_transcripts, method):
+        packers[method](self.transcripts)
+
+    def track_num_levels(self, num_transcripts, method):
+        packers[method](self.transcripts)
+        return max(t.draw_level for t in self.transcripts) + 1
+
+
+def main():
+    suite = PackingSuite()
+    print("{:>15} {:>8} {:>12} {:>8}".format("transcripts", "method", "seconds", "levels"))
+    for num_transcripts in PackingSuite.params[0]:
+        for method in PackingSuite.params[1]:
+            suite.setup(num_transcripts, method)
+            seconds = min(timeit.repeat(lambda: suite.time_pack(num_transcripts, method), number=1, repeat=3))
+            levels = suite.track_num_levels(num_transcripts, method)
+            print("{:>15} {:>8} {:>12.4f} {:>8}".format(num_transcripts, method, seconds, levels))
+
+
+if __name__ == "__main__":
+    main()
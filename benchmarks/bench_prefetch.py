@@ -0,0 +1,87 @@
+"""
+Hit rate of the region prefetcher while panning, for tuning the window size
+
+A view 50kb wide pans along a synthetic annotation at a steady speed, and then
+back, while a loader with a fixed latency serves the windows. The hit rate is the
+fraction of the windows needed by the view which were prefetched in time.
+
+Written as an asv suite, but can also be run directly:
+
+    python -m benchmarks.bench_prefetch
+"""
+import time
+
+from gene_viz.cache import genes_in_region
+from gene_viz.prefetch import RegionPrefetcher
+
+from .synthetic import synthetic_transcripts
+
+
+# seconds taken by the loader for each window
+load_latency = 0.05
+
+# width of the view, distance moved by each pan, and seconds between pans
+view_width = 50000
+pan_step = 25000
+pan_interval = 0.06
+num_pans = 40
+
+
+def slow_loader(transcripts, contig, start, end):
+    """
+    A loader taking load_latency seconds, querying a list of transcripts
+    """
+    time.sleep(load_latency)
+    return genes_in_region(transcripts, start, end)
+
+
+def pan(prefetcher, start, steps, step):
+    """
+    Pan the view, loading the window holding it at each position
+
+    :return: The start of the view after panning
+    """
+    for _ in range(steps):
+        prefetcher.load("chr1", start, start + view_width)
+        start += step
+        time.sleep(pan_interval)
+    return start
+
+
+class PrefetchSuite(object):
+    params = [100000, 250000, 1000000]
+    param_names = ["window_size"]
+    timeout = 600
+    number = 1
+    repeat = 1
+
+    def setup(self, window_size):
+        self.transcripts = synthetic_transcripts(5000, transcripts_per_gene=2)
+        self.start = self.transcripts[100].start
+
+    def run(self, window_size):
+        with RegionPrefetcher(slow_loader, self.transcripts, window_size=window_size) as prefetcher:
+            start = pan(prefetcher, self.start, num_pans, pan_step)
+            pan(prefetcher, start, num_pans, -pan_step)
+        return prefetcher.stats
+
+    def track_hit_rate(self, window_size):
+        return self.run(window_size).hit_rate
+
+    def track_misses(self, window_size):
+        return self.run(window_size).misses
+
+    def time_pan(self, window_size):
+        self.run(window_size)
+
+
+def main():
+    suite = PrefetchSuite()
+    print("{:>12}  {}".format("window_size", "stats"))
+    for window_size in PrefetchSuite.params:
+        suite.setup(window_size)
+        print("{:>12}  {}".format(window_size, suite.run(window_size)))
+
+
+if __name__ == "__main__":
+    main()
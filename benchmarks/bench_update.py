@@ -0,0 +1,65 @@
+"""
+End to end benchmarks of GenePlot.update, and of the size of the resulting document
+
+Written as an asv suite, but can also be run directly:
+
+    python -m benchmarks.bench_update
+"""
+import json
+import timeit
+
+from bokeh.embed import json_item
+
+from gene_viz import GenePlot
+
+from .synthetic import synthetic_transcripts
+
+
+def document_json(plot):
+    """
+    The JSON sent to the browser to embed a plot
+    """
+    return json.dumps(json_item(plot.figure))
+
+
+class UpdateSuite(object):
+    params = ([1000, 10000], [5, 50])
+    param_names = ["num_transcripts", "density"]
+    timeout = 600
+
+    def setup(self, num_transcripts, density):
+        self.transcripts = synthetic_transcripts(num_transcripts, density=density)
+        self.plot = GenePlot(dict(pack=True))
+        self.plot.x_range = (min(t.start for t in self.transcripts), max(t.end for t in self.transcripts))
+        self.plot.transcripts = self.transcripts
+        self.plot.update()
+
+    def time_update(self, num_transcripts, density):
+        # setting the transcripts marks all of the data as changed
+        self.plot.transcripts = self.transcripts
+        self.plot.update()
+
+    def time_document_json(self, num_transcripts, density):
+        document_json(self.plot)
+
+    def track_document_bytes(self, num_transcripts, density):
+        return len(document_json(self.plot).encode("utf-8"))
+
+    track_document_bytes.unit = "bytes"
+
+
+def main():
+    suite = UpdateSuite()
+    print("{:>12} {:>8} {:>10} {:>10} {:>12}".format("transcripts", "density", "update", "json", "json bytes"))
+    for num_transcripts in UpdateSuite.params[0]:
+        for density in UpdateSuite.params[1]:
+            suite.setup(num_transcripts, density)
+            update = min(timeit.repeat(lambda: suite.time_update(num_transcripts, density), number=1, repeat=3))
+            serialize = min(timeit.repeat(lambda: suite.time_document_json(num_transcripts, density),
+                                          number=1, repeat=3))
+            size = suite.track_document_bytes(num_transcripts, density)
+            print("{:>12} {:>8} {:>10.4f} {:>10.4f} {:>12}".format(num_transcripts, density, update, serialize, size))
+
+
+if __name__ == "__main__":
+    main()
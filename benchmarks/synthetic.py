@@ -0,0 +1,90 @@
+"""
+Generators for synthetic annotation data used by the benchmarks
+"""
+import gzip
+import random
+
+from gene_viz.features import Transcript, Exon, CDS
+
+
+def synthetic_transcripts(num_transcripts, exons_per_transcript=8, density=10, transcripts_per_gene=4,
+                          mean_exon_size=150, mean_intron_size=2000, contig="chr1", seed=0, locus_start=1):
+    """
+    Generate a reproducible locus of randomly placed transcripts
+
+    :param num_transcripts: The number of transcripts to generate
+    :param exons_per_transcript: The maximum number of exons per transcript
+    :param density: The average number of transcripts overlapping any position
+    :param transcripts_per_gene: The number of isoforms sharing a gene id
+    :param mean_exon_size: The mean exon length
+    :param mean_intron_size: The mean intron length
+    :param contig: The name of the contig
+    :param seed: Seed for the random number generator
+    :param locus_start: The position of the start of the locus
+    :return: A list of Transcript objects, sorted by start position
+    """
+    rng = random.Random(seed)
+
+    mean_transcript_size = exons_per_transcript / 2.0 * (mean_exon_size + mean_intron_size)
+    locus_size = int(num_transcripts * mean_transcript_size / density) + 1
+
+    transcripts = []
+    for i in range(num_transcripts):
+        position = locus_start - 1 + rng.randint(1, locus_size)
+        strand = rng.choice("+-")
+        transcript = Transcript("T{:07d}".format(i), "G{:07d}".format(i // transcripts_per_gene),
+                                contig, position, position, strand)
+
+        for j in range(rng.randint(1, exons_per_transcript)):
+            size = max(1, int(rng.expovariate(1.0 / mean_exon_size)))
+            transcript.add_exon(Exon("E{:07d}.{}".format(i, j), contig, position, position + size))
+            position += size + max(1, int(rng.expovariate(1.0 / mean_intron_size)))
+
+        transcript.end = transcript.exons[-1].end
+
+        # coding region covering the middle part of the transcript
+        if rng.random() < 0.7:
+            cds_start = rng.randint(transcript.start, transcript.end)
+            cds_end = rng.randint(cds_start, transcript.end)
+            for exon in transcript.exons:
+                if exon.start <= cds_end and exon.end >= cds_start:
+                    transcript.add_cds(CDS(contig, max(exon.start, cds_start), min(exon.end, cds_end)))
+
+        transcripts.append(transcript)
+
+    return sorted(transcripts, key=lambda x: x.start)
+
+
+def write_gtf(transcripts, path):
+    """
+    Write transcripts to a GTF file, sorted by contig and gene start position
+
+    :param transcripts: A list of Transcript objects
+    :param path: Path of the file to write, gzip compressed if it ends with .gz
+    """
+    genes = {}
+    for t in transcripts:
+        genes.setdefault(t.gene_id, []).append(t)
+
+    def gene_position(item):
+        return item[1][0].contig, min(t.start for t in item[1])
+
+    line = "{}\tgene_viz\t{}\t{}\t{}\t.\t{}\t{}\t{}\n"
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt") as f:
+        for gene_id, gene_transcripts in sorted(genes.items(), key=gene_position):
+            first = gene_transcripts[0]
+            # names and biotypes are included for pyensembl
+            gene_attributes = 'gene_id "{0}"; gene_name "{0}"; gene_biotype "protein_coding";'.format(gene_id)
+            f.write(line.format(first.contig, "gene", min(t.start for t in gene_transcripts),
+                                max(t.end for t in gene_transcripts), first.strand, ".", gene_attributes))
+
+            for t in gene_transcripts:
+                attributes = '{0} transcript_id "{1}"; transcript_name "{1}"; transcript_biotype "protein_coding";'.format(
+                    gene_attributes, t.transcript_id)
+                f.write(line.format(t.contig, "transcript", t.start, t.end, t.strand, ".", attributes))
+                for exon in t.exons:
+                    f.write(line.format(exon.contig, "exon", exon.start, exon.end, t.strand, ".",
+                                        '{} exon_id "{}";'.format(attributes, exon.exon_id)))
+                for cds in t.cds:
+                    f.write(line.format(cds.contig, "CDS", cds.start, cds.end, t.strand, "0", attributes))
@@ -0,0 +1,3 @@
+"""
+Lets pytest import gene_viz, and the benchmark data generators, from the source tree
+"""
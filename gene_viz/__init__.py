@@ -1,4 +1,11 @@
-from .gene_viz import GenePlot
+"""
+gene_viz
+
+The plot classes are imported when first used, so that modules which don't
+plot, such as the features, loaders and annotation readers, can be imported
+without loading bokeh and pandas.
+"""
+import importlib
 
 __version_info__ = ("0", "0", "1", "dev")
 __date__ = "09 Nov 2017"
@@ -7,3 +14,23 @@ __version__ = ".".join(__version_info__)
 __author__ = "Guy Allard, LUMC"
 __contact__ = "guyallard01@gmail.com"
 __homepage__ = "https://github.com/lumc-pgx/gene-viz"
+
+# attributes of the package, and the submodules they are imported from on first use
+_lazy_attributes = {
+    "GenePlot": ".gene_viz",
+    "TrackPlot": ".tracks",
+}
+
+__all__ = sorted(_lazy_attributes)
+
+
+def __getattr__(name):
+    if name not in _lazy_attributes:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(_lazy_attributes[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
@@ -0,0 +1,226 @@
+"""
+Asynchronous transcript loading, for bokeh server apps
+
+The loaders in gene_viz.utils block until their query finishes. Called from a
+bokeh server callback, they hold up the event loop, freezing the session, and any
+other sessions served by the same process, while the database is read. The
+awaitable loaders here run the loaders in an executor instead, so the event loop
+keeps serving requests while the query runs.
+
+By default the loaders run in the event loop's default thread pool. gffutils
+databases, pyensembl genomes and tabix files hold a handle which can't be shared
+between threads, so each worker thread opens its own copy of these on first use.
+A gffutils database must therefore be a file, rather than in memory. The copies
+stay open until close_thread_sources is called, or the source is garbage
+collected. To use a concurrent.futures.ProcessPoolExecutor, the loader must be a
+module-level function and the annotation source must be picklable, e.g. the path
+of a tabix indexed file or a snapshot.
+
+See GenePlot.load_region for loading the transcripts of a plot in the background.
+
+example usage
+>>> from gene_viz.aio import transcripts_from_gffutils_async
+>>> async def show_gene(plot, db):
+...     plot.transcripts = await transcripts_from_gffutils_async(db, "chr2", 2210223, 2300331)
+"""
+import asyncio
+import functools
+import sqlite3
+import threading
+import weakref
+
+from .tabix import TabixFile, _PysamTabixFile
+from .utils import (
+    transcripts_from_gffutils,
+    transcripts_from_pyensembl,
+    transcripts_from_gtf,
+    transcripts_from_tabix,
+    transcripts_from_snapshot,
+)
+
+
+# copies of the annotation sources opened by worker threads. For each original, keyed on its id,
+# a function returning the original, and the copies keyed on the id of the thread that opened them
+_thread_sources = {}
+_thread_sources_lock = threading.Lock()
+
+# the attributes of a gffutils.FeatureDB set by its constructor arguments of the same name
+_feature_db_settings = ("default_encoding", "keep_order", "pragmas", "sort_attribute_values")
+
+
+def _reopen(db):
+    """
+    Open a copy of an annotation source for use in the current thread
+
+    :param db: An annotation source, as passed to the loaders
+    :return: A copy of db, or db itself if it can be shared between threads
+    """
+    if isinstance(db, (TabixFile, _PysamTabixFile)):
+        return db.reopen()
+
+    # gffutils.FeatureDB, whose sqlite connection can only be used by the thread that opened it.
+    # The copy's connection is only used by one thread, but can be closed from any. The settings
+    # of the original are kept, so that the copy returns features in the same order and form
+    if type(db).__name__ == "FeatureDB" and isinstance(getattr(db, "dbfn", None), str) and db.dbfn != ":memory:":
+        settings = {name: getattr(db, name) for name in _feature_db_settings if hasattr(db, name)}
+        settings["text_factory"] = db.conn.text_factory
+        return type(db)(sqlite3.connect(db.dbfn, check_same_thread=False), **settings)
+
+    # pyensembl.Genome, which also connects to sqlite. The copy connects when first queried
+    if hasattr(db, "to_dict") and hasattr(type(db), "from_dict"):
+        return type(db).from_dict(db.to_dict())
+
+    return db
+
+
+def _close(copy):
+    """
+    Close a copy of an annotation source opened by _reopen
+    """
+    if hasattr(copy, "close"):
+        copy.close()
+    elif isinstance(getattr(copy, "conn", None), sqlite3.Connection):
+        copy.conn.close()
+    # pyensembl genomes have no close method, the copy's connection is closed when it is garbage collected
+
+
+def thread_source(db):
+    """
+    The copy of an annotation source belonging to the current thread
+
+    :param db: An annotation source, as passed to the loaders
+    :return: The thread's copy of db, opened on first use
+    """
+    if threading.current_thread() is threading.main_thread():
+        return db
+
+    thread = threading.get_ident()
+    with _thread_sources_lock:
+        original, copies = _thread_sources.get(id(db), (None, {}))
+        if original is not None and original() is db and thread in copies:
+            return copies[thread]
+
+    copy = _reopen(db)
+    if copy is db:
+        return db
+
+    with _thread_sources_lock:
+        original, copies = _thread_sources.get(id(db), (None, {}))
+        if original is None or original() is not db:
+            try:
+                # close the copies when the original is garbage collected, before its id can be reused
+                original = weakref.ref(db)
+                weakref.finalize(db, _close_copies, id(db), original)
+            except TypeError:
+                # the original can't be weakly referenced, so is kept until close_thread_sources is called
+                original = lambda: db
+            copies = {}
+            _thread_sources[id(db)] = (original, copies)
+        copies[thread] = copy
+    return copy
+
+
+def _close_copies(key, original, threads=None):
+    with _thread_sources_lock:
+        entry = _thread_sources.get(key)
+        if entry is None or entry[0] is not original:
+            return
+        copies = entry[1]
+        closing = [copies.pop(thread) for thread in list(copies) if threads is None or thread in threads]
+        if len(copies) == 0:
+            del _thread_sources[key]
+
+    for copy in closing:
+        _close(copy)
+
+
+def close_thread_sources(db):
+    """
+    Close the copies of an annotation source opened by the worker threads which loaded from it
+
+    Call this when db is no longer needed, or is closed, and no loads from it are in progress.
+    Otherwise the copies stay open until db is garbage collected, or for the life of the
+    worker threads if db can't be weakly referenced. The worker threads open new copies if
+    they load from db again.
+
+    :param db: An annotation source, as passed to the loaders
+    """
+    with _thread_sources_lock:
+        original, _ = _thread_sources.get(id(db), (None, None))
+    if original is not None and original() is db:
+        _close_copies(id(db), original)
+
+
+def _close_thread_source(db):
+    """
+    Close the current thread's copy of an annotation source, if it has one
+    """
+    with _thread_sources_lock:
+        original, _ = _thread_sources.get(id(db), (None, None))
+    if original is not None and original() is db:
+        _close_copies(id(db), original, {threading.get_ident()})
+
+
+def _run_loader(loader, db, contig, start, end):
+    return loader(thread_source(db), contig, start, end)
+
+
+def load_future(loader, db, contig, start, end, executor=None):
+    """
+    Start loading the transcripts for a region in an executor
+
+    Cancelling the future stops the load if it hasn't started yet. A load that has
+    started runs to completion, but its result is discarded.
+
+    Each executor thread loads from its own copy of db, which stays open until
+    close_thread_sources(db) is called, or db is garbage collected.
+
+    :param loader: A loader function with the signature of the gene_viz.utils loaders
+    :param db: The annotation source passed to the loader
+    :param contig: Name of contig to use in query
+    :param start: Start position of query
+    :param end: End position of query
+    :param executor: A concurrent.futures executor, or None for the event loop's default thread pool
+    :return: An asyncio Future of the list of transcripts
+    """
+    loop = asyncio.get_event_loop()
+    return loop.run_in_executor(executor, functools.partial(_run_loader, loader, db, contig, start, end))
+
+
+async def load_transcripts(loader, db, contig, start, end, executor=None):
+    """
+    Load the transcripts for a region without blocking the event loop
+
+    :param loader: A loader function with the signature of the gene_viz.utils loaders
+    :param db: The annotation source passed to the loader
+    :param contig: Name of contig to use in query
+    :param start: Start position of query
+    :param end: End position of query
+    :param executor: A concurrent.futures executor, or None for the event loop's default thread pool
+    :return: A list of gene_viz transcript objects
+    """
+    return await load_future(loader, db, contig, start, end, executor)
+
+
+def awaitable_loader(loader):
+    """
+    Wrap a loader function so that it runs in an executor
+
+    :param loader: A loader function with the signature of the gene_viz.utils loaders
+    :return: A coroutine function taking the arguments of the loader, and an optional executor
+    """
+    @functools.wraps(loader)
+    async def wrapper(db, contig, start, end, executor=None):
+        return await load_transcripts(loader, db, contig, start, end, executor)
+
+    wrapper.__name__ = loader.__name__ + "_async"
+    wrapper.__qualname__ = wrapper.__name__
+    wrapper.__doc__ = "Awaitable variant of gene_viz.utils.{}, see gene_viz.aio".format(loader.__name__)
+    return wrapper
+
+
+transcripts_from_gffutils_async = awaitable_loader(transcripts_from_gffutils)
+transcripts_from_pyensembl_async = awaitable_loader(transcripts_from_pyensembl)
+transcripts_from_gtf_async = awaitable_loader(transcripts_from_gtf)
+transcripts_from_tabix_async = awaitable_loader(transcripts_from_tabix)
+transcripts_from_snapshot_async = awaitable_loader(transcripts_from_snapshot)
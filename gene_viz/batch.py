@@ -0,0 +1,334 @@
+"""
+Batch export of gene plots for many regions
+
+The regions are rendered in a pool of worker processes. Each worker opens the
+annotation source once, when it starts, and then renders one region per task,
+so the cost of opening the source is not repeated for every region. With a
+snapshot (see gene_viz.snapshot) the annotation is memory-mapped, and the
+workers share a single read-only copy of it.
+
+Each region is written as a standalone HTML file, and optionally as PNG or SVG
+images if bokeh's image export (selenium with a headless browser) is available.
+
+example usage
+>>> from gene_viz.batch import export_regions, parse_region
+>>> regions = [parse_region("CYP2D6=chr22:42124000-42180000"), parse_region("chr10:94760000-94860000")]
+>>> results = export_regions("gencode.v27.snapshot", regions, "figures", formats=("html", "png"))
+
+or from the command line
+$ gene-viz-batch gencode.v27.snapshot --regions pharmacogenes.bed --output figures --format html png
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+import traceback
+from multiprocessing import Pool, cpu_count
+
+
+# file formats which can be written
+export_formats = ("html", "png", "svg")
+
+# state of a worker process: the annotation source, plot preferences and output settings
+_worker = {}
+
+
+def parse_region(text):
+    """
+    Parse a region of the form [name=]contig:start-end
+
+    :param text: The region, e.g. "CYP2D6=chr22:42124000-42180000"
+    :return: A (name, contig, start, end) tuple
+    """
+    match = re.match(r"^(?:(?P<name>[^=]+)=)?(?P<contig>[^:]+):(?P<start>[\d,]+)-(?P<end>[\d,]+)$", text.strip())
+    if match is None:
+        print("Error - invalid region {}, expected [name=]contig:start-end".format(text), file=sys.stderr)
+        raise ValueError("Invalid region {}".format(text))
+
+    contig = match.group("contig")
+    start, end = (int(match.group(x).replace(",", "")) for x in ("start", "end"))
+    name = match.group("name") or "{}_{}_{}".format(contig, start, end)
+    return name, contig, start, end
+
+
+def read_regions(path):
+    """
+    Read regions from a BED file, naming them from the fourth column if present
+
+    :param path: Path to the BED file
+    :return: A list of (name, contig, start, end) tuples
+    """
+    regions = []
+    with open(path) as f:
+        for line in f:
+            if line.startswith(("#", "track", "browser")) or not line.strip():
+                continue
+            fields = line.rstrip("\n").split("\t")
+            contig, start, end = fields[0], int(fields[1]) + 1, int(fields[2])
+            name = fields[3] if len(fields) > 3 else "{}_{}_{}".format(contig, start, end)
+            regions.append((name, contig, start, end))
+    return regions
+
+
+def open_source(path):
+    """
+    Open an annotation source, choosing the loader from the type of file
+
+    * gffutils databases (.db)
+    * gene_viz snapshots
+    * bgzip compressed files with a tabix index
+    * other GTF and GFF3 files, which are read with the streaming reader
+
+    :param path: Path to the annotation
+    :return: A (loader, db) tuple, where loader has the signature of the loaders in gene_viz.utils
+    """
+    from . import utils
+    from .snapshot import Snapshot, snapshot_magic
+
+    if path.lower().endswith(".db"):
+        import gffutils
+        return utils.transcripts_from_gffutils, gffutils.FeatureDB(path)
+
+    with open(path, "rb") as f:
+        magic = f.read(len(snapshot_magic))
+    if magic == snapshot_magic:
+        return utils.transcripts_from_snapshot, Snapshot(path)
+
+    if os.path.exists(path + ".tbi") or os.path.exists(path + ".csi"):
+        from .tabix import open_tabix
+        return utils.transcripts_from_tabix, open_tabix(path)
+
+    return utils.transcripts_from_gtf, path
+
+
+def close_source(db):
+    """
+    Close an annotation source opened by open_source
+
+    :param db: The db returned by open_source
+    """
+    if hasattr(db, "close"):
+        db.close()
+    elif hasattr(db, "conn"):
+        # gffutils.FeatureDB
+        db.conn.close()
+
+
+def _init_worker(source, prefs, output_dir, formats, resources, opened=None):
+    _worker.clear()
+    _worker.update(
+        prefs=prefs,
+        output_dir=output_dir,
+        formats=formats,
+        resources=resources,
+    )
+    try:
+        _worker["source"] = opened if opened is not None else open_source(source)
+    except Exception:
+        # raising here would make the pool replace the worker, again and again, and the
+        # batch would never finish. Each region reports the error instead
+        _worker["source_error"] = traceback.format_exc()
+
+
+def _file_name(name):
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+def _export_html(plot, path, title, resources):
+    from bokeh.embed import file_html
+    from bokeh.resources import CDN, INLINE
+
+    html = file_html(plot.figure, INLINE if resources == "inline" else CDN, title)
+    with open(path, "w") as f:
+        f.write(html)
+
+
+def _export_image(plot, path, fmt):
+    from bokeh.io import export_png, export_svgs
+
+    if fmt == "png":
+        export_png(plot.figure, filename=path)
+    else:
+        plot.figure.output_backend = "svg"
+        export_svgs(plot.figure, filename=path)
+
+
+def _render(task):
+    """
+    Render a single region in a worker process
+    """
+    index, (name, contig, start, end) = task
+    result = dict(name=name, region="{}:{}-{}".format(contig, start, end), transcripts=0, files=[], error=None)
+
+    timer = timeit.default_timer
+    started = timer()
+    try:
+        if "source_error" in _worker:
+            raise RuntimeError("Could not open the annotation source\n{}".format(_worker["source_error"]))
+
+        # imported here so that starting the batch doesn't load bokeh
+        from .gene_viz import GenePlot
+
+        loader, db = _worker["source"]
+        transcripts = loader(db, contig, start, end)
+        loaded = timer()
+
+        plot = GenePlot(_worker["prefs"])
+        plot.transcripts = transcripts
+        plot.x_range = (start, end)
+        plot.update()
+        rendered = timer()
+
+        base = os.path.join(_worker["output_dir"], _file_name(name))
+        for fmt in _worker["formats"]:
+            path = "{}.{}".format(base, fmt)
+            if fmt == "html":
+                _export_html(plot, path, "{} {}".format(name, result["region"]), _worker["resources"])
+            else:
+                _export_image(plot, path, fmt)
+            result["files"].append(path)
+        written = timer()
+
+        result.update(
+            transcripts=len(transcripts),
+            load_seconds=loaded - started,
+            render_seconds=rendered - loaded,
+            write_seconds=written - rendered,
+        )
+    except Exception:
+        result["error"] = traceback.format_exc()
+
+    result["seconds"] = timer() - started
+    return index, result
+
+
+def export_regions(source, regions, output_dir, formats=("html",), prefs=None, processes=None,
+                   resources="cdn", progress=None):
+    """
+    Render a gene plot for each of a list of regions, in parallel
+
+    Failures are reported in the results rather than raised, so that one bad
+    region doesn't stop the batch. An annotation source which can't be opened
+    raises its error before any regions are rendered.
+
+    :param source: Path to the annotation, see open_source
+    :param regions: A list of (name, contig, start, end) tuples, see parse_region and read_regions
+    :param output_dir: Directory to write the files to, created if necessary
+    :param formats: The formats to write, any of "html", "png" and "svg". Writing images
+                    requires selenium and a headless browser
+    :param prefs: GenePlot preferences
+    :param processes: The number of worker processes, by default the number of cores.
+                      With 1, regions are rendered in the calling process
+    :param resources: "cdn" to load BokehJS from the Bokeh CDN, "inline" to include it in each HTML file
+    :param progress: A function called with (result, number completed, number of regions)
+                     as each region completes
+    :return: A list of result dictionaries, in the order of the regions, holding the name, region,
+             number of transcripts, files written, error (None on success), and timings in seconds
+    """
+    for fmt in formats:
+        if fmt not in export_formats:
+            print("Error - format must be one of {}".format(", ".join(export_formats)), file=sys.stderr)
+            raise ValueError("Unknown format {}".format(fmt))
+
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    regions = list(regions)
+    processes = min(processes or cpu_count(), max(len(regions), 1))
+    initargs = (source, prefs or {}, output_dir, tuple(formats), resources)
+
+    tasks = list(enumerate(regions))
+    results = [None] * len(regions)
+    num_completed = 0
+
+    # open the source here first, so that a missing or unreadable source raises its error
+    # rather than failing in every worker
+    opened = open_source(source)
+
+    if processes == 1:
+        _init_worker(*initargs, opened=opened)
+        completed = (_render(task) for task in tasks)
+    else:
+        # each worker opens its own handle on the source
+        close_source(opened[1])
+        pool = Pool(processes, initializer=_init_worker, initargs=initargs)
+        completed = pool.imap_unordered(_render, tasks, chunksize=1)
+
+    try:
+        for index, result in completed:
+            results[index] = result
+            num_completed += 1
+            if progress is not None:
+                progress(result, num_completed, len(regions))
+    except BaseException:
+        # on an error or interrupt, stop rather than waiting for the remaining regions
+        if processes > 1:
+            pool.terminate()
+        raise
+    finally:
+        if processes > 1:
+            pool.close()
+            pool.join()
+        else:
+            close_source(opened[1])
+
+    return results
+
+
+def _print_progress(result, completed, total):
+    if result["error"] is None:
+        print("[{}/{}] {} {}: {} transcripts in {:.2f}s (load {:.2f}s, render {:.2f}s, write {:.2f}s)".format(
+            completed, total, result["name"], result["region"], result["transcripts"], result["seconds"],
+            result["load_seconds"], result["render_seconds"], result["write_seconds"]), file=sys.stderr)
+    else:
+        print("[{}/{}] {} {}: failed\n{}".format(
+            completed, total, result["name"], result["region"], result["error"]), file=sys.stderr)
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Render gene plots for many regions")
+    parser.add_argument("annotation", help="gene_viz snapshot, tabix indexed file, GTF/GFF3 file or gffutils database")
+    parser.add_argument("region", nargs="*", help="regions to render, as [name=]contig:start-end")
+    parser.add_argument("--regions", help="BED file of regions to render")
+    parser.add_argument("--output", default=".", help="output directory")
+    parser.add_argument("--format", nargs="+", default=["html"], choices=export_formats, help="output formats")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--prefs", help="JSON file of GenePlot preferences")
+    parser.add_argument("--inline", action="store_true", help="include BokehJS in each HTML file")
+    parser.add_argument("--timings", help="write the per-region timings to this JSON file")
+    args = parser.parse_args(argv)
+
+    regions = [parse_region(x) for x in args.region]
+    if args.regions is not None:
+        regions.extend(read_regions(args.regions))
+    if len(regions) == 0:
+        parser.error("no regions given")
+
+    prefs = None
+    if args.prefs is not None:
+        with open(args.prefs) as f:
+            prefs = json.load(f)
+
+    started = timeit.default_timer()
+    results = export_regions(args.annotation, regions, args.output, args.format, prefs, args.processes,
+                             "inline" if args.inline else "cdn", _print_progress)
+    elapsed = timeit.default_timer() - started
+
+    failed = sum(result["error"] is not None for result in results)
+    print("Rendered {} of {} regions in {:.2f}s ({:.2f}s of task time)".format(
+        len(results) - failed, len(results), elapsed, sum(result["seconds"] for result in results)), file=sys.stderr)
+
+    if args.timings is not None:
+        with open(args.timings, "w") as f:
+            json.dump(results, f, indent=2)
+
+    return 1 if failed > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
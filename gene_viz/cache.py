@@ -0,0 +1,229 @@
+"""
+Caching of loaded transcripts
+
+Loading the transcripts for a region from an annotation database can be slow,
+and interactive viewers tend to request the same, or nearby, regions over and
+over. TranscriptCache keeps the results of recent queries in a bounded LRU cache,
+and answers queries for a sub-range of an already cached region without going
+back to the database.
+
+example usage
+>>> from gene_viz.cache import TranscriptCache
+>>> from gene_viz.utils import transcripts_from_gffutils
+>>> cache = TranscriptCache(max_bytes=512 * 1024 ** 2)
+>>> load = cache.loader(transcripts_from_gffutils)
+>>> transcripts = load(db, "chr2", 2210223, 2300331)
+>>> transcripts = load(db, "chr2", 2220000, 2230000)    # served from the cache
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+
+def estimate_size(transcripts):
+    """
+    Estimate the memory used by a list of transcripts, including their exons and coding regions
+
+    :param transcripts: A list of Transcript objects
+    :return: The approximate size in bytes
+    """
+    size = sys.getsizeof(transcripts)
+    for t in transcripts:
+        size += sys.getsizeof(t) + sys.getsizeof(t.transcript_id) + sys.getsizeof(t.gene_id)
+        size += sys.getsizeof(t.exons) + sys.getsizeof(t.cds)
+        size += sum(sys.getsizeof(e) + sys.getsizeof(e.exon_id) for e in t.exons)
+        size += sum(sys.getsizeof(c) for c in t.cds)
+    return size
+
+
+def genes_in_region(transcripts, start, end):
+    """
+    Select the transcripts of all genes overlapping a region
+
+    This matches the behaviour of the loaders in gene_viz.utils, which return all
+    transcripts of the genes overlapping the query region.
+
+    :param transcripts: A list of Transcript objects
+    :param start: Start position of the region
+    :param end: End position of the region
+    :return: A list of Transcript objects
+    """
+    extents = {}
+    for t in transcripts:
+        gene_start, gene_end = extents.get(t.gene_id, (t.start, t.end))
+        extents[t.gene_id] = (min(gene_start, t.start), max(gene_end, t.end))
+
+    return [t for t in transcripts if extents[t.gene_id][0] <= end and extents[t.gene_id][1] >= start]
+
+
+def source_key(loader, db):
+    """
+    The key identifying an annotation source in the cache
+    """
+    try:
+        hash(db)
+    except TypeError:
+        db = id(db)
+    return (loader, db)
+
+
+class TranscriptCache(object):
+    """
+    A bounded, thread-safe LRU cache of transcripts keyed on (source, contig, start, end)
+    """
+    def __init__(self, max_bytes=256 * 1024 ** 2, max_entries=None):
+        """
+        :param max_bytes: The approximate maximum memory used by the cached transcripts
+        :param max_entries: The maximum number of cached regions, or None for no limit
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __contains__(self, key):
+        source, contig, start, end = key
+        with self._lock:
+            return self._find(source, contig, start, end) is not None
+
+
+    @property
+    def size(self):
+        """
+        The approximate memory used by the cached transcripts, in bytes
+        """
+        return self._bytes
+
+
+    def _find(self, source, contig, start, end):
+        key = (source, contig, start, end)
+        if key in self._entries:
+            return key
+
+        # the most recently used region containing the query
+        for entry in reversed(self._entries):
+            if entry[0] == source and entry[1] == contig and entry[2] <= start and entry[3] >= end:
+                return entry
+
+        return None
+
+
+    def get(self, source, contig, start, end):
+        """
+        Look up the transcripts for a region
+
+        :param source: The source key, see source_key
+        :param contig: Name of the contig
+        :param start: Start position of the region
+        :param end: End position of the region
+        :return: A list of Transcript objects, or None if the region is not cached
+        """
+        with self._lock:
+            key = self._find(source, contig, start, end)
+            if key is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            transcripts = self._entries[key][0]
+
+        if key[2:] == (start, end):
+            return list(transcripts)
+        return genes_in_region(transcripts, start, end)
+
+
+    def put(self, source, contig, start, end, transcripts):
+        """
+        Add the transcripts for a region to the cache, evicting the least recently used regions if necessary
+        """
+        size = estimate_size(transcripts)
+        key = (source, contig, start, end)
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+
+            self._entries[key] = (list(transcripts), size)
+            self._bytes += size
+            self._evict()
+
+
+    def _evict(self):
+        while len(self._entries) > 1 and (
+                self._bytes > self.max_bytes or
+                (self.max_entries is not None and len(self._entries) > self.max_entries)):
+            self._bytes -= self._entries.popitem(last=False)[1][1]
+
+
+    def load(self, loader, db, contig, start, end):
+        """
+        Load the transcripts for a region, using the cache if possible
+
+        :param loader: A loader function with the signature of the gene_viz.utils loaders
+        :param db: The annotation source passed to the loader
+        :param contig: Name of contig to use in query
+        :param start: Start position of query
+        :param end: End position of query
+        :return: A list of Transcript objects
+        """
+        source = source_key(loader, db)
+
+        transcripts = self.get(source, contig, start, end)
+        if transcripts is None:
+            transcripts = loader(db, contig, start, end)
+            self.put(source, contig, start, end, transcripts)
+            transcripts = list(transcripts)
+
+        return transcripts
+
+
+    def loader(self, loader):
+        """
+        Wrap a loader function so that its results are cached
+
+        :param loader: A loader function with the signature of the gene_viz.utils loaders
+        :return: A function with the same signature, using this cache
+        """
+        def cached_loader(db, contig, start, end):
+            return self.load(loader, db, contig, start, end)
+
+        return cached_loader
+
+
+    def invalidate(self, source=None, contig=None, start=None, end=None):
+        """
+        Remove cached regions. With no arguments, the whole cache is cleared.
+
+        :param source: Only remove regions from this source key (see source_key)
+        :param contig: Only remove regions on this contig
+        :param start, end: Only remove regions overlapping this range
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if source is not None and key[0] != source:
+                    continue
+                if contig is not None and key[1] != contig:
+                    continue
+                if start is not None and key[3] < start:
+                    continue
+                if end is not None and key[2] > end:
+                    continue
+                self._bytes -= self._entries.pop(key)[1]
+
+
+    def clear(self):
+        """
+        Remove all cached regions
+        """
+        self.invalidate()
@@ -0,0 +1,154 @@
+"""
+Column buffers for building the data of bokeh data sources
+
+A ColumnBuffer is a dictionary of equal-length columns, which can be handed to a
+bokeh ColumnDataSource as it is. Columns are lists by default, or array.arrays of
+a fixed type for numeric columns, which are passed to bokeh as numpy arrays.
+
+pandas is only needed to export a buffer as a DataFrame.
+
+example usage
+>>> from gene_viz.columns import ColumnBuffer
+>>> columns = ColumnBuffer(("x0", "y0", "x1", "y1"), typecodes=dict(x0="q", x1="q"))
+>>> columns.append(100, 0, 250, 0)
+>>> columns.extend(dict(x0=[300], y0=[1], x1=[400], y1=[1]))
+>>> source = ColumnDataSource(data=columns.source_data())
+"""
+import array
+import sys
+
+
+class ColumnBuffer(dict):
+    """
+    A dictionary of equal-length columns
+    """
+    def __init__(self, column_names=(), length=0, fill=None, typecodes=None):
+        """
+        :param column_names: The names of the columns, in order
+        :param length: The number of rows to create
+        :param fill: The value of the created rows
+        :param typecodes: A dictionary mapping column names to array.array typecodes,
+                          for columns to be held as arrays rather than lists
+        """
+        super(ColumnBuffer, self).__init__()
+        self.typecodes = dict(typecodes or {})
+        for name in column_names:
+            self[name] = self._column(name, [fill] * length)
+
+
+    def _column(self, name, values):
+        if name in self.typecodes:
+            return array.array(self.typecodes[name], values)
+        return list(values)
+
+
+    @classmethod
+    def from_columns(cls, columns, typecodes=None):
+        """
+        Create a buffer from a dictionary of column sequences
+
+        :param columns: A dictionary mapping column names to sequences of values
+        :param typecodes: A dictionary mapping column names to array.array typecodes
+        :return: A ColumnBuffer
+        """
+        buffer = cls(typecodes=typecodes)
+        for name, values in columns.items():
+            buffer[name] = buffer._column(name, values)
+        return buffer
+
+
+    @classmethod
+    def concat(cls, buffers, column_names=None):
+        """
+        Concatenate the rows of several buffers
+
+        :param buffers: A list of ColumnBuffers, or dictionaries of columns, with the same columns
+        :param column_names: The columns of the result, by default those of the first buffer
+        :return: A new ColumnBuffer
+        """
+        buffers = list(buffers)
+        if column_names is None:
+            column_names = list(buffers[0]) if len(buffers) > 0 else []
+
+        typecodes = buffers[0].typecodes if len(buffers) > 0 and isinstance(buffers[0], ColumnBuffer) else None
+        result = cls(column_names, typecodes=typecodes)
+        for buffer in buffers:
+            result.extend(buffer)
+        return result
+
+
+    @property
+    def num_rows(self):
+        """
+        The number of rows in the buffer
+        """
+        return len(next(iter(self.values()))) if len(self) > 0 else 0
+
+
+    def append(self, *values, **named_values):
+        """
+        Append a row, given either as values in column order, or as values for each column name
+        """
+        if len(values) > 0 and len(named_values) > 0:
+            print("Error - row values must be given either in column order or by column name", file=sys.stderr)
+            raise ValueError("Row values must be given either in column order or by column name")
+
+        if len(values) > 0:
+            if len(values) != len(self):
+                print("Error - expected {} values, not {}".format(len(self), len(values)), file=sys.stderr)
+                raise ValueError("Expected {} values, not {}".format(len(self), len(values)))
+            named_values = dict(zip(self, values))
+
+        if set(named_values) != set(self):
+            print("Error - a value must be given for each of the columns {}".format(", ".join(self)),
+                  file=sys.stderr)
+            raise ValueError("A value must be given for each column")
+
+        for name, value in named_values.items():
+            self[name].append(value)
+
+
+    def extend(self, other):
+        """
+        Append the rows of another buffer, or dictionary of columns, with the same columns
+
+        :param other: A ColumnBuffer or dictionary mapping column names to sequences of values
+        """
+        if set(other) != set(self):
+            print("Error - columns {} don't match {}".format(", ".join(other), ", ".join(self)), file=sys.stderr)
+            raise ValueError("Columns don't match")
+
+        for name, column in self.items():
+            column.extend(other[name])
+
+
+    def copy(self):
+        """
+        :return: A copy of the buffer, with copies of its columns
+        """
+        return ColumnBuffer.from_columns(self, self.typecodes)
+
+
+    def source_data(self):
+        """
+        The columns in a form that bokeh can serialize, with array columns as numpy arrays
+
+        :return: A dictionary mapping column names to lists or numpy arrays
+        """
+        if len(self.typecodes) == 0:
+            return dict(self)
+
+        import numpy as np
+        # copied, so that the buffer can still grow
+        return {name: np.frombuffer(column, dtype=column.typecode).copy() if isinstance(column, array.array) else column
+                for name, column in self.items()}
+
+
+    def to_data_frame(self):
+        """
+        Export the columns as a pandas DataFrame (requires pandas)
+
+        :return: A pandas DataFrame
+        """
+        import pandas as pd
+        return pd.DataFrame({name: list(column) for name, column in self.items()}, columns=list(self))
@@ -1,7 +1,9 @@
 """
 Utilities for creating and manipulating data frames
+
+GenePlot builds its data as ColumnBuffers (see gene_viz.columns), so pandas is
+only imported when these functions are used, to export data as DataFrames.
 """
-import pandas as pd
 
 def make_data_frame(length, column_names):
     """
@@ -10,6 +12,7 @@ def make_data_frame(length, column_names):
     :param column_names: A list of column names
     :return: a pandas dataframe
     """
+    import pandas as pd
     if length is not None:
         return pd.DataFrame(index=range(length), columns=column_names)
     return pd.DataFrame(columns=column_names)
@@ -61,4 +64,16 @@ def concat_data(dataframe_list, dataframe_type):
     :param dataframe_type: The type of dataframe to be returned if list is empty
     :return: A single dataframe containing the concatenated data
     """
+    import pandas as pd
     return pd.concat(dataframe_list, ignore_index=True) if len(dataframe_list) > 0 else dataframe_type()
+
+
+def data_frame_from_columns(columns, dataframe_type):
+    """
+    Create a dataframe from a dictionary of column lists
+    :param columns: A dictionary mapping column names to lists of values
+    :param dataframe_type: The type of dataframe to be created
+    :return: A dataframe of type dataframe_type containing the column data
+    """
+    import pandas as pd
+    return pd.DataFrame(columns, columns=dataframe_type().columns)
@@ -6,12 +6,18 @@ defaults = dict(
     axis_location = "below",
     toolbar_location = "right",
     axis_height=35,
+    # bokeh output backend: "canvas", "svg" or "webgl"
+    output_backend = "canvas",
     row_height=12,
     min_height=50,
 
     exon_color = "DarkBlue",
     exon_outline_color = None,
     exon_outline_width = 1,
+    # "patches" draws each exon as a polygon, "quads" as a non-coding and a coding rectangle,
+    # which is much cheaper to send and draw for very many exons. The two look the same
+    # unless exon_outline_color is set, when quads also outline the ends of the coding part
+    exon_glyph = "patches",
     coding_exon_height = 0.7,
     noncoding_exon_height = 0.35,
 
@@ -21,6 +27,9 @@ defaults = dict(
     intron_marker_symbol = "v",
     intron_marker_alpha = 1,
     intron_width_percent = 0.015,
+    # how narrow introns are hidden when zooming: "alpha" sets their alpha values to 0,
+    # "filter" leaves the data untouched and filters them out with a CDSView
+    intron_visibility = "alpha",
 
     # intron arrow direction
     intron_marker_angle={
@@ -38,6 +47,45 @@ defaults = dict(
     label_font_size = "7pt",
 
     pack = False,
+    # "sorted" keeps the original size-sorted layout, "sweep" uses the fewest levels
+    pack_method = "sorted",
+
+    # level of detail: when zoomed out beyond lod_bp_per_pixel, draw the merged
+    # extents of each gene instead of the individual transcripts
+    level_of_detail = False,
+    lod_bp_per_pixel = 500,
+
+    # viewport culling (bokeh server): only send the transcripts overlapping the
+    # visible region, extended by viewport_margin times its width on each side
+    viewport_culling = False,
+    viewport_margin = 1.0,
+
+    # only send added, removed and moved transcripts to the browser
+    # when the transcripts change, rather than replacing all of the data
+    incremental = False,
+
+    # keep the shapes of transcripts between updates, so that re-packing or drawing a
+    # different subset of the transcripts only has to position them (see gene_viz.geometry).
+    # label_func and exon_color_func must always give the same result for a feature
+    geometry_cache = False,
+    geometry_cache_size = 20000,
+
+    # send the numeric columns to the browser as binary arrays rather than as JSON numbers,
+    # with the exon patches as flat arrays of vertices (see gene_viz.geometry)
+    binary_columns = True,
+
+    # record the time taken by each stage of an update, and the number of features drawn,
+    # see gene_viz.instrument. "serialize" also measures the size of the data sent to the browser
+    instrument = False,
+    # function called with the UpdateStats after each update, which also turns instrumentation on
+    instrument_func = False,
+
+    # multi-track plots (see gene_viz.tracks): the number of empty levels above each track,
+    # in which its name is drawn
+    track_gap = 1,
+    show_track_names = True,
+    track_name_font_size = "8pt",
+    track_name_color = "Gray",
 
     # functions can be provided to for custom formatting
     # labels
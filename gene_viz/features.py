@@ -1,32 +1,36 @@
 """
 feature definitions
+
+Features store their coordinates as plain integers and use __slots__, so that
+large annotations can be held in memory without the overhead of an instance
+dictionary and an interval object per feature.
 """
-from interval import interval
+import sys
 
 
 class Feature(object):
     """
     Base class for all features
     """
-    def __init__(self, contig="", start=0, end=0):
-        self.contig = contig
-        self.extents = interval[start, end]
-
-    @property
-    def start(self):
-        return int(self.extents[0][0])
+    __slots__ = ("contig", "start", "end")
 
-    @start.setter
-    def start(self, value):
-        self.extents = interval[value, self.end]
+    def __init__(self, contig="", start=0, end=0):
+        # contig names are shared by many features, so keep a single copy of each
+        self.contig = sys.intern(contig) if isinstance(contig, str) else contig
+        self.start = int(start)
+        self.end = int(end)
 
     @property
-    def end(self):
-        return int(self.extents[0][1])
+    def extents(self):
+        """
+        The extents of the feature as a pyinterval interval
+        """
+        from interval import interval
+        return interval[self.start, self.end]
 
-    @end.setter
-    def end(self, value):
-        self.extents = interval[self.start, value]
+    @extents.setter
+    def extents(self, value):
+        self.start, self.end = (int(x) for x in value[0])
 
     @property
     def size(self):
@@ -38,6 +42,8 @@ class Transcript(Feature):
     """
     Feature representing a transcript
     """
+    __slots__ = ("transcript_id", "gene_id", "exons", "cds", "strand", "draw_level")
+
     def __init__(self, transcript_id="", gene_id="", contig="", start=0, end=0, strand="+", exons=None, cds=None):
         super(Transcript, self).__init__(contig, start, end)
         self.transcript_id = transcript_id
@@ -57,6 +63,8 @@ class Exon(Feature):
     """
     Feature representing an exon
     """
+    __slots__ = ("exon_id",)
+
     def __init__(self, exon_id="", contig="", start=0, end=0):
         super(Exon, self).__init__(contig, start, end)
         self.exon_id = exon_id
@@ -66,5 +74,7 @@ class CDS(Feature):
     """
     Feature representing a coding region
     """
+    __slots__ = ()
+
     def __init__(self, contig="", start=0, end=0):
-        super(CDS, self).__init__(contig, start, end)
\ No newline at end of file
+        super(CDS, self).__init__(contig, start, end)
@@ -11,31 +11,69 @@ from bokeh.models import (
     CompositeTicker,
     NumeralTickFormatter,
     CustomJS,
+    CustomJSFilter,
+    CustomJSTransform,
+    CDSView,
 )
 
 from bokeh.plotting import figure, Figure
 
-# dataframe utilities
+# dataframe export, pandas is imported when these are used
 from .dataframes import (
     transcript_data_frame,
     transcript_label_data_frame,
     exon_data_frame,
     intron_data_frame,
-    append_data,
-    concat_data,
+    data_frame_from_columns,
 )
 
-# pyinterval for overlap testing
-from interval import interval
+# column data for the data sources
+from .columns import ColumnBuffer
+
+# batched glyph geometry
+from .geometry import (
+    column_names,
+    empty_columns,
+    transcript_y,
+    add_bounds,
+    add_label,
+    add_exons,
+    add_introns,
+    build_columns,
+    gene_columns,
+    GeometryCache,
+)
+
+# transcript packing
+from .packing import packers
+
+# region index for viewport culling
+from .index import TranscriptIndex
+
+# incremental data source updates
+from .incremental import SourceRows
+
+# update timing and feature counts
+from .instrument import update_timer, serialized_size
 
 # defaults
 from .defaults import defaults
 
-from .geneplot_callbacks import x_range_callback
+from .geneplot_callbacks import (
+    x_range_callback,
+    x_range_filter_callback,
+    intron_filter,
+    lod_callback,
+    exon_xs_transform,
+    exon_ys_transform,
+)
 
 # valid options for axis location
 axis_locations = ("above", "below")
 
+# valid options for the exon glyph
+exon_glyphs = ("patches", "quads")
+
 
 def zooming_ticker():
     """
@@ -56,14 +94,16 @@ def zooming_ticker():
 class GenePlot(object):
     def __init__(self, prefs={}):
 
-        # dictionary to hold the dataframes to be rendered
+        # dictionary to hold the data sources to be rendered
         self._gene_data = dict(
-            transcripts=CDS(self._placeholder()),
-            #coding_exons=CDS(exon_data_frame()),
-            #noncoding_exons=CDS(exon_data_frame()),
-            exons=CDS(exon_data_frame()),
-            introns=CDS(intron_data_frame()),
-            labels=CDS(transcript_label_data_frame())
+            transcripts=CDS(data=self._placeholder()),
+            exons=CDS(data=empty_columns("exons")),
+            exon_blocks=CDS(data=empty_columns("exon_blocks")),
+            exon_outlines=CDS(data=empty_columns("exon_outlines")),
+            exon_vertices=CDS(data=empty_columns("exon_vertices")),
+            introns=CDS(data=empty_columns("introns")),
+            labels=CDS(data=empty_columns("labels")),
+            genes=CDS(data=empty_columns("genes"))
         )
 
         # preferences
@@ -76,49 +116,110 @@ class GenePlot(object):
         # flag to indicate if the gene data to display has changed
         self._dirty_flag = False
 
+        # rows of the data sources belonging to each transcript, for incremental updates
+        self._source_rows = SourceRows()
+
+        # index over the transcripts, built on first use, and the window drawn for viewport culling
+        self._index = None
+        self._window = None
+
+        # shapes of the transcripts drawn in previous updates, created on first use
+        self._geometry_cache = None
+
+        # stage timings and feature counts of the last update, when instrumented
+        self._update_stats = None
+
+        # the number of regions loaded in the background, and the load in progress, see load_region
+        self._load_generation = 0
+        self._pending_load = None
+
         # create the plot
         self._figure = self._create_plot()
+        self._watch_x_range()
 
 
     @staticmethod
     def _placeholder():
-        temp_data = transcript_data_frame(1)
-        temp_data.iloc[0] = [0, 0, 0, 0]
-        return temp_data
+        return ColumnBuffer(column_names["transcripts"], length=1, fill=0)
 
 
     def _create_plot(self):
         fig = figure(width=800, height=100, tools=["xpan, xwheel_zoom, xbox_zoom, save, reset"],
                      active_scroll="xwheel_zoom",
                      toolbar_location=self.prefs["toolbar_location"], x_axis_location=self.prefs["axis_location"],
-                     x_range = (0,1), y_range=(-1, 1))
+                     x_range = (0,1), y_range=(-1, 1), output_backend=self.prefs["output_backend"])
+
+        # renderers which are only shown when zoomed in, for level-of-detail switching
+        self._detail_renderers = []
 
         # transcript center line
-        fig.segment(x0="x0", y0="y0", x1="x1", y1="y1", color=self.prefs["intron_line_color"],
-                    source=self._gene_data["transcripts"], name="transcripts")
+        self._detail_renderers.append(
+            fig.segment(x0="x0", y0="y0", x1="x1", y1="y1", color=self.prefs["intron_line_color"],
+                        source=self._gene_data["transcripts"], name="transcripts")
+        )
 
         # intron markers
-        fig.text(x="x", y="y", text=dict(value=self.prefs["intron_marker_symbol"]), angle="angle", angle_units="deg",
+        intron_args = dict(text_alpha="alpha")
+        if self.prefs["intron_visibility"] == "filter":
+            # hide narrow introns with a view on the data, instead of changing their alpha values
+            self._intron_view = CDSView(
+                source=self._gene_data["introns"],
+                filters=[CustomJSFilter(args=dict(x_range=fig.x_range),
+                                        code=intron_filter % self.prefs["intron_width_percent"])]
+            )
+            intron_args = dict(text_alpha=self.prefs["intron_marker_alpha"], view=self._intron_view)
+
+        self._detail_renderers.append(fig.text(x="x", y="y", text=dict(value=self.prefs["intron_marker_symbol"]), angle="angle", angle_units="deg",
                  text_align="center", text_baseline="middle", text_font="sans-serif", text_color=self.prefs["intron_marker_color"],
-                 text_font_style="bold", text_alpha="alpha", text_font_size=self.prefs["intron_marker_size"],
-                 source=self._gene_data["introns"], name="introns")
+                 text_font_style="bold", text_font_size=self.prefs["intron_marker_size"],
+                 source=self._gene_data["introns"], name="introns", **intron_args))
 
         # exons
-        fig.patches(xs="x", ys="y", fill_color="color", line_color=self.prefs["exon_outline_color"],
-                    line_width=self.prefs["exon_outline_width"], source=self._gene_data["exons"], name="exons")
+        if self.prefs["exon_glyph"] not in exon_glyphs:
+            print("Error - exon_glyph must be one of {}".format(", ".join(exon_glyphs)))
+            raise ValueError
+
+        if self.prefs["exon_glyph"] == "quads":
+            self._detail_renderers.append(
+                fig.quad(left="left", right="right", top="top", bottom="bottom", fill_color="color",
+                         line_color=self.prefs["exon_outline_color"], line_width=self.prefs["exon_outline_width"],
+                         source=self._gene_data["exon_blocks"], name="exons")
+            )
+        elif self.prefs["binary_columns"]:
+            # the outlines are assembled in the browser from the flat arrays of vertices
+            args = dict(outlines=self._gene_data["exon_outlines"], vertices=self._gene_data["exon_vertices"])
+            self._detail_renderers.append(
+                fig.patches(xs=dict(field="first", transform=CustomJSTransform(args=args, v_func=exon_xs_transform)),
+                            ys=dict(field="y", transform=CustomJSTransform(args=args, v_func=exon_ys_transform)),
+                            fill_color="color", line_color=self.prefs["exon_outline_color"],
+                            line_width=self.prefs["exon_outline_width"], source=self._gene_data["exon_outlines"],
+                            name="exons")
+            )
+        else:
+            self._detail_renderers.append(
+                fig.patches(xs="x", ys="y", fill_color="color", line_color=self.prefs["exon_outline_color"],
+                            line_width=self.prefs["exon_outline_width"], source=self._gene_data["exons"], name="exons")
+            )
 
         # transcript labels
         self._labels = fig.text(x="x", y="y", text="label", text_font_size=self.prefs["label_font_size"],
                                 text_align="center", text_baseline="middle", source=self._gene_data["labels"],
                                 text_font=self.prefs["label_font"], name="transcript_labels")
+        self._detail_renderers.append(self._labels)
+
+        # merged gene extents, shown instead of the transcripts when zoomed out
+        self._overview_renderers = []
+        if self.prefs["level_of_detail"]:
+            self._overview_renderers.append(
+                fig.quad(left="left", right="right", top="top", bottom="bottom", fill_color="color",
+                         line_color=self.prefs["exon_outline_color"], line_width=self.prefs["exon_outline_width"],
+                         source=self._gene_data["genes"], name="genes", visible=False)
+            )
 
         fig.yaxis.visible = False
         fig.xaxis.ticker = zooming_ticker()
         fig.xaxis.formatter = NumeralTickFormatter(format="0,0")
-        fig.x_range.callback = CustomJS(
-            args=dict(source=self._gene_data["introns"]),
-            code = x_range_callback % (self.prefs["intron_width_percent"], self.prefs["intron_marker_alpha"])
-        )
+        fig.x_range.callback = self._range_callback(fig)
 
         fig.xgrid.grid_line_color = None
         fig.ygrid.grid_line_color = None
@@ -127,11 +228,52 @@ class GenePlot(object):
         return fig
 
 
+    def _range_callback(self, fig):
+        """
+        Create the javascript callback run when the x-range of the figure changes
+
+        :param fig: The figure whose x-range the callback is attached to
+        :return: A bokeh CustomJS callback
+        """
+        args = dict(source=self._gene_data["introns"])
+        if self.prefs["intron_visibility"] == "filter":
+            args.update(view=self._intron_view)
+            code = x_range_filter_callback % self.prefs["intron_width_percent"]
+        else:
+            code = x_range_callback % (self.prefs["intron_width_percent"], self.prefs["intron_marker_alpha"])
+
+        if self.prefs["level_of_detail"]:
+            args.update(plot=fig, detail_renderers=self._detail_renderers, overview_renderers=self._overview_renderers)
+            code += lod_callback % self.prefs["lod_bp_per_pixel"]
+
+        return CustomJS(args=args, code=code)
+
+
+    def _update_level_of_detail(self):
+        """
+        Show either the detailed transcripts or the merged gene extents, depending on the current zoom level
+        """
+        if not self.prefs["level_of_detail"]:
+            return
+
+        bp_per_pixel = (self.x_range.end - self.x_range.start) / float(self._figure.plot_width)
+        overview = bp_per_pixel > self.prefs["lod_bp_per_pixel"]
+
+        for renderer in self._detail_renderers:
+            renderer.visible = not overview
+        for renderer in self._overview_renderers:
+            renderer.visible = overview
+
+
     def _get_transcript_y(self, transcript):
-        y = transcript.draw_level
-        if self.prefs["label_vert_position"] in ("above", "below"):
-            y *= 2
-        return y
+        return transcript_y(transcript, self.prefs)
+
+
+    def _get_intron_width(self):
+        """
+        The minimum width of an intron for its marker to be visible at the current zoom level
+        """
+        return self.prefs["intron_width_percent"] * (self.x_range.end - self.x_range.start)
 
 
     def _get_label_data(self, transcript):
@@ -142,30 +284,9 @@ class GenePlot(object):
 
         :return: A transcript_label_data_frame for the current transcript
         """
-        id_data = transcript_label_data_frame(1)
-        
-        label_func = self._prefs.get("label_func", False)
-        if label_func:
-            label = label_func(transcript)
-        else:
-            label = transcript.transcript_id
-
-        y = self._get_transcript_y(transcript)
-        x = (transcript.start + transcript.end) / 2
-
-        if self.prefs["label_vert_position"] == "above":
-            y -= 1
-        elif self.prefs["label_vert_position"] == "below":
-            y += 1
-
-        if self.prefs["label_horiz_position"] == "left":
-            x = transcript.start - 1
-        elif self.prefs["label_horiz_position"] == "right":
-            x = transcript.end
-
-        id_data.loc[0] = [x, y, label]
-
-        return id_data
+        columns = empty_columns("labels")
+        add_label(columns, transcript, self._get_transcript_y(transcript), self.prefs)
+        return data_frame_from_columns(columns, transcript_label_data_frame)
 
 
     def _get_transcript_bounds_data(self, transcript):
@@ -176,10 +297,9 @@ class GenePlot(object):
 
         :return: transcript_data_frame for the current transcript
         """
-        transcript_data = transcript_data_frame(1)
-        y = self._get_transcript_y(transcript)
-        transcript_data.loc[0] = [transcript.start, y, transcript.end, y]
-        return transcript_data
+        columns = empty_columns("transcripts")
+        add_bounds(columns, transcript, self._get_transcript_y(transcript))
+        return data_frame_from_columns(columns, transcript_data_frame)
 
 
     def _get_exon_data(self, transcript):
@@ -190,57 +310,9 @@ class GenePlot(object):
 
         :return: An exon_data_frame for the current transcript
         """
-        exons = transcript.exons
-        cds = transcript.cds
-
-        coding_exon_half_height = self.prefs["coding_exon_height"] / 2
-        noncoding_exon_half_height = self.prefs["noncoding_exon_height"] / 2
-
-        y = self._get_transcript_y(transcript)
-
-        cds_intervals = interval()
-        for c in cds:
-            cds_intervals |= interval[c.start, c.end]
-
-        exon_data = exon_data_frame(len(exons))
-
-        for i, exon in enumerate(exons):
-            exon_interval = interval[exon.start, exon.end]
-            intersection = exon_interval & cds_intervals
-
-            if len(intersection) > 0:
-                cds = intersection[0]
-
-                vertices = [(exon.start, noncoding_exon_half_height),
-                            (int(cds[0]), noncoding_exon_half_height),
-                            (int(cds[0]), coding_exon_half_height),
-                            (int(cds[1]), coding_exon_half_height),
-                            (int(cds[1]), noncoding_exon_half_height),
-                            (exon.end, noncoding_exon_half_height)]
-            else:
-                vertices = [(exon.start, noncoding_exon_half_height),
-                            (exon.end, noncoding_exon_half_height)]
-
-            if vertices[0][0] == vertices[1][0]:
-               vertices = vertices[2:]
-
-            if vertices[-2][0] == vertices[-1][0]:
-               vertices = vertices[:-2]
-
-            vertices += [(v[0], -v[1]) for v in vertices[::-1]]
-
-            xs = [v[0] for v in vertices]
-            ys = [y + v[1] for v in vertices]
-
-            color_func = self._prefs.get("exon_color_func", False)
-            if color_func:
-                color = color_func(exon)
-            else:
-                color = self.prefs["exon_color"]
-            
-            exon_data.loc[i] = [xs, ys, color]
-
-        return exon_data
+        columns = empty_columns("exons")
+        add_exons(columns, transcript, self._get_transcript_y(transcript), self.prefs)
+        return data_frame_from_columns(columns, exon_data_frame)
 
 
     def _get_intron_data(self, transcript):
@@ -250,39 +322,36 @@ class GenePlot(object):
 
         :return: an intron_data_frame for the introns of transcript
         """
-        intron_data = intron_data_frame()
-
-        exons = sorted(transcript.exons, key=lambda x: x.start)
-        if len(exons) < 2:
-            return intron_data
-
-        intron_width = self.prefs["intron_width_percent"] * (self.x_range.end - self.x_range.start)
-
-        y = self._get_transcript_y(transcript)
-
-        for exon in exons:
-            if exon is not exons[-1]:
-                next_exon = exons[exons.index(exon) + 1]
-                width = next_exon.start - exon.end
-                mid = exon.end + width / 2
-                intron_data.loc[len(intron_data)] = [mid, y, self.prefs["intron_marker_angle"][transcript.strand], width,
-                                                     self.prefs["intron_marker_alpha"] if width > intron_width else 0]
-
-        return intron_data
+        columns = empty_columns("introns")
+        add_introns(columns, transcript, self._get_transcript_y(transcript), self.prefs, self._get_intron_width())
+        return data_frame_from_columns(columns, intron_data_frame)
 
 
     def update(self, callback_fn=None):
+        """
+        Bring the figure up-to-date with the transcripts and preferences
+
+        :param callback_fn: A function called with no arguments once the update is complete.
+                            When instrumented, the stats of the update are available as update_stats
+        """
         #print("update gene plot, dirty={}".format(self._dirty_flag))
         if self._transcripts is None:
             return
 
-        self.pack(self._transcripts, self.prefs.get("pack", False))
+        timer = update_timer(self.prefs["instrument"] or self.prefs["instrument_func"])
+
+        self._assign_levels()
+        timer.lap("pack")
 
         try:
             num_levels = max([t.draw_level for t in self._transcripts])
         except ValueError:
             num_levels = 0
 
+        if timer.enabled:
+            timer.count("transcripts", len(self._transcripts))
+            timer.count("levels", num_levels + 1 if len(self._transcripts) > 0 else 0)
+
         if self.prefs["label_vert_position"] in ("above", "below"):
             num_levels *= 2
 
@@ -303,84 +372,194 @@ class GenePlot(object):
         self._labels.glyph.text_align = self.prefs["label_justify"]
         self._labels.glyph.x_offset = self.prefs["label_offset"][0]
         self._labels.glyph.y_offset = -self.prefs["label_offset"][1]
-
-        transcript_data = []
-        exon_data = []
-        intron_data = []
-        label_data = []
-
-        for transcript in self._transcripts:
-            if self._dirty_flag:
-                # center line from transcript start to transcript end
-                append_data(
-                    self._get_transcript_bounds_data(transcript),
-                    transcript_data
-                )
-
-                # labels
-                append_data(
-                    self._get_label_data(transcript),
-                    label_data
-                )
-
-                # exons
-                append_data(
-                    self._get_exon_data(transcript),
-                    exon_data
-                )
-
-                # introns / strand direction markers
-                append_data(
-                    self._get_intron_data(transcript),
-                    intron_data
-                )
-            else:
-                pass
-
+        timer.lap("layout")
 
         # update graph sources with new data
         if self._dirty_flag:
-            self._gene_data["transcripts"].data = CDS.from_df(concat_data(transcript_data, transcript_data_frame))
-            self._gene_data["exons"].data = CDS.from_df(concat_data(exon_data, exon_data_frame))
-            self._gene_data["introns"].data = CDS.from_df(concat_data(intron_data, intron_data_frame))
+            if self.prefs["exon_glyph"] == "quads":
+                exon_sources = ["exon_blocks"]
+            elif self.prefs["binary_columns"]:
+                # the vertices are assigned first, so that they are in place when the outlines change
+                exon_sources = ["exon_vertices", "exon_outlines"]
+            else:
+                exon_sources = ["exons"]
+            source_names = ["transcripts"] + exon_sources + ["introns"]
             if self.prefs["show_labels"]:
-                self._gene_data["labels"].data = CDS.from_df(concat_data(label_data, transcript_label_data_frame))
-        else:
-            pass
-            
+                source_names.append("labels")
+
+            intron_width = self._get_intron_width()
+            cache = self._get_geometry_cache()
+            build = timer.timed("build", lambda transcripts: build_columns(transcripts, self.prefs, intron_width, cache))
+            if timer.enabled and cache is not None:
+                hits, misses = cache.hits, cache.misses
+
+            # only the transcripts near the visible region are sent when culling
+            transcripts = self._drawn_transcripts()
+            timer.lap("cull")
+
+            # merged gene extents for the level-of-detail overview are always rebuilt
+            if self.prefs["level_of_detail"]:
+                self._gene_data["genes"].data = gene_columns(transcripts, self.prefs, self._gene_key).source_data()
+                timer.lap("genes")
+
+            # only send the difference to the previous transcripts if possible
+            if self.prefs["incremental"] and self._source_rows.apply(self._gene_data, transcripts,
+                                                                     self._transcript_key, build, source_names):
+                timer.lap("incremental")
+            else:
+                timer.skip()
+
+                # build the columns for all transcripts in one pass and hand them straight to the sources
+                columns = build(transcripts)
+                for name in source_names:
+                    self._gene_data[name].data = columns[name].source_data()
+
+                if self.prefs["incremental"]:
+                    self._source_rows.reset(transcripts, self._transcript_key, source_names)
+                else:
+                    self._source_rows.clear()
+                timer.lap("assign")
+
+            if timer.enabled:
+                timer.count("drawn_transcripts", len(transcripts))
+                if cache is not None:
+                    timer.count("shape_hits", cache.hits - hits)
+                    timer.count("shape_misses", cache.misses - misses)
+                for name in source_names:
+                    timer.count("{}_rows".format(name), len(next(iter(self._gene_data[name].data.values()))))
+                if self.prefs["instrument"] == "serialize":
+                    timer.skip()
+                    for name in source_names:
+                        timer.count("{}_bytes".format(name), serialized_size(self._gene_data[name]))
+                    timer.lap("serialize")
+
+        self._update_level_of_detail()
+        timer.lap("lod")
+
         # everything up-to-date
         self._dirty_flag = False
 
+        self._update_stats = timer.finish()
+
+        if self.prefs["instrument_func"]:
+            self.prefs["instrument_func"](self._update_stats)
+
         if callback_fn is not None:
             callback_fn()
 
 
+    def _assign_levels(self):
+        """
+        Assign the draw level of each transcript
+        """
+        self.pack(self._transcripts, self.prefs.get("pack", False), self.prefs.get("pack_method", "sorted"))
+
+
+    def _get_geometry_cache(self):
+        """
+        The cache of transcript shapes, or None if the geometry_cache preference is off
+        """
+        if not self.prefs["geometry_cache"]:
+            self._geometry_cache = None
+        elif self._geometry_cache is None:
+            self._geometry_cache = GeometryCache(self.prefs["geometry_cache_size"])
+        else:
+            self._geometry_cache.max_entries = self.prefs["geometry_cache_size"]
+        return self._geometry_cache
+
+
+    def _drawn_transcripts(self):
+        """
+        The transcripts to send to the browser
+
+        With viewport culling enabled, only the transcripts overlapping the visible
+        region, extended on both sides by viewport_margin times its width, are drawn.
+        The drawn window is recorded so that range changes inside it need no update.
+
+        :return: A list of Transcript objects
+        """
+        if not self.prefs["viewport_culling"]:
+            return self._transcripts
+
+        start, end = self.x_range.start, self.x_range.end
+        margin = self.prefs["viewport_margin"] * (end - start)
+        self._window = (start - margin, end + margin)
+        return self.index.overlapping(*self._window)
+
+
+    def _on_x_range_change(self, attr, old, new):
+        """
+        Send the transcripts for a new region when the visible range moves outside of the drawn window
+        (bokeh server only)
+        """
+        if self._transcripts is None or self._window is None:
+            return
+
+        start, end = self.x_range.start, self.x_range.end
+        if end <= start:
+            # part way through setting a new range
+            return
+
+        window_start, window_end = self._window
+        width = end - start
+
+        # re-cull when scrolled outside of the window, or zoomed in far enough
+        # that the window holds much more than is needed
+        outside = start < window_start or end > window_end
+        too_wide = window_end - window_start > 2 * (1 + 2 * self.prefs["viewport_margin"]) * width
+
+        if outside or too_wide:
+            self._dirty_flag = True
+            self.update()
+
+
+    def _watch_x_range(self):
+        """
+        Attach the python-side x-range callbacks used for viewport culling
+        """
+        if self.prefs["viewport_culling"]:
+            self.x_range.on_change("start", self._on_x_range_change)
+            self.x_range.on_change("end", self._on_x_range_change)
+
+
+    @staticmethod
+    def _transcript_key(transcript):
+        """
+        The key identifying a transcript between incremental updates
+        """
+        return transcript.transcript_id
+
+
+    @staticmethod
+    def _gene_key(transcript):
+        """
+        The key identifying the gene of a transcript, for the level-of-detail overview
+        """
+        return transcript.gene_id
+
+
     @staticmethod
-    def pack(transcripts, packed=False):
+    def pack(transcripts, packed=False, method="sorted"):
         """
         Determine the vertical positions for the transcripts
 
         :param transcripts: A list of Transcript objects
         :param pack: a boolean indicating if transcripts should be densely packed
                      or drawn as ordered
+        :param method: the packing algorithm, see gene_viz.packing.
+                       "sorted" (the default) gives the original size-sorted layout, "sweep" uses the fewest levels
         """
         if len(transcripts) == 0:
             return
             
         if packed:
-            # simple packing to minimize vertical space used
-            sorted_t = sorted(transcripts, key=lambda x: (x.size, x.start))
-            packed_t = [sorted_t[0]]
-            packed_t[-1].draw_level = 0
-
-            for t1 in sorted_t[1:]:
-                t1.draw_level = 0
-                for t2 in packed_t:
-                    if len(t1.extents & t2.extents) > 0:
-                        if t2.draw_level >= t1.draw_level:
-                            t1.draw_level = t2.draw_level + 1
-
-                packed_t.append(t1)
+            try:
+                packer = packers[method]
+            except KeyError:
+                print("Error - packing method must be one of {}".format(", ".join(sorted(packers))))
+                raise ValueError
+
+            packer(transcripts)
         else:
             # don't pack, draw in the order that transcripts are provided
             for i, t in enumerate(transcripts):
@@ -396,6 +575,7 @@ class GenePlot(object):
         """
         assert isinstance(other, Figure), "Error - other must be a bokeh figure object"
         self.figure.x_range = other.x_range
+        self._watch_x_range()
 
 
     @property
@@ -406,9 +586,141 @@ class GenePlot(object):
     @transcripts.setter
     def transcripts(self, value):
         self._transcripts = value
+        self._index = None
         self._dirty_flag = True
 
 
+    def add_transcripts(self, transcripts):
+        """
+        Add transcripts to the plot, updating the index without rebuilding it
+
+        :param transcripts: A list of Transcript objects
+        """
+        transcripts = list(transcripts)
+        self._transcripts = (self._transcripts or []) + transcripts
+        if self._index is not None:
+            self._index.add(transcripts)
+        self._dirty_flag = True
+
+
+    def remove_transcripts(self, transcripts):
+        """
+        Remove transcripts from the plot, updating the index without rebuilding it
+
+        :param transcripts: A list of the Transcript objects to remove
+        """
+        transcripts = list(transcripts)
+        removed = set(map(id, transcripts))
+        self._transcripts = [t for t in self._transcripts or [] if id(t) not in removed]
+        if self._index is not None:
+            self._index.remove(transcripts)
+        self._dirty_flag = True
+
+
+    def load_region(self, loader, db, contig, start, end, x_range=None, executor=None, callback_fn=None):
+        """
+        Load the transcripts for a region in the background, then show them (bokeh server only)
+
+        Call from a bokeh server callback. The load runs in an executor, see gene_viz.aio, and
+        once it finishes the transcripts are set and update() is scheduled on the document with
+        add_next_tick_callback. Loading another region before the load finishes cancels it.
+
+        :param loader: A loader function with the signature of the gene_viz.utils loaders
+        :param db: The annotation source passed to the loader
+        :param contig: Name of contig to use in query
+        :param start: Start position of query
+        :param end: End position of query
+        :param x_range: A (start, end) tuple to show once loaded, by default the x-range is left as it is
+        :param executor: A concurrent.futures executor, or None for the event loop's default thread pool
+        :param callback_fn: A function called with no arguments once the update is complete
+        :return: An asyncio Task, see load_region_async
+        """
+        import asyncio
+        return asyncio.ensure_future(
+            self.load_region_async(loader, db, contig, start, end, x_range, executor, callback_fn))
+
+
+    async def load_region_async(self, loader, db, contig, start, end, x_range=None, executor=None,
+                                callback_fn=None):
+        """
+        Coroutine loading the transcripts for a region in an executor, then showing them
+
+        When the figure belongs to a document, the plot is updated in a next tick callback of the
+        document, so that the models are changed while the document is locked. Otherwise it is
+        updated before returning.
+
+        :param loader: A loader function with the signature of the gene_viz.utils loaders
+        :param db: The annotation source passed to the loader
+        :param contig: Name of contig to use in query
+        :param start: Start position of query
+        :param end: End position of query
+        :param x_range: A (start, end) tuple to show once loaded, by default the x-range is left as it is
+        :param executor: A concurrent.futures executor, or None for the event loop's default thread pool
+        :param callback_fn: A function called with no arguments once the update is complete
+        :return: The list of loaded transcripts, or None if the load was superseded by a later one
+        """
+        import asyncio
+        from functools import partial
+        from .aio import load_future
+
+        # a later load supersedes this one, cancelling it if it hasn't started
+        self._load_generation += 1
+        generation = self._load_generation
+        if self._pending_load is not None:
+            self._pending_load.cancel()
+
+        future = self._pending_load = load_future(loader, db, contig, start, end, executor)
+        try:
+            transcripts = await future
+        except asyncio.CancelledError:
+            if generation != self._load_generation:
+                return None
+            raise
+        finally:
+            if self._pending_load is future:
+                self._pending_load = None
+
+        if generation != self._load_generation:
+            return None
+
+        show = partial(self._show_loaded_region, generation, transcripts, x_range, callback_fn)
+        if self._figure.document is None:
+            show()
+        else:
+            self._figure.document.add_next_tick_callback(show)
+        return transcripts
+
+
+    def _show_loaded_region(self, generation, transcripts, x_range, callback_fn):
+        # another load may have started since this callback was scheduled
+        if generation != self._load_generation:
+            return
+
+        self.transcripts = transcripts
+        if x_range is not None:
+            self.x_range = x_range
+        self.update(callback_fn)
+
+
+    @property
+    def index(self):
+        """
+        A TranscriptIndex over the transcripts, for overlap and nearest transcript queries
+        """
+        if self._index is None:
+            self._index = TranscriptIndex(self._transcripts or ())
+        return self._index
+
+
+    @property
+    def update_stats(self):
+        """
+        The UpdateStats of the last update, see gene_viz.instrument.
+        None unless the instrument or instrument_func preference is set
+        """
+        return self._update_stats
+
+
     @property
     def figure(self):
         return self._figure
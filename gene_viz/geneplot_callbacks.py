@@ -1,21 +1,131 @@
+# rows of the intron source in order of increasing width, and a binary search for the
+# first intron wide enough to be visible at the current threshold.
+# The order is cached on the source and rebuilt whenever the width column is replaced
+intron_cutoff = """
+var widths = source.data["width"];
+var order = source._gene_viz_intron_order;
+if (order === undefined || order.widths !== widths || order.length !== widths.length)
+{
+    var index = new Uint32Array(widths.length);
+    for (var i=0; i<index.length; i++)
+        index[i] = i;
+    index.sort(function(a, b) { return widths[a] - widths[b]; });
+
+    var sorted = new Float64Array(index.length);
+    for (var i=0; i<index.length; i++)
+        sorted[i] = widths[index[i]];
+
+    // cutoff of -1 marks that the visibility has not been set since the data changed
+    order = {widths: widths, length: widths.length, index: index, sorted: sorted, cutoff: -1};
+    source._gene_viz_intron_order = order;
+}
+
+var lo = 0;
+var hi = order.sorted.length;
+while (lo < hi)
+{
+    var mid = (lo + hi) >>> 1;
+    if (order.sorted[mid] < threshold)
+        lo = mid + 1;
+    else
+        hi = mid;
+}
+var cutoff = lo;
+"""
+
 x_range_callback = """
 var start = cb_obj.start;
 var end = cb_obj.end;
 var width = end - start;
 var threshold = %f * width;     // threshold factor is set from python-side configuration
 var intron_alpha = %f;          // alpha value is set from python-side configuration
+""" + intron_cutoff + """
+// only introns between the previous and the new cutoff change visibility
+var alpha = source.data["alpha"];
+var index = order.index;
+if (order.cutoff < 0)
+{
+    for (var k=0; k<index.length; k++)
+        alpha[index[k]] = k < cutoff ? 0 : intron_alpha;
+}
+else
+{
+    for (var k=cutoff; k<order.cutoff; k++)
+        alpha[index[k]] = intron_alpha;
+    for (var k=order.cutoff; k<cutoff; k++)
+        alpha[index[k]] = 0;
+}
 
-// iterate over each intron
-var data = source.data;
-for (i=0; i<data["x"].length; i++)
+// only re-render when something changed
+if (cutoff != order.cutoff)
 {
-    // if the screen-space width is large enough, make the intron visible
-    if(data["width"][i] >= threshold)
-        data["alpha"][i] = intron_alpha;
-    else
-    // otherwise, make the intron fully transparent
-        data["alpha"][i] = 0;
+    order.cutoff = cutoff;
+    source.change.emit();
 }
+"""
 
-source.change.emit();
-"""
\ No newline at end of file
+# CDSView filter variant, which leaves the intron data untouched
+intron_filter = """
+var threshold = %f * (x_range.end - x_range.start);     // threshold factor is set from python-side configuration
+""" + intron_cutoff + """
+order.cutoff = cutoff;
+return Array.from(order.index.subarray(cutoff));
+"""
+
+x_range_filter_callback = """
+var threshold = %f * (cb_obj.end - cb_obj.start);       // threshold factor is set from python-side configuration
+""" + intron_cutoff + """
+// only re-filter when the set of visible introns changed
+if (cutoff != order.cutoff)
+{
+    view.compute_indices();
+    view.change.emit();
+}
+"""
+
+lod_callback = """
+// level of detail: show merged gene extents instead of the transcripts when zoomed out
+// (plot_width rather than inner_width, which the python side can't know, so that both switch at the same zoom)
+var bp_per_pixel = (cb_obj.end - cb_obj.start) / plot.plot_width;
+var overview = bp_per_pixel > %f;   // threshold is set from python-side configuration
+
+if (overview_renderers[0].visible != overview)
+{
+    for (var j=0; j<detail_renderers.length; j++)
+        detail_renderers[j].visible = !overview;
+    for (var j=0; j<overview_renderers.length; j++)
+        overview_renderers[j].visible = overview;
+}
+"""
+
+# exon outlines from flat arrays of vertices (binary_columns): the x coordinates of each
+# exon are a view on the vertex array, starting at its first vertex
+exon_xs_transform = """
+var first = xs;
+var count = outlines.data["count"];
+var x = vertices.data["x"];
+var outline_xs = new Array(first.length);
+for (var i=0; i<first.length; i++)
+{
+    var end = first[i] + count[i];
+    outline_xs[i] = x.subarray ? x.subarray(first[i], end) : x.slice(first[i], end);
+}
+return outline_xs;
+"""
+
+# and the y coordinates are the center line of the exon, offset by the vertex offsets
+exon_ys_transform = """
+var center = xs;
+var first = outlines.data["first"];
+var count = outlines.data["count"];
+var h = vertices.data["h"];
+var outline_ys = new Array(center.length);
+for (var i=0; i<center.length; i++)
+{
+    var ys = new Float64Array(count[i]);
+    for (var j=0; j<ys.length; j++)
+        ys[j] = center[i] + h[first[i] + j];
+    outline_ys[i] = ys;
+}
+return outline_ys;
+"""
@@ -0,0 +1,683 @@
+"""
+Batched construction of glyph geometry for a collection of transcripts
+
+The functions in this module build the data for all of the GenePlot glyphs
+in a single pass over the transcripts, emitting plain column lists which can
+be assigned directly to a bokeh ColumnDataSource. Exon polygons are built for
+all transcripts at once using numpy.
+
+Apart from their y coordinates, the glyphs of a transcript only depend on its
+coordinates and a few preferences. GeometryCache keeps these shapes between
+updates, so that re-packing or showing a different subset of the transcripts
+only has to position them.
+
+With the binary_columns preference, the numeric columns are built as typed
+arrays, which bokeh sends to the browser as binary data rather than as JSON
+numbers. The exon patches are then sent as two sources: the vertices of all
+exons as flat arrays, and for each exon its first vertex and vertex count.
+"""
+from collections import OrderedDict
+from itertools import accumulate, chain, repeat
+from operator import attrgetter
+
+import numpy as np
+
+from .columns import ColumnBuffer
+
+
+# column names for each of the data sources
+column_names = dict(
+    transcripts=("x0", "y0", "x1", "y1"),
+    labels=("x", "y", "label"),
+    exons=("x", "y", "color"),
+    exon_blocks=("left", "right", "top", "bottom", "color"),
+    exon_outlines=("first", "count", "y", "color"),
+    exon_vertices=("x", "h"),
+    introns=("x", "y", "angle", "width", "alpha"),
+    genes=("left", "right", "top", "bottom", "color"),
+)
+
+# array.array typecodes of the numeric columns of each data source, for the binary_columns
+# preference. Positions are 32 bit integers, and y coordinates 32 bit floats
+column_typecodes = dict(
+    transcripts=dict(x0="i", y0="f", x1="i", y1="f"),
+    labels=dict(x="d", y="f"),
+    exons=dict(),
+    exon_blocks=dict(left="i", right="i", top="f", bottom="f"),
+    exon_outlines=dict(first="i", count="i", y="f"),
+    exon_vertices=dict(x="i", h="f"),
+    introns=dict(x="d", y="f", angle="f", width="i", alpha="f"),
+    genes=dict(left="i", right="i", top="f", bottom="f"),
+)
+
+# the columns of each data source which depend on the draw level of a transcript
+level_columns = dict(
+    transcripts=("y0", "y1"),
+    labels=("y",),
+    exons=("y",),
+    exon_blocks=("top", "bottom"),
+    exon_outlines=("y",),
+    introns=("y",),
+)
+
+_start = attrgetter("start")
+_end = attrgetter("end")
+_span = attrgetter("start", "end")
+
+# preferences which change the shape of the glyphs of a transcript
+shape_prefs = (
+    "coding_exon_height",
+    "noncoding_exon_height",
+    "exon_color",
+    "exon_color_func",
+    "exon_glyph",
+    "label_func",
+    "label_horiz_position",
+    "label_vert_position",
+    "intron_marker_angle",
+    "intron_marker_alpha",
+)
+
+
+def empty_columns(source_name):
+    """
+    Create an empty set of columns for a data source
+    :param source_name: The name of the data source, one of the keys of column_names
+    :return: A ColumnBuffer of empty lists
+    """
+    return ColumnBuffer(column_names[source_name])
+
+
+def typed_columns(source_name, columns):
+    """
+    Convert the numeric columns of a data source to typed arrays, which bokeh sends as binary data
+
+    Missing values (None) in floating point columns become NaN. Positions which don't
+    fit in a 32 bit integer are sent as 64 bit floats instead.
+
+    :param source_name: The name of the data source, one of the keys of column_typecodes
+    :param columns: A dictionary of column lists
+    :return: A ColumnBuffer
+    """
+    typecodes = column_typecodes[source_name]
+    columns = {name: [np.nan if value is None else value for value in values]
+                     if typecodes.get(name) in ("f", "d") and None in values else values
+               for name, values in columns.items()}
+    try:
+        return ColumnBuffer.from_columns(columns, typecodes)
+    except OverflowError:
+        return ColumnBuffer.from_columns(columns, {name: "d" if typecode == "i" else typecode
+                                                   for name, typecode in typecodes.items()})
+
+
+def level_y(draw_level, prefs):
+    """
+    Determine the vertical position of a draw level
+    :param draw_level: The draw level
+    :param prefs: The GenePlot preferences
+    :return: The y coordinate of the center line of transcripts at the level
+    """
+    y = draw_level
+    if prefs["label_vert_position"] in ("above", "below"):
+        y *= 2
+    return y
+
+
+def transcript_y(transcript, prefs):
+    """
+    Determine the vertical position of a transcript
+    :param transcript: A Transcript object with a draw_level
+    :param prefs: The GenePlot preferences
+    :return: The y coordinate of the transcript center line
+    """
+    return level_y(transcript.draw_level, prefs)
+
+
+def add_bounds(columns, transcript, y):
+    """
+    Append the center line of a transcript to a set of transcript columns
+    """
+    columns["x0"].append(transcript.start)
+    columns["y0"].append(y)
+    columns["x1"].append(transcript.end)
+    columns["y1"].append(y)
+
+
+def add_label(columns, transcript, y, prefs):
+    """
+    Append the label of a transcript to a set of label columns
+    """
+    label_func = prefs.get("label_func", False)
+    if label_func:
+        label = label_func(transcript)
+    else:
+        label = transcript.transcript_id
+
+    x = (transcript.start + transcript.end) / 2
+
+    if prefs["label_vert_position"] == "above":
+        y -= 1
+    elif prefs["label_vert_position"] == "below":
+        y += 1
+
+    if prefs["label_horiz_position"] == "left":
+        x = transcript.start - 1
+    elif prefs["label_horiz_position"] == "right":
+        x = transcript.end
+
+    columns["x"].append(x)
+    columns["y"].append(y)
+    columns["label"].append(label)
+
+
+def coding_parts(transcripts):
+    """
+    Find the coding part of the exons of a list of transcripts
+
+    The coding part of every exon is found in a single vectorized step: the CDS
+    segments of each transcript are merged into sorted, non-overlapping blocks,
+    and each exon is clipped against the first block it overlaps using searchsorted.
+    To do this for all transcripts at once, the coordinates of each transcript are
+    shifted into their own, non-overlapping, range.
+
+    :param transcripts: A list of Transcript objects
+    :return: A tuple of the exons, and arrays of the index of the transcript of each exon, the exon
+             start and end, whether it is coding, and the start and end of its coding part
+    """
+    exons = [exon for transcript in transcripts for exon in transcript.exons]
+    exon_index = np.repeat(np.arange(len(transcripts)), [len(t.exons) for t in transcripts])
+    exon_start = np.fromiter((e.start for e in exons), dtype=np.int64, count=len(exons))
+    exon_end = np.fromiter((e.end for e in exons), dtype=np.int64, count=len(exons))
+
+    cds = [c for transcript in transcripts for c in transcript.cds]
+
+    coding = np.zeros(len(exons), dtype=bool)
+    coding_start = exon_start
+    coding_end = exon_end
+
+    if len(exons) > 0 and len(cds) > 0:
+        cds_index = np.repeat(np.arange(len(transcripts)), [len(t.cds) for t in transcripts])
+        cds_start = np.fromiter((c.start for c in cds), dtype=np.int64, count=len(cds))
+        cds_end = np.fromiter((c.end for c in cds), dtype=np.int64, count=len(cds))
+
+        # shift each transcript into its own coordinate range, leaving a gap
+        # between transcripts so that their CDS blocks are never merged
+        lowest = min(exon_start.min(), cds_start.min())
+        stride = max(exon_end.max(), cds_end.max()) - lowest + 2
+        exon_shift = exon_index * stride - lowest
+        cds_shift = cds_index * stride - lowest
+
+        # merge the (closed) CDS intervals of each transcript into sorted blocks
+        order = np.argsort(cds_start + cds_shift, kind="mergesort")
+        sorted_start = (cds_start + cds_shift)[order]
+        sorted_end = (cds_end + cds_shift)[order]
+        first = np.flatnonzero(np.append(True, sorted_start[1:] > np.maximum.accumulate(sorted_end)[:-1]))
+        block_start = sorted_start[first]
+        block_end = np.maximum.reduceat(sorted_end, first)
+
+        # clip each exon against the first CDS block that it overlaps
+        shifted_start = exon_start + exon_shift
+        shifted_end = exon_end + exon_shift
+        block = np.searchsorted(block_end, shifted_start, side="left")
+        coding = block < len(block_end)
+        block = np.minimum(block, len(block_end) - 1)
+        coding &= block_start[block] <= shifted_end
+        coding_start = np.maximum(block_start[block], shifted_start) - exon_shift
+        coding_end = np.minimum(block_end[block], shifted_end) - exon_shift
+
+    return exons, exon_index, exon_start, exon_end, coding, coding_start, coding_end
+
+
+def exon_outlines(transcripts, prefs):
+    """
+    Create the outlines of the exon patches for a list of transcripts, relative to the transcript center line
+
+    :param transcripts: A list of Transcript objects
+    :param prefs: The GenePlot preferences
+    :return: A tuple of the exons, the index of the transcript of each exon, and (exons x 12) arrays
+             of the x coordinates and y offsets of the polygon vertices, with a mask of the vertices to keep
+    """
+    exons, exon_index, exon_start, exon_end, coding, coding_start, coding_end = coding_parts(transcripts)
+    if len(exons) == 0:
+        return exons, exon_index, np.zeros((0, 12)), np.zeros((0, 12)), np.zeros((0, 12), dtype=bool)
+
+    coding_exon_half_height = prefs["coding_exon_height"] / 2
+    noncoding_exon_half_height = prefs["noncoding_exon_height"] / 2
+
+    # the upper outline of each exon as 6 vertices, of which only the
+    # first and last are used for non-coding exons
+    xs = np.column_stack((exon_start, coding_start, coding_start, coding_end, coding_end, exon_end))
+    hs = np.tile([noncoding_exon_half_height, noncoding_exon_half_height,
+                  coding_exon_half_height, coding_exon_half_height,
+                  noncoding_exon_half_height, noncoding_exon_half_height], (len(exons), 1))
+
+    keep = np.ones(xs.shape, dtype=bool)
+    keep[~coding, 1:5] = False
+    # remove vertical edges of zero length at the ends of the exon
+    head = np.where(coding, exon_start == coding_start, exon_start == exon_end)
+    tail = np.where(coding, coding_end == exon_end, exon_start == exon_end)
+    keep[head, 0:2] = False
+    keep[tail, 4:6] = False
+
+    # mirror the upper outline to close the polygon
+    xs = np.hstack((xs, xs[:, ::-1]))
+    hs = np.hstack((hs, -hs[:, ::-1]))
+    keep = np.hstack((keep, keep[:, ::-1]))
+
+    return exons, exon_index, xs, hs, keep
+
+
+def exon_colors(exons, prefs):
+    """
+    The fill color of each of a list of exons
+    """
+    color_func = prefs.get("exon_color_func", False)
+    if color_func:
+        return [color_func(exon) for exon in exons]
+    return [prefs["exon_color"]] * len(exons)
+
+
+def exon_columns(transcripts, ys, prefs):
+    """
+    Create the exon patches for a list of transcripts
+
+    :param transcripts: A list of Transcript objects
+    :param ys: The y coordinate of each transcript
+    :param prefs: The GenePlot preferences
+    :return: A dictionary of exon column lists
+    """
+    columns = empty_columns("exons")
+
+    exons, exon_index, xs, hs, keep = exon_outlines(transcripts, prefs)
+    if len(exons) == 0:
+        return columns
+
+    flat_x = xs[keep].tolist()
+    flat_y = (np.asarray(ys, dtype=float)[exon_index][:, None] + hs)[keep].tolist()
+    offsets = np.concatenate(([0], np.cumsum(keep.sum(axis=1)))).tolist()
+
+    columns["x"] = [flat_x[i:j] for i, j in zip(offsets, offsets[1:])]
+    columns["y"] = [flat_y[i:j] for i, j in zip(offsets, offsets[1:])]
+    columns["color"] = exon_colors(exons, prefs)
+
+    return columns
+
+
+def exon_vertex_columns(transcripts, ys, prefs):
+    """
+    Create the exon patches for a list of transcripts as flat arrays of vertices
+
+    :param transcripts: A list of Transcript objects
+    :param ys: The y coordinate of each transcript
+    :param prefs: The GenePlot preferences
+    :return: A tuple of dictionaries of exon outline column lists, with the first vertex, vertex count,
+             center line and color of each exon, and of exon vertex column lists, with the x coordinate
+             and offset from the center line of each vertex
+    """
+    outlines = empty_columns("exon_outlines")
+    vertices = empty_columns("exon_vertices")
+
+    exons, exon_index, xs, hs, keep = exon_outlines(transcripts, prefs)
+    if len(exons) == 0:
+        return outlines, vertices
+
+    counts = keep.sum(axis=1)
+    outlines["first"] = (np.cumsum(counts) - counts).tolist()
+    outlines["count"] = counts.tolist()
+    outlines["y"] = np.asarray(ys, dtype=float)[exon_index].tolist()
+    outlines["color"] = exon_colors(exons, prefs)
+
+    vertices["x"] = xs[keep].tolist()
+    vertices["h"] = hs[keep].tolist()
+
+    return outlines, vertices
+
+
+def exon_block_columns(transcripts, ys, prefs):
+    """
+    Create the exons of a list of transcripts as rectangles, rather than polygons
+
+    Each exon is drawn as two rows: a block spanning the whole exon at the non-coding
+    height, followed by a block spanning its coding part at the coding height. The
+    second block of a non-coding exon has no top and bottom, so isn't drawn. Filled
+    without an outline, this looks the same as the exon patches.
+
+    :param transcripts: A list of Transcript objects
+    :param ys: The y coordinate of each transcript
+    :param prefs: The GenePlot preferences
+    :return: A dictionary of exon block column lists
+    """
+    columns = empty_columns("exon_blocks")
+
+    exons, exon_index, exon_start, exon_end, coding, coding_start, coding_end = coding_parts(transcripts)
+    if len(exons) == 0:
+        return columns
+
+    y = np.asarray(ys, dtype=float)[exon_index]
+    half_heights = np.array([prefs["noncoding_exon_height"], prefs["coding_exon_height"]]) / 2
+
+    columns["left"] = np.column_stack((exon_start, coding_start)).ravel().tolist()
+    columns["right"] = np.column_stack((exon_end, coding_end)).ravel().tolist()
+    columns["top"] = (y[:, None] - half_heights).ravel().tolist()
+    columns["bottom"] = (y[:, None] + half_heights).ravel().tolist()
+
+    for i in (2 * np.flatnonzero(~coding) + 1).tolist():
+        columns["top"][i] = None
+        columns["bottom"][i] = None
+
+    columns["color"] = [color for color in exon_colors(exons, prefs) for _ in range(2)]
+    return columns
+
+
+def add_exons(columns, transcript, y, prefs):
+    """
+    Append the exon patches of a transcript to a set of exon columns
+    """
+    for name, values in exon_columns([transcript], [y], prefs).items():
+        columns[name].extend(values)
+
+
+def add_introns(columns, transcript, y, prefs, intron_width):
+    """
+    Append the intron / strand direction markers of a transcript to a set of intron columns
+    :param intron_width: The minimum width of an intron for its marker to be visible
+    """
+    exons = sorted(transcript.exons, key=lambda x: x.start)
+    if len(exons) < 2:
+        return
+
+    angle = prefs["intron_marker_angle"][transcript.strand]
+    alpha = prefs["intron_marker_alpha"]
+
+    for exon, next_exon in zip(exons, exons[1:]):
+        width = next_exon.start - exon.end
+        columns["x"].append(exon.end + width / 2)
+        columns["y"].append(y)
+        columns["angle"].append(angle)
+        columns["width"].append(width)
+        columns["alpha"].append(alpha if width > intron_width else 0)
+
+
+def gene_columns(transcripts, prefs, key=None):
+    """
+    Create blocks spanning the merged extents of each gene, used as a simplified
+    view of the transcripts when zoomed out
+
+    Each gene is drawn at the position of its top-most transcript.
+
+    :param transcripts: A list of Transcript objects with assigned draw levels
+    :param prefs: The GenePlot preferences
+    :param key: A function returning the key identifying the gene of a transcript, by default its gene_id
+    :return: A dictionary of gene column lists
+    """
+    genes = {}
+    for transcript in transcripts:
+        y = transcript_y(transcript, prefs)
+        gene = transcript.gene_id if key is None else key(transcript)
+        extents = genes.get(gene)
+        if extents is None:
+            genes[gene] = [transcript.start, transcript.end, y]
+        else:
+            extents[0] = min(extents[0], transcript.start)
+            extents[1] = max(extents[1], transcript.end)
+            extents[2] = min(extents[2], y)
+
+    half_height = prefs["coding_exon_height"] / 2
+
+    columns = empty_columns("genes")
+    for start, end, y in genes.values():
+        columns["left"].append(start)
+        columns["right"].append(end)
+        columns["top"].append(y - half_height)
+        columns["bottom"].append(y + half_height)
+        columns["color"].append(prefs["exon_color"])
+
+    if prefs.get("binary_columns"):
+        return typed_columns("genes", columns)
+    return columns
+
+
+def row_counts(transcript):
+    """
+    The number of rows that a transcript contributes to each data source
+    :param transcript: A Transcript object
+    :return: A dictionary mapping data source names to row counts
+    """
+    num_exons = len(transcript.exons)
+    return dict(
+        transcripts=1,
+        labels=1,
+        exons=num_exons,
+        exon_blocks=2 * num_exons,
+        exon_outlines=num_exons,
+        introns=max(num_exons - 1, 0),
+    )
+
+
+def build_columns(transcripts, prefs, intron_width, cache=None):
+    """
+    Build the data for all glyphs of a collection of transcripts in a single pass
+
+    :param transcripts: A list of Transcript objects with assigned draw levels
+    :param prefs: The GenePlot preferences
+    :param intron_width: The minimum width of an intron for its marker to be visible
+    :param cache: A GeometryCache to take the shapes of the transcripts from, or None to build them
+    :return: A dictionary mapping data source names to ColumnBuffers, whose numeric columns are
+             typed arrays if the binary_columns preference is set
+    """
+    if cache is not None:
+        return assemble_columns(transcripts, cache.shapes(transcripts, prefs), prefs, intron_width)
+
+    columns = {name: empty_columns(name) for name in column_names}
+    ys = []
+
+    for transcript in transcripts:
+        y = transcript_y(transcript, prefs)
+        ys.append(y)
+        add_bounds(columns["transcripts"], transcript, y)
+        add_label(columns["labels"], transcript, y, prefs)
+        add_introns(columns["introns"], transcript, y, prefs, intron_width)
+
+    # exons are built for all transcripts at once
+    if prefs.get("exon_glyph") == "quads":
+        columns["exon_blocks"] = exon_block_columns(transcripts, ys, prefs)
+    elif prefs.get("binary_columns"):
+        columns["exon_outlines"], columns["exon_vertices"] = exon_vertex_columns(transcripts, ys, prefs)
+    else:
+        columns["exons"] = exon_columns(transcripts, ys, prefs)
+
+    if prefs.get("binary_columns"):
+        return {name: typed_columns(name, source_columns) for name, source_columns in columns.items()}
+    return columns
+
+
+def shape_key(prefs):
+    """
+    The preferences which change the shape of the glyphs of a transcript, as a hashable key
+    """
+    return tuple(tuple(sorted(value.items())) if isinstance(value, dict) else value
+                 for value in (prefs.get(name) for name in shape_prefs))
+
+
+def coordinate_hash(transcript):
+    """
+    A hash of the coordinates of a transcript, its exons and coding regions
+    """
+    return hash((transcript.start, transcript.end, transcript.strand,
+                 tuple(map(_span, transcript.exons)), tuple(map(_span, transcript.cds))))
+
+
+class TranscriptShape(object):
+    """
+    The glyphs of a transcript, without its y coordinate
+    """
+    __slots__ = (
+        "label", "label_x",
+        "exon_x", "exon_y", "exon_color",
+        "intron_x", "intron_width", "intron_angle",
+    )
+
+
+def transcript_shapes(transcripts, prefs):
+    """
+    Build the shapes of a list of transcripts
+
+    :param transcripts: A list of Transcript objects
+    :param prefs: The GenePlot preferences
+    :return: A list of TranscriptShape objects
+    """
+    # the glyphs of a transcript at y = 0, with all intron markers visible
+    columns = {name: empty_columns(name) for name in ("labels", "introns")}
+    for transcript in transcripts:
+        add_label(columns["labels"], transcript, 0, prefs)
+        add_introns(columns["introns"], transcript, 0, prefs, 0)
+
+    # exon blocks are cheap to build, so only exon patches are kept in the shapes
+    if prefs.get("exon_glyph") == "quads":
+        exons = empty_columns("exons")
+    else:
+        exons = exon_columns(transcripts, [0] * len(transcripts), prefs)
+    label_text, label_x = columns["labels"]["label"], columns["labels"]["x"]
+    exon_x, exon_y, exon_color = exons["x"], exons["y"], exons["color"]
+    intron_x, intron_width, intron_angle = (columns["introns"][name] for name in ("x", "width", "angle"))
+
+    num_exons = [len(t.exons) for t in transcripts]
+    exon_offsets = np.concatenate(([0], np.cumsum(num_exons))).tolist()
+    intron_offsets = np.concatenate(([0], np.cumsum([max(n - 1, 0) for n in num_exons]))).tolist()
+
+    shapes = []
+    for i in range(len(transcripts)):
+        shape = TranscriptShape()
+        shape.label = label_text[i]
+        shape.label_x = label_x[i]
+
+        first, last = exon_offsets[i], exon_offsets[i + 1]
+        shape.exon_x = exon_x[first:last]
+        shape.exon_y = exon_y[first:last]
+        shape.exon_color = exon_color[first:last]
+
+        first, last = intron_offsets[i], intron_offsets[i + 1]
+        shape.intron_x = intron_x[first:last]
+        shape.intron_width = intron_width[first:last]
+        shape.intron_angle = intron_angle[first] if last > first else None
+
+        shapes.append(shape)
+
+    return shapes
+
+
+def assemble_columns(transcripts, shapes, prefs, intron_width):
+    """
+    Position the shapes of a list of transcripts at their draw levels
+
+    :param transcripts: A list of Transcript objects with assigned draw levels
+    :param shapes: The TranscriptShape of each transcript
+    :param prefs: The GenePlot preferences
+    :param intron_width: The minimum width of an intron for its marker to be visible
+    :return: A dictionary mapping data source names to dictionaries of column lists, as build_columns
+    """
+    columns = {name: empty_columns(name) for name in column_names}
+    flatten = chain.from_iterable
+
+    ys = [transcript_y(t, prefs) for t in transcripts]
+    bounds = columns["transcripts"]
+    bounds["x0"] = list(map(_start, transcripts))
+    bounds["y0"] = ys
+    bounds["x1"] = list(map(_end, transcripts))
+    bounds["y1"] = list(ys)
+
+    label_offset = dict(above=-1, below=1).get(prefs["label_vert_position"], 0)
+    labels = columns["labels"]
+    labels["x"] = [shape.label_x for shape in shapes]
+    labels["y"] = [y + label_offset for y in ys]
+    labels["label"] = [shape.label for shape in shapes]
+
+    if prefs.get("exon_glyph") == "quads":
+        columns["exon_blocks"] = exon_block_columns(transcripts, ys, prefs)
+    elif prefs.get("binary_columns"):
+        # the shapes hold the outline of each exon at y = 0, which are the vertex offsets
+        outlines, vertices = columns["exon_outlines"], columns["exon_vertices"]
+        outlines["count"] = [len(outline) for shape in shapes for outline in shape.exon_x]
+        outlines["first"] = list(accumulate(chain((0,), outlines["count"])))[:-1]
+        outlines["y"] = list(flatten(repeat(y, len(shape.exon_x)) for y, shape in zip(ys, shapes)))
+        outlines["color"] = list(flatten(shape.exon_color for shape in shapes))
+        vertices["x"] = list(flatten(flatten(shape.exon_x for shape in shapes)))
+        vertices["h"] = list(flatten(flatten(shape.exon_y for shape in shapes)))
+    else:
+        exons = columns["exons"]
+        exons["x"] = list(flatten(shape.exon_x for shape in shapes))
+        exons["color"] = list(flatten(shape.exon_color for shape in shapes))
+        exons["y"] = [[y + h for h in outline] for y, shape in zip(ys, shapes) for outline in shape.exon_y]
+
+    alpha = prefs["intron_marker_alpha"]
+    introns = columns["introns"]
+    introns["x"] = list(flatten(shape.intron_x for shape in shapes))
+    introns["width"] = list(flatten(shape.intron_width for shape in shapes))
+    introns["y"] = list(flatten(repeat(y, len(shape.intron_x)) for y, shape in zip(ys, shapes)))
+    introns["angle"] = list(flatten(repeat(shape.intron_angle, len(shape.intron_x)) for shape in shapes))
+    introns["alpha"] = [alpha if width > intron_width else 0 for width in introns["width"]]
+
+    if prefs.get("binary_columns"):
+        return {name: typed_columns(name, source_columns) for name, source_columns in columns.items()}
+    return columns
+
+
+class GeometryCache(object):
+    """
+    A bounded LRU cache of transcript shapes, keyed on the transcript id, a hash
+    of its coordinates and the preferences which change its shape
+
+    Functions given as the label_func and exon_color_func preferences are assumed
+    to always return the same result for a transcript or exon.
+    """
+    def __init__(self, max_entries=20000):
+        """
+        :param max_entries: The maximum number of transcript shapes to keep
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def shapes(self, transcripts, prefs):
+        """
+        The shapes of a list of transcripts, building those which aren't cached
+
+        :param transcripts: A list of Transcript objects
+        :param prefs: The GenePlot preferences
+        :return: A list of TranscriptShape objects
+        """
+        prefs_key = shape_key(prefs)
+        keys = [(t.transcript_id, coordinate_hash(t), prefs_key) for t in transcripts]
+
+        entries = self._entries
+        shapes = [entries.get(key) for key in keys]
+        missing = [i for i, shape in enumerate(shapes) if shape is None]
+
+        for key, shape in zip(keys, shapes):
+            if shape is not None:
+                entries.move_to_end(key)
+
+        if len(missing) > 0:
+            for i, shape in zip(missing, transcript_shapes([transcripts[i] for i in missing], prefs)):
+                shapes[i] = shape
+                entries[keys[i]] = shape
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+        self.hits += len(shapes) - len(missing)
+        self.misses += len(missing)
+        return shapes
+
+
+    def clear(self):
+        """
+        Remove all cached shapes
+        """
+        self._entries.clear()
@@ -0,0 +1,317 @@
+"""
+Streaming reader for GTF and GFF3 annotation files
+
+Transcripts are read directly from a (plain or gzip compressed) annotation
+file, without building a database first. Only the transcripts of the gene
+currently being read are held in memory: they are yielded as soon as the next
+gene starts, so memory use is bounded by the size of the largest gene rather
+than the size of the file.
+
+This relies on the file being sorted by contig and position, with the
+features of each gene grouped together, as in the GENCODE and Ensembl
+distributions, or sorted by position alone as for tabix indexing. GFF3 exons
+and CDS which come before their transcript are held until the transcript is
+read, up to the end of the contig. Unsorted files can be read with
+presorted=False, in which case all transcripts are kept until the end of the
+file.
+
+example usage
+>>> from gene_viz.gff import read_transcripts
+>>> for transcript in read_transcripts("gencode.v27.basic.annotation.gtf.gz", "chr22", 42124000, 42180000):
+...     print(transcript.transcript_id)
+"""
+import gzip
+
+from .features import Transcript, Exon, CDS
+
+
+# feature types representing genes in GFF3 files
+gff3_gene_types = frozenset(("gene", "ncRNA_gene", "pseudogene"))
+
+# feature types that are never treated as transcripts in GFF3 files
+gff3_non_transcript_types = frozenset((
+    "exon", "CDS", "five_prime_UTR", "three_prime_UTR", "UTR", "start_codon", "stop_codon",
+    "Selenocysteine", "chromosome", "region", "biological_region", "supercontig", "scaffold",
+))
+
+
+def open_annotation(path):
+    """
+    Open an annotation file for reading as text, decompressing it if it is gzip or bgzip compressed
+
+    :param path: Path to the file
+    :return: A text file object
+    """
+    with open(path, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+
+    if compressed:
+        return gzip.open(path, "rt")
+    return open(path, "r")
+
+
+def detect_format(path):
+    """
+    Determine whether a file is GTF or GFF3 from its name
+
+    :param path: Path to the file
+    :return: "gtf" or "gff3"
+    """
+    name = path.lower()
+    for suffix in (".gz", ".bgz"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+
+    if name.endswith(".gtf"):
+        return "gtf"
+    if name.endswith(".gff") or name.endswith(".gff3"):
+        return "gff3"
+
+    # sniff the attributes column of the first feature line
+    with open_annotation(path) as f:
+        for line in f:
+            if not line.startswith("#"):
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) >= 9 and '"' not in fields[8] and "=" in fields[8]:
+                    return "gff3"
+                return "gtf"
+
+    return "gtf"
+
+
+def parse_gtf_attributes(text):
+    """
+    Parse the attributes column of a GTF line, keeping the first value of each attribute
+
+    :param text: The attributes column, e.g. 'gene_id "G1"; transcript_id "T1";'
+    :return: A dictionary of attribute values
+    """
+    attributes = {}
+    for item in text.split(";"):
+        key, _, value = item.strip().partition(" ")
+        if key and key not in attributes:
+            attributes[key] = value.strip().strip('"')
+    return attributes
+
+
+def parse_gff3_attributes(text):
+    """
+    Parse the attributes column of a GFF3 line
+
+    :param text: The attributes column, e.g. 'ID=T1;Parent=G1'
+    :return: A dictionary of attribute values
+    """
+    attributes = {}
+    for item in text.split(";"):
+        key, _, value = item.strip().partition("=")
+        if key:
+            attributes[key] = value
+    return attributes
+
+
+class _Pending(object):
+    """
+    A transcript which is still being read
+    """
+    __slots__ = ("transcript", "gene")
+
+    def __init__(self, transcript, gene):
+        self.transcript = transcript
+        self.gene = gene
+
+
+def _records(lines):
+    """
+    Split annotation lines into (contig, featuretype, start, end, strand, attributes) records
+    """
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        fields = line.rstrip("\n").split("\t")
+        if len(fields) < 9:
+            continue
+        yield fields[0], fields[2], int(fields[3]), int(fields[4]), fields[6], fields[8]
+
+
+def read_transcripts(source, contig=None, start=None, end=None, fmt=None, presorted=True):
+    """
+    Read transcripts from a GTF or GFF3 file
+
+    As with the loaders in gene_viz.utils, a region query returns all transcripts
+    of the genes overlapping the region.
+
+    :param source:    Path to a GTF/GFF3 file (optionally gzip compressed), or an iterable of lines
+    :param contig:    Only read transcripts on this contig
+    :param start:     Start position of the region to read
+    :param end:       End position of the region to read
+    :param fmt:       "gtf" or "gff3", detected from the file name if not given
+    :param presorted: True if the file is sorted by contig and position, with the features of
+                      each gene grouped together. Allows transcripts to be yielded as soon as they
+                      are complete, and reading to stop once the region has been passed
+    :return:          A generator of Transcript objects
+    """
+    if isinstance(source, str):
+        fmt = fmt or detect_format(source)
+        with open_annotation(source) as lines:
+            for transcript in _read(lines, fmt, contig, start, end, presorted):
+                yield transcript
+    else:
+        for transcript in _read(source, fmt or "gtf", contig, start, end, presorted):
+            yield transcript
+
+
+def _read(lines, fmt, contig, start, end, presorted):
+    region_start = float("-inf") if start is None else start
+    region_end = float("inf") if end is None else end
+    parse_attributes = parse_gtf_attributes if fmt == "gtf" else parse_gff3_attributes
+
+    pending = {}            # transcript key -> _Pending
+    open_genes = {}         # gene key -> keys of its transcripts
+
+    # book-keeping for the open genes
+    gene_spans = {}         # gene key -> [start, end]
+    gene_ids = {}           # gene key -> gene_id
+    parents = {}            # GFF3 transcript ID -> transcript key
+    gene_parents = {}       # gene key -> GFF3 transcript IDs of its transcripts
+
+    # GFF3 exons and CDS read before their transcript, which position sorted files put first
+    # when they share a start position. GFF3 transcript ID -> (featuretype, start, end, exon_id)
+    orphans = {}
+
+    current_contig = None
+    current_gene = None
+    seen_contig = False
+
+    def select(record):
+        # keep the transcripts of genes overlapping the region
+        gene_start, gene_end = gene_spans[record.gene]
+        if gene_start <= region_end and gene_end >= region_start:
+            return record.transcript
+        return None
+
+    def close_gene(gene):
+        # the gene and its transcripts are complete once the next gene starts
+        selected = [select(pending.pop(key)) for key in open_genes.pop(gene, ())]
+        gene_spans.pop(gene, None)
+        gene_ids.pop(gene, None)
+        for transcript_id in gene_parents.pop(gene, ()):
+            parents.pop(transcript_id, None)
+        return [t for t in selected if t is not None]
+
+    def flush_all():
+        # children whose transcript hasn't been read by the end of the contig have no transcript
+        selected = [select(record) for record in pending.values()]
+        pending.clear()
+        open_genes.clear()
+        gene_spans.clear()
+        gene_ids.clear()
+        parents.clear()
+        gene_parents.clear()
+        orphans.clear()
+        return [t for t in selected if t is not None]
+
+    def add_child(record, featuretype, seqid, feature_start, feature_end, exon_id):
+        t = record.transcript
+        t.start = min(t.start, feature_start)
+        t.end = max(t.end, feature_end)
+        if featuretype == "exon":
+            t.add_exon(Exon(exon_id, seqid, feature_start, feature_end))
+        elif featuretype == "CDS":
+            t.add_cds(CDS(seqid, feature_start, feature_end))
+
+    for seqid, featuretype, feature_start, feature_end, strand, attribute_text in _records(lines):
+        if contig is not None and seqid != contig:
+            if seen_contig and presorted:
+                # moved past the requested contig
+                break
+            continue
+        seen_contig = True
+
+        if presorted and seqid != current_contig:
+            for t in flush_all():
+                yield t
+            current_contig = seqid
+            current_gene = None
+
+        # find the gene and the transcript(s) each line belongs to
+        if fmt == "gtf":
+            if featuretype not in ("gene", "transcript", "exon", "CDS"):
+                continue
+            attributes = parse_attributes(attribute_text)
+            gene = attributes.get("gene_id")
+            if gene is None:
+                continue
+            gene_ids[gene] = gene
+            transcript_keys = [attributes["transcript_id"]] if "transcript_id" in attributes else []
+        elif featuretype in gff3_gene_types:
+            attributes = parse_attributes(attribute_text)
+            gene = attributes.get("ID", "")
+            gene_ids[gene] = attributes.get("gene_id", gene)
+            transcript_keys = []
+            featuretype = "gene"
+        elif featuretype in ("exon", "CDS"):
+            attributes = parse_attributes(attribute_text)
+            transcript_keys = []
+            for parent in attributes.get("Parent", "").split(","):
+                if parent not in parents:
+                    # attached when the transcript is read
+                    exon_id = attributes.get("exon_id", attributes.get("ID", ""))
+                    orphans.setdefault(parent, []).append((featuretype, feature_start, feature_end, exon_id))
+                elif parents[parent] in pending:
+                    transcript_keys.append(parents[parent])
+            if len(transcript_keys) == 0:
+                continue
+            gene = pending[transcript_keys[0]].gene
+        elif featuretype not in gff3_non_transcript_types:
+            attributes = parse_attributes(attribute_text)
+            if "ID" not in attributes:
+                continue
+            gene = attributes.get("Parent", attributes["ID"]).split(",")[0]
+            gene_ids.setdefault(gene, attributes.get("gene_id", gene))
+            parents[attributes["ID"]] = attributes.get("transcript_id", attributes["ID"])
+            gene_parents.setdefault(gene, []).append(attributes["ID"])
+            transcript_keys = [parents[attributes["ID"]]]
+            featuretype = "transcript"
+        else:
+            continue
+
+        if presorted and gene != current_gene:
+            if current_gene is not None:
+                for t in close_gene(current_gene):
+                    yield t
+            current_gene = gene
+
+            # genes are sorted by start position, so no later gene can overlap the region
+            if contig is not None and feature_start > region_end and gene not in gene_spans:
+                break
+
+        span = gene_spans.get(gene)
+        if span is None:
+            gene_spans[gene] = [feature_start, feature_end]
+        else:
+            span[0] = min(span[0], feature_start)
+            span[1] = max(span[1], feature_end)
+
+        for key in transcript_keys:
+            record = pending.get(key)
+            if record is None:
+                t = Transcript(key, gene_ids.get(gene, gene), seqid, feature_start, feature_end, strand)
+                record = _Pending(t, gene)
+                pending[key] = record
+                open_genes.setdefault(gene, []).append(key)
+
+            if featuretype == "transcript":
+                t = record.transcript
+                t.start, t.end, t.strand = feature_start, feature_end, strand
+                if fmt == "gff3":
+                    for child in orphans.pop(attributes["ID"], ()):
+                        add_child(record, child[0], seqid, child[1], child[2], child[3])
+                    span = gene_spans[gene]
+                    span[0] = min(span[0], t.start)
+                    span[1] = max(span[1], t.end)
+            else:
+                exon_id = attributes.get("exon_id", attributes.get("ID", "") if fmt == "gff3" else "")
+                add_child(record, featuretype, seqid, feature_start, feature_end, exon_id)
+
+    for t in flush_all():
+        yield t
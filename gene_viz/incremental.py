@@ -0,0 +1,207 @@
+"""
+Incremental updates of the GenePlot data sources
+
+Rather than replacing the data of every ColumnDataSource when the transcripts
+change, the rows belonging to each transcript are tracked so that only the
+difference between two sets of transcripts needs to be sent to the browser:
+
+* added transcripts are appended using ColumnDataSource.stream
+* transcripts whose draw level changed have their y columns patched
+* removed transcripts have their rows patched so that nothing is drawn
+
+Rows of removed transcripts are left in place, so a full rebuild is requested
+once they make up too large a fraction of a data source.
+
+With the binary_columns preference, the exon vertices aren't tracked by transcript.
+Vertices are only ever appended, streamed along with the exon outlines which refer
+to them, and are left in place when their outlines are removed.
+"""
+from .geometry import column_names, level_columns, row_counts
+
+
+# values patched into the rows of removed transcripts so that they are not drawn
+# (None is sent to the browser as null, which bokeh treats as a missing value)
+tombstones = dict(
+    transcripts=dict(y0=None, y1=None),
+    labels=dict(y=None, label=""),
+    exons=dict(x=[], y=[]),
+    exon_blocks=dict(top=None, bottom=None),
+    exon_outlines=dict(count=0),
+    introns=dict(y=None),
+)
+
+# data sources whose rows refer to the rows of another data source, which is streamed along with them:
+# the name of the other source, and the column of first rows, which is offset by the length of the other source
+linked_sources = dict(
+    exon_outlines=("exon_vertices", "first"),
+)
+
+# data sources which are only streamed along with another source
+_linked_rows = set(other for other, _ in linked_sources.values())
+
+
+def transcript_signature(transcript):
+    """
+    A cheap summary of the shape of a transcript, used to detect when a
+    transcript id is reused for a transcript with different coordinates
+    """
+    return (transcript.start, transcript.end, transcript.strand, len(transcript.exons), len(transcript.cds))
+
+
+def missing_value(column, value):
+    """
+    The value to patch into a column for a missing value, NaN for typed floating point columns
+    (which would otherwise store None as zero in the browser), and value otherwise
+    """
+    if value is None and getattr(column, "dtype", None) is not None and column.dtype.kind == "f":
+        return float("nan")
+    return value
+
+
+class SourceRows(object):
+    """
+    Keeps track of the rows of each data source that belong to each transcript
+    """
+    def __init__(self, max_dead_fraction=0.5):
+        """
+        :param max_dead_fraction: The fraction of rows in a data source that may belong to
+                                  removed transcripts before a full rebuild is required
+        """
+        self.max_dead_fraction = max_dead_fraction
+        self.clear()
+
+
+    def clear(self):
+        """
+        Forget all tracked rows, so that the next update is a full rebuild
+        """
+        self._rows = {}
+        self._state = {}
+        self._length = {}
+        self._dead = {}
+        self._valid = False
+
+
+    def reset(self, transcripts, key, source_names):
+        """
+        Record the rows of each transcript after the data sources have been fully rebuilt
+
+        :param transcripts: The transcripts, in the order they were added to the data sources
+        :param key: A function returning a unique key for a transcript
+        :param source_names: The names of the data sources that were rebuilt
+        """
+        self.clear()
+        self._length = {name: 0 for name in source_names if name not in _linked_rows}
+        self._dead = {name: 0 for name in self._length}
+
+        for transcript in transcripts:
+            k = key(transcript)
+            if k in self._rows:
+                # duplicate keys can't be tracked, always rebuild
+                self.clear()
+                return
+            self._add_rows(k, transcript)
+
+        self._valid = True
+
+
+    def _add_rows(self, k, transcript):
+        counts = row_counts(transcript)
+        self._rows[k] = {}
+        for name in self._length:
+            self._rows[k][name] = (self._length[name], counts[name])
+            self._length[name] += counts[name]
+        self._state[k] = (transcript.draw_level, transcript_signature(transcript))
+
+
+    def apply(self, gene_data, transcripts, key, build, source_names):
+        """
+        Bring the data sources up-to-date with a new set of transcripts using stream and patch
+
+        :param gene_data: A dictionary mapping data source names to ColumnDataSources
+        :param transcripts: The new list of Transcript objects, with assigned draw levels
+        :param key: A function returning a unique key for a transcript
+        :param build: A function creating the columns for a list of transcripts
+        :param source_names: The names of the data sources to update
+        :return: True if the data sources were updated, False if a full rebuild is required
+        """
+        if not self._valid or set(self._length) != set(name for name in source_names if name not in _linked_rows):
+            return False
+
+        current = {}
+        for transcript in transcripts:
+            k = key(transcript)
+            if k in current:
+                return False
+            current[k] = transcript
+
+        removed = set(k for k in self._rows
+                      if k not in current or self._state[k][1] != transcript_signature(current[k]))
+        added = [t for k, t in current.items() if k not in self._rows or k in removed]
+        moved = [t for k, t in current.items()
+                 if k in self._rows and k not in removed and self._state[k][0] != t.draw_level]
+
+        # check whether too much of a data source would be taken up by removed transcripts
+        for name in self._length:
+            dead = self._dead[name] + sum(self._rows[k][name][1] for k in removed)
+            length = self._length[name] + sum(row_counts(t)[name] for t in added)
+            if dead > self.max_dead_fraction * length:
+                return False
+
+        patches = {name: {} for name in self._length}
+
+        # hide the rows of removed transcripts
+        for k in removed:
+            for name, (first, count) in self._rows.pop(k).items():
+                for column, value in tombstones[name].items():
+                    value = missing_value(gene_data[name].data[column], value)
+                    patches[name].setdefault(column, []).extend((i, value) for i in range(first, first + count))
+                self._dead[name] += count
+            del self._state[k]
+
+        # move transcripts with a new draw level
+        if len(moved) > 0:
+            columns = build(moved)
+            offsets = {name: 0 for name in self._length}
+            for transcript in moved:
+                k = key(transcript)
+                for name, (first, count) in self._rows[k].items():
+                    offset = offsets[name]
+                    for column in level_columns[name]:
+                        patches[name].setdefault(column, []).extend(
+                            (first + i, columns[name][column][offset + i]) for i in range(count)
+                        )
+                    offsets[name] += count
+                self._state[k] = (transcript.draw_level, self._state[k][1])
+
+        for name, patch in patches.items():
+            if len(patch) > 0:
+                gene_data[name].patch(patch)
+
+        # append new transcripts
+        if len(added) > 0:
+            columns = build(added)
+            for transcript in added:
+                self._add_rows(key(transcript), transcript)
+            for name in self._length:
+                if len(next(iter(columns[name].values()))) > 0:
+                    self._stream(gene_data, columns, name)
+
+        return True
+
+
+    @staticmethod
+    def _stream(gene_data, columns, name):
+        """
+        Stream the columns of a data source, and of a source linked to it
+        """
+        data = columns[name].source_data()
+
+        if name in linked_sources:
+            other, first_column = linked_sources[name]
+            data = dict(data)
+            data[first_column] = data[first_column] + len(gene_data[other].data[column_names[other][0]])
+            if columns[other].num_rows > 0:
+                gene_data[other].stream(columns[other].source_data())
+
+        gene_data[name].stream(data)
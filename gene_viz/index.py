@@ -0,0 +1,143 @@
+"""
+Index for finding the transcripts overlapping a region
+"""
+from itertools import compress
+from operator import attrgetter, itemgetter, not_
+
+import numpy as np
+
+
+# key functions, which keep the per-transcript loops below in C
+_start = attrgetter("start")
+_end = attrgetter("end")
+
+
+class TranscriptIndex(object):
+    """
+    A sorted-array index over a collection of transcripts
+
+    Transcripts are sorted by start position, alongside the running maximum of
+    their end positions. Since both arrays are sorted, the range of transcripts
+    which may overlap a region is found with two binary searches.
+
+    Transcripts can be added and removed without rebuilding the index: only the
+    added transcripts are sorted, then inserted at positions found by binary search.
+    """
+    # above this number of added transcripts, they are merged in with a sort rather than inserted
+    max_inserts = 64
+
+    def __init__(self, transcripts=()):
+        """
+        :param transcripts: The Transcript objects to index
+        """
+        self._set(sorted(transcripts, key=_start))
+
+
+    def _set(self, transcripts, starts=None, ends=None):
+        """
+        Replace the contents of the index with transcripts sorted by start position
+        """
+        self._transcripts = transcripts
+        if starts is None:
+            starts = np.fromiter(map(_start, transcripts), dtype=np.int64, count=len(transcripts))
+            ends = np.fromiter(map(_end, transcripts), dtype=np.int64, count=len(transcripts))
+        self._starts = starts
+        self._ends = ends
+
+        # running maximum of the end positions, and the position of a transcript it belongs to
+        self._max_ends = np.maximum.accumulate(ends) if len(ends) > 0 else ends
+        positions = np.where(ends == self._max_ends, np.arange(len(ends)), 0)
+        self._max_positions = np.maximum.accumulate(positions) if len(ends) > 0 else positions
+
+
+    def __len__(self):
+        return len(self._transcripts)
+
+
+    def __iter__(self):
+        return iter(self._transcripts)
+
+
+    def _select(self, positions):
+        if len(positions) == 0:
+            return []
+        if len(positions) == 1:
+            return [self._transcripts[positions[0]]]
+        return list(itemgetter(*positions)(self._transcripts))
+
+
+    def add(self, transcripts):
+        """
+        Add transcripts to the index
+
+        :param transcripts: The Transcript objects to add
+        """
+        added = sorted(transcripts, key=_start)
+        if len(added) == 0:
+            return
+
+        added_starts = np.fromiter(map(_start, added), dtype=np.int64, count=len(added))
+        added_ends = np.fromiter(map(_end, added), dtype=np.int64, count=len(added))
+        positions = np.searchsorted(self._starts, added_starts, side="right")
+
+        if len(added) > self.max_inserts:
+            # the indexed and added transcripts are both sorted, so this is a linear time merge
+            transcripts = sorted(self._transcripts + added, key=_start)
+        else:
+            # insert from the back, so that earlier positions stay valid
+            transcripts = self._transcripts
+            for position, transcript in zip(positions[::-1].tolist(), added[::-1]):
+                transcripts.insert(position, transcript)
+
+        self._set(transcripts, np.insert(self._starts, positions, added_starts),
+                  np.insert(self._ends, positions, added_ends))
+
+
+    def remove(self, transcripts):
+        """
+        Remove transcripts from the index
+
+        :param transcripts: The Transcript objects to remove, matched by identity
+        """
+        removed = set(map(id, transcripts))
+        kept = np.fromiter(map(not_, map(removed.__contains__, map(id, self._transcripts))),
+                           dtype=bool, count=len(self._transcripts))
+        if kept.all():
+            return
+        self._set(list(compress(self._transcripts, kept.tolist())), self._starts[kept], self._ends[kept])
+
+
+    def overlapping(self, start, end):
+        """
+        Find the transcripts overlapping a region
+
+        :param start: Start position of the region
+        :param end: End position of the region (inclusive)
+        :return: A list of Transcript objects, sorted by start position
+        """
+        first = np.searchsorted(self._max_ends, start, side="left")
+        last = np.searchsorted(self._starts, end, side="right")
+        return self._select((first + np.flatnonzero(self._ends[first:last] >= start)).tolist())
+
+
+    def nearest(self, position):
+        """
+        Find the transcript closest to a position
+
+        :param position: The position
+        :return: A transcript overlapping the position if there is one, otherwise the transcript
+                 with the smallest distance to it. None if the index is empty.
+        """
+        overlapping = self.overlapping(position, position)
+        if len(overlapping) > 0:
+            return overlapping[0]
+
+        # none of the transcripts starting at or before the position reach it, so the
+        # closest of those is the one with the largest end
+        i = np.searchsorted(self._starts, position, side="right")
+        before = self._transcripts[self._max_positions[i - 1]] if i > 0 else None
+        after = self._transcripts[i] if i < len(self._transcripts) else None
+
+        if after is None or (before is not None and position - before.end <= after.start - position):
+            return before
+        return after
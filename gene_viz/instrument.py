@@ -0,0 +1,189 @@
+"""
+Timing and feature counts for GenePlot updates
+
+When the instrument preference is set, each call to GenePlot.update records how
+long each of its stages took, and how many features were drawn, in an UpdateStats
+object. The stats of the last update are available as GenePlot.update_stats, and
+are passed to the instrument_func preference if it is set.
+
+The stages of an update are
+
+* pack: assigning draw levels to the transcripts
+* layout: the plot height and y range
+* cull: selecting the transcripts to draw (see the viewport_culling preference)
+* genes: the merged gene extents for the level-of-detail overview
+* build: building the glyph columns for the transcripts
+* assign: handing the columns to the data sources, where bokeh validates them
+  and records the change to send to the browser
+* incremental: streaming and patching the data sources, excluding the time spent in build
+  (see the incremental preference)
+* lod: switching the level-of-detail renderers
+* serialize: converting the data sources to JSON, as bokeh does before sending
+  them to the browser. This is only measured if instrument is "serialize",
+  since measuring it serializes the data an extra time
+
+When instrumentation is off, updates use a timer whose methods do nothing.
+
+example usage
+>>> plot = GenePlot(dict(instrument=True))
+>>> plot.transcripts = transcripts
+>>> plot.update()
+>>> print(plot.update_stats)
+"""
+import timeit
+from collections import OrderedDict
+
+
+class UpdateStats(object):
+    """
+    Stage timings and feature counts for a single GenePlot update
+    """
+    def __init__(self):
+        # seconds spent in each stage, in the order the stages ran
+        self.stages = OrderedDict()
+        # numbers of transcripts, levels and data source rows, and the size of the serialized data
+        self.counts = OrderedDict()
+        # total seconds for the update
+        self.total = 0.0
+
+
+    def as_dict(self):
+        """
+        :return: The stats as a dictionary, e.g. for logging as JSON
+        """
+        return dict(stages=dict(self.stages), counts=dict(self.counts), total=self.total)
+
+
+    def __repr__(self):
+        return "UpdateStats(total={:.6f}, stages={}, counts={})".format(
+            self.total, dict(self.stages), dict(self.counts))
+
+
+    def __str__(self):
+        lines = ["update {:.2f}ms".format(self.total * 1000)]
+        lines.extend("  {:<18} {:>10.2f}ms".format(stage, seconds * 1000) for stage, seconds in self.stages.items())
+        lines.extend("  {:<18} {:>10}".format(name, count) for name, count in self.counts.items())
+        return "\n".join(lines)
+
+
+class StageTimer(object):
+    """
+    Records the time between successive laps as the time of a stage
+    """
+    enabled = True
+
+    def __init__(self):
+        self.stats = UpdateStats()
+        self._timer = timeit.default_timer
+        self._started = self._last = self._timer()
+        # time spent in timed functions since the last lap, which is not part of the lap's stage
+        self._nested = 0.0
+
+
+    def _add(self, stage, seconds):
+        self.stats.stages[stage] = self.stats.stages.get(stage, 0.0) + seconds
+
+
+    def lap(self, stage):
+        """
+        Attribute the time since the previous lap to a stage
+
+        :param stage: The name of the stage
+        """
+        now = self._timer()
+        self._add(stage, now - self._last - self._nested)
+        self._last = now
+        self._nested = 0.0
+
+
+    def skip(self):
+        """
+        Start the next lap without recording the time since the previous lap
+        """
+        self._last = self._timer()
+        self._nested = 0.0
+
+
+    def timed(self, stage, fn):
+        """
+        Wrap a function, so that the time spent in it is attributed to a stage
+        rather than the lap it is called from
+
+        :param stage: The name of the stage
+        :param fn: The function to wrap
+        :return: The wrapped function
+        """
+        def wrapper(*args, **kwargs):
+            started = self._timer()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                seconds = self._timer() - started
+                self._nested += seconds
+                self._add(stage, seconds)
+        return wrapper
+
+
+    def count(self, name, value):
+        """
+        Record a count
+
+        :param name: The name of the count
+        :param value: The count
+        """
+        self.stats.counts[name] = value
+
+
+    def finish(self):
+        """
+        :return: The UpdateStats, with the total time of the update
+        """
+        self.stats.total = self._timer() - self._started
+        return self.stats
+
+
+class NullTimer(object):
+    """
+    A timer which records nothing, used when instrumentation is off
+    """
+    enabled = False
+    stats = None
+
+    def lap(self, stage):
+        pass
+
+    def skip(self):
+        pass
+
+    def timed(self, stage, fn):
+        return fn
+
+    def count(self, name, value):
+        pass
+
+    def finish(self):
+        return None
+
+
+null_timer = NullTimer()
+
+
+def update_timer(instrument):
+    """
+    The timer for an update
+
+    :param instrument: The instrument preference
+    :return: A StageTimer if instrumentation is on, otherwise a NullTimer
+    """
+    return StageTimer() if instrument else null_timer
+
+
+def serialized_size(source):
+    """
+    Serialize the data of a ColumnDataSource as bokeh does when sending it to the browser
+
+    :param source: A bokeh ColumnDataSource
+    :return: The size of the JSON in bytes
+    """
+    from bokeh.core.json_encoder import serialize_json
+    return len(serialize_json(source.to_json(include_defaults=False)).encode("utf-8"))
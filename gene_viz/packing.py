@@ -0,0 +1,89 @@
+"""
+Algorithms for assigning vertical draw levels to transcripts
+
+Two packers are provided:
+
+* pack_sweep - a sweep line over the transcripts sorted by start position,
+  re-using the lowest free level. O(n log n), and uses the minimum possible
+  number of levels.
+* pack_sorted - reproduces the original size-sorted layout, in which the
+  smallest transcripts are placed first and each transcript is drawn one
+  level above the highest transcript it overlaps.
+
+Transcripts are treated as closed intervals, so transcripts that share an
+end position are drawn on different levels.
+"""
+from bisect import bisect_left, bisect_right
+from heapq import heappush, heappop
+
+
+def pack_sweep(transcripts):
+    """
+    Assign draw levels using a sweep line with a heap of level end coordinates
+
+    :param transcripts: A list of Transcript objects, modified in-place
+    """
+    # (end, level) for every level currently occupied at the sweep position
+    active = []
+    # levels that have become free, lowest first
+    free = []
+    num_levels = 0
+
+    for transcript in sorted(transcripts, key=lambda x: (x.start, x.end)):
+        while len(active) > 0 and active[0][0] < transcript.start:
+            heappush(free, heappop(active)[1])
+
+        if len(free) > 0:
+            level = heappop(free)
+        else:
+            level = num_levels
+            num_levels += 1
+
+        transcript.draw_level = level
+        heappush(active, (transcript.end, level))
+
+
+def pack_sorted(transcripts):
+    """
+    Assign draw levels using the size-sorted layout
+
+    Transcripts are placed smallest first, each one level above the highest of the
+    previously placed transcripts that it overlaps. The highest level over each
+    position is kept as a piecewise-constant skyline, so the overlapping
+    transcripts don't need to be compared individually.
+
+    :param transcripts: A list of Transcript objects, modified in-place
+    """
+    # skyline breakpoints, heights[i] is the next free level from positions[i] up to positions[i + 1]
+    positions = [float("-inf")]
+    heights = [0]
+
+    for transcript in sorted(transcripts, key=lambda x: (x.size, x.start)):
+        start, stop = transcript.start, transcript.end + 1
+
+        first = bisect_right(positions, start) - 1
+        last = bisect_left(positions, stop)
+
+        level = max(heights[first:last])
+        transcript.draw_level = level
+
+        new_positions = []
+        new_heights = []
+        if positions[first] < start:
+            new_positions.append(positions[first])
+            new_heights.append(heights[first])
+        new_positions.append(start)
+        new_heights.append(level + 1)
+        if last == len(positions) or positions[last] != stop:
+            new_positions.append(stop)
+            new_heights.append(heights[last - 1])
+
+        positions[first:last] = new_positions
+        heights[first:last] = new_heights
+
+
+# available packing methods
+packers = dict(
+    sweep=pack_sweep,
+    sorted=pack_sorted,
+)
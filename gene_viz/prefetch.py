@@ -0,0 +1,335 @@
+"""
+Prefetching of the regions next to the one being viewed
+
+Panning along a chromosome past the loaded region means loading the transcripts of
+the next region before they can be drawn. RegionPrefetcher loads transcripts in
+fixed windows, and while one window is being viewed, loads the windows ahead of
+it in a background thread into a TranscriptCache, so that by the time the view
+reaches them they are already loaded.
+
+Windows are aligned to a grid, and each window overlaps half of the next, so a
+view less than half a window wide always lies within a single window, and a
+window holds the view for at least half a window of panning. A view wider than
+half a window uses windows twice as wide, as many times as needed.
+
+The direction and speed of panning are estimated from the centres of successive
+views. When panning, the windows ahead in the direction of travel are loaded, more
+of them the faster the view is moving. Otherwise the windows either side of the
+view are loaded. Prefetches which are no longer wanted are cancelled if they
+haven't started.
+
+The stats attribute counts how the windows were found each time the view moved
+into a different window, for tuning the window size:
+
+* hits: the window was already in the cache
+* late_hits: the window was being prefetched, and was waited for
+* misses: the window was loaded when it was needed
+
+example usage
+>>> from gene_viz.prefetch import RegionPrefetcher
+>>> from gene_viz.utils import transcripts_from_gffutils
+>>> prefetcher = RegionPrefetcher(transcripts_from_gffutils, db, window_size=250000)
+>>> prefetcher.attach(plot, "chr22")    # bokeh server only, follows the x-range of the plot
+>>> print(prefetcher.stats)
+"""
+import math
+import sys
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+
+from .aio import _close_thread_source, thread_source
+from .cache import TranscriptCache, source_key
+
+
+class PrefetchStats(object):
+    """
+    Counts of how the windows requested from a RegionPrefetcher were found
+    """
+    def __init__(self):
+        self.requests = 0
+        # found in the cache
+        self.hits = 0
+        # waited for a prefetch in progress
+        self.late_hits = 0
+        # loaded when requested
+        self.misses = 0
+        # prefetches started, and cancelled before starting
+        self.prefetched = 0
+        self.cancelled = 0
+
+
+    @property
+    def hit_rate(self):
+        """
+        The fraction of requests which didn't have to wait for the loader to start
+        """
+        return (self.hits + self.late_hits) / self.requests if self.requests > 0 else 0.0
+
+
+    def as_dict(self):
+        """
+        :return: The stats as a dictionary, e.g. for logging as JSON
+        """
+        return dict(requests=self.requests, hits=self.hits, late_hits=self.late_hits, misses=self.misses,
+                    prefetched=self.prefetched, cancelled=self.cancelled, hit_rate=self.hit_rate)
+
+
+    def __repr__(self):
+        return "PrefetchStats({})".format(", ".join("{}={}".format(k, v) for k, v in self.as_dict().items()))
+
+
+    def __str__(self):
+        return "{} requests: {} hits, {} late hits, {} misses ({:.0%} hit rate); {} prefetched, {} cancelled".format(
+            self.requests, self.hits, self.late_hits, self.misses, self.hit_rate, self.prefetched, self.cancelled)
+
+
+class RegionPrefetcher(object):
+    """
+    Loads transcripts in windows, prefetching the windows ahead of the view
+    """
+    def __init__(self, loader, db, window_size=250000, max_ahead=2, lead_time=1.0, cache=None, executor=None):
+        """
+        :param loader: A loader function with the signature of the gene_viz.utils loaders
+        :param db: The annotation source passed to the loader
+        :param window_size: The width of the windows loaded, in bases
+        :param max_ahead: The maximum number of windows to prefetch in the direction of panning
+        :param lead_time: Windows the view is expected to reach within this many seconds, at the
+                          current panning speed, are prefetched
+        :param cache: The TranscriptCache holding the loaded windows, by default a new cache
+        :param executor: A concurrent.futures thread pool to prefetch in, by default a single background thread
+        """
+        if window_size < 2:
+            print("Error - window_size must be at least 2", file=sys.stderr)
+            raise ValueError("window_size must be at least 2")
+
+        self.loader = loader
+        self.db = db
+        self.window_size = window_size
+        self.max_ahead = max_ahead
+        self.lead_time = lead_time
+        self.cache = cache if cache is not None else TranscriptCache()
+        self.stats = PrefetchStats()
+
+        self._source = source_key(loader, db)
+        self._executor = executor
+        self._own_executor = executor is None
+        # prefetches in progress, keyed on (contig, start, end)
+        self._pending = {}
+        # the last window requested
+        self._requested = None
+
+        # the last view, for estimating the panning velocity in bases per second
+        self._timer = timeit.default_timer
+        self._last_view = None
+        self.velocity = 0.0
+
+        # the plot whose x-range is followed, see attach
+        self._plot = None
+        self._contig = None
+        self._shown = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def close(self):
+        """
+        Detach from the plot, cancel the pending prefetches, and stop the background thread if it was created here
+        """
+        self.detach()
+        self._cancel(self._pending)
+        if self._own_executor and self._executor is not None:
+            # close the background thread's copy of the annotation source, after any prefetch in progress
+            self._executor.submit(_close_thread_source, self.db)
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+    def window(self, start, end):
+        """
+        The window holding a view
+
+        :param start: Start position of the view
+        :param end: End position of the view
+        :return: The (start, end) of the window
+        """
+        size = self.window_size
+        while end - start > size // 2:
+            size *= 2
+        step = size // 2
+        first = (int(start) // step) * step
+        return first, first + size
+
+
+    def _windows_ahead(self, window):
+        """
+        The windows to prefetch around a window, given the panning velocity
+        """
+        start, end = window
+        step = (end - start) // 2
+
+        if self.velocity == 0:
+            offsets = (-1, 1)
+        else:
+            direction = 1 if self.velocity > 0 else -1
+            ahead = math.ceil(abs(self.velocity) * self.lead_time / step)
+            offsets = [direction * i for i in range(1, max(1, min(self.max_ahead, ahead)) + 1)]
+
+        return [(start + i * step, end + i * step) for i in offsets if end + i * step > 0]
+
+
+    def _track_motion(self, contig, start, end):
+        """
+        Update the panning velocity from a new view
+        """
+        now = self._timer()
+        center = (start + end) / 2
+
+        if self._last_view is None or self._last_view[0] != contig:
+            self.velocity = 0.0
+        else:
+            _, last_center, last_time = self._last_view
+            elapsed = now - last_time
+            if elapsed < 0.05:
+                # bokeh sets the start and end of a range separately, wait for the range to settle
+                return
+            if elapsed > self.lead_time:
+                # the view stopped moving
+                self.velocity = 0.0
+            else:
+                self.velocity = 0.5 * self.velocity + 0.5 * (center - last_center) / elapsed
+
+        self._last_view = (contig, center, now)
+
+
+    def _load_window(self, contig, start, end):
+        """
+        Load a window in a background thread, adding it to the cache
+        """
+        transcripts = self.loader(thread_source(self.db), contig, start, end)
+        self.cache.put(self._source, contig, start, end, transcripts)
+        return transcripts
+
+
+    def _cancel(self, keys):
+        for key in list(keys):
+            future = self._pending.pop(key)
+            if future.cancel():
+                self.stats.cancelled += 1
+
+
+    def prefetch(self, contig, window):
+        """
+        Start loading the windows ahead of a window, and cancel unstarted prefetches of other windows
+
+        :param contig: Name of the contig
+        :param window: The (start, end) of the window being viewed
+        """
+        wanted = [(contig, start, end) for start, end in self._windows_ahead(window)]
+
+        self._pending = {key: future for key, future in self._pending.items() if not future.done()}
+        self._cancel([key for key in self._pending if key not in wanted and key != (contig,) + tuple(window)])
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+        for key in wanted:
+            if key not in self._pending and (self._source,) + key not in self.cache:
+                self._pending[key] = self._executor.submit(self._load_window, *key)
+                self.stats.prefetched += 1
+
+
+    def load(self, contig, start, end):
+        """
+        Load the transcripts of the window holding a view, and prefetch the windows ahead of it
+
+        :param contig: Name of contig to use in query
+        :param start: Start position of the view
+        :param end: End position of the view
+        :return: The list of transcripts of the window
+        """
+        self._track_motion(contig, start, end)
+        window = self.window(start, end)
+        key = (contig,) + window
+
+        transcripts = self.cache.get(self._source, *key)
+        if transcripts is not None:
+            found = "hits"
+        elif key in self._pending and not self._pending[key].cancel():
+            transcripts = list(self._pending.pop(key).result())
+            found = "late_hits"
+        else:
+            if self._pending.pop(key, None) is not None:
+                # the prefetch hadn't started, and was cancelled above
+                self.stats.cancelled += 1
+            transcripts = self.loader(self.db, *key)
+            self.cache.put(self._source, contig, window[0], window[1], transcripts)
+            transcripts = list(transcripts)
+            found = "misses"
+
+        # views within the same window as the last are only counted if they had to load it again
+        if key != self._requested or found != "hits":
+            self.stats.requests += 1
+            setattr(self.stats, found, getattr(self.stats, found) + 1)
+        self._requested = key
+
+        self.prefetch(contig, window)
+        return transcripts
+
+
+    def attach(self, plot, contig):
+        """
+        Show the transcripts of the window holding the x-range of a plot, following the x-range
+        as it changes (bokeh server only)
+
+        :param plot: A GenePlot
+        :param contig: Name of the contig shown by the plot
+        """
+        self.detach()
+        self._plot = plot
+        self._contig = contig
+        self._shown = None
+        plot.x_range.on_change("start", self._on_x_range_change)
+        plot.x_range.on_change("end", self._on_x_range_change)
+        self._on_x_range_change("start", None, None)
+
+
+    def detach(self):
+        """
+        Stop following the x-range of the plot
+        """
+        if self._plot is not None:
+            self._plot.x_range.remove_on_change("start", self._on_x_range_change)
+            self._plot.x_range.remove_on_change("end", self._on_x_range_change)
+            self._plot = None
+
+
+    def set_contig(self, contig):
+        """
+        Change the contig shown by the attached plot
+        """
+        self._contig = contig
+        self._shown = None
+        self._on_x_range_change("start", None, None)
+
+
+    def _on_x_range_change(self, attr, old, new):
+        start, end = self._plot.x_range.start, self._plot.x_range.end
+        if start is None or end is None or end <= start:
+            # part way through setting a new range
+            return
+
+        window = (self._contig,) + self.window(start, end)
+        if window == self._shown:
+            self._track_motion(self._contig, start, end)
+            self.prefetch(self._contig, window[1:])
+            return
+
+        self._plot.transcripts = self.load(self._contig, start, end)
+        self._shown = window
+        self._plot.update()
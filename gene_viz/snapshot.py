@@ -0,0 +1,254 @@
+"""
+Binary annotation snapshots
+
+A snapshot holds the transcripts of an annotation in a compact columnar file,
+written once from the output of any loader. Opening a snapshot maps the file
+into memory and only reads its header, so it takes milliseconds, and processes
+opening the same file share its pages. Region queries binary search a sorted
+per-contig index of genes, and only create Transcript objects for the genes
+found.
+
+File layout:
+
+* magic bytes b"GVSNAP01"
+* the length of the header, as a little-endian 64-bit integer
+* a JSON header, giving the range of genes on each contig, and the dtype,
+  offset and length of each array
+* the arrays, each aligned to 8 bytes
+
+Genes are sorted by contig and start position, and the transcripts, exons and
+coding regions of each gene are stored contiguously, with offset arrays giving
+the rows belonging to each gene and transcript. IDs are stored as a single
+block of UTF-8 data per column, with an offset array.
+
+example usage
+>>> from gene_viz.gff import read_transcripts
+>>> from gene_viz.snapshot import write_snapshot, Snapshot
+>>> write_snapshot("gencode.v27.snapshot", read_transcripts("gencode.v27.basic.annotation.gtf.gz"))
+>>> with Snapshot("gencode.v27.snapshot") as snapshot:
+...     transcripts = snapshot.query("chr22", 42124000, 42180000)
+"""
+import json
+import mmap
+import struct
+import sys
+
+import numpy as np
+
+from .features import Transcript, Exon, CDS
+
+
+snapshot_magic = b"GVSNAP01"
+snapshot_version = 1
+
+# dtypes of the arrays in a snapshot
+coordinate_dtype = "<u4"
+offset_dtype = "<u8"
+
+
+def _string_column(strings):
+    data = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(data) + 1, dtype=offset_dtype)
+    np.cumsum([len(x) for x in data], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(data), dtype="u1")
+
+
+def write_snapshot(path, transcripts):
+    """
+    Write transcripts to a snapshot file
+
+    :param path: Path of the file to write
+    :param transcripts: An iterable of Transcript objects, e.g. the output of a loader
+                        or of gene_viz.gff.read_transcripts
+    """
+    genes = {}
+    for t in transcripts:
+        genes.setdefault((t.contig, t.gene_id), []).append(t)
+
+    def gene_position(item):
+        (contig, gene_id), gene_transcripts = item
+        return contig, min(t.start for t in gene_transcripts), gene_id
+
+    gene_ids, gene_starts, gene_ends, gene_max_ends, gene_transcripts = [], [], [], [], [0]
+    transcript_ids, transcript_starts, transcript_ends, strands = [], [], [], []
+    transcript_exons, transcript_cds = [0], [0]
+    exon_ids, exon_starts, exon_ends, cds_starts, cds_ends = [], [], [], [], []
+    contigs = {}
+
+    for (contig, gene_id), members in sorted(genes.items(), key=gene_position):
+        if contig not in contigs:
+            contigs[contig] = [len(gene_ids), len(gene_ids)]
+            max_end = 0
+        contigs[contig][1] += 1
+
+        gene_ids.append(gene_id)
+        gene_starts.append(min(t.start for t in members))
+        gene_ends.append(max(t.end for t in members))
+        max_end = max(max_end, gene_ends[-1])
+        gene_max_ends.append(max_end)
+        gene_transcripts.append(gene_transcripts[-1] + len(members))
+
+        for t in members:
+            transcript_ids.append(t.transcript_id)
+            transcript_starts.append(t.start)
+            transcript_ends.append(t.end)
+            strands.append(ord(t.strand))
+            for exon in t.exons:
+                exon_ids.append(exon.exon_id)
+                exon_starts.append(exon.start)
+                exon_ends.append(exon.end)
+            for cds in t.cds:
+                cds_starts.append(cds.start)
+                cds_ends.append(cds.end)
+            transcript_exons.append(len(exon_starts))
+            transcript_cds.append(len(cds_starts))
+
+    for coordinates in (gene_ends, exon_ends, cds_ends):
+        if len(coordinates) > 0 and max(coordinates) > np.iinfo(coordinate_dtype).max:
+            print("Coordinates are too large to store in a snapshot", file=sys.stderr)
+            raise ValueError("Coordinates are too large to store in a snapshot")
+
+    arrays = dict(
+        gene_start=np.array(gene_starts, dtype=coordinate_dtype),
+        gene_end=np.array(gene_ends, dtype=coordinate_dtype),
+        gene_max_end=np.array(gene_max_ends, dtype=coordinate_dtype),
+        gene_transcripts=np.array(gene_transcripts, dtype=offset_dtype),
+        transcript_start=np.array(transcript_starts, dtype=coordinate_dtype),
+        transcript_end=np.array(transcript_ends, dtype=coordinate_dtype),
+        transcript_strand=np.array(strands, dtype="u1"),
+        transcript_exons=np.array(transcript_exons, dtype=offset_dtype),
+        transcript_cds=np.array(transcript_cds, dtype=offset_dtype),
+        exon_start=np.array(exon_starts, dtype=coordinate_dtype),
+        exon_end=np.array(exon_ends, dtype=coordinate_dtype),
+        cds_start=np.array(cds_starts, dtype=coordinate_dtype),
+        cds_end=np.array(cds_ends, dtype=coordinate_dtype),
+    )
+    for name, strings in (("gene_id", gene_ids), ("transcript_id", transcript_ids), ("exon_id", exon_ids)):
+        arrays[name + "_offsets"], arrays[name + "_data"] = _string_column(strings)
+
+    # array offsets are relative to the end of the header
+    layout = {}
+    position = 0
+    for name in sorted(arrays):
+        layout[name] = dict(dtype=arrays[name].dtype.str, offset=position, count=len(arrays[name]))
+        position += -(-arrays[name].nbytes // 8) * 8
+
+    header = json.dumps(dict(version=snapshot_version, contigs=contigs, arrays=layout)).encode("utf-8")
+    header += b" " * (-(len(snapshot_magic) + 8 + len(header)) % 8)
+
+    with open(path, "wb") as f:
+        f.write(snapshot_magic)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name in sorted(arrays):
+            data = arrays[name].tobytes()
+            f.write(data)
+            f.write(b"\x00" * (-len(data) % 8))
+
+
+class Snapshot(object):
+    """
+    A memory-mapped snapshot file
+    """
+    def __init__(self, path):
+        """
+        :param path: Path to a file written by write_snapshot
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(snapshot_magic)] != snapshot_magic:
+            self._mmap.close()
+            print("{} is not a gene_viz snapshot".format(path), file=sys.stderr)
+            raise ValueError("{} is not a gene_viz snapshot".format(path))
+
+        header_size, = struct.unpack_from("<Q", self._mmap, len(snapshot_magic))
+        header_start = len(snapshot_magic) + 8
+        header = json.loads(self._mmap[header_start:header_start + header_size].decode("utf-8"))
+        if header["version"] != snapshot_version:
+            self._mmap.close()
+            print("Unsupported snapshot version {}".format(header["version"]), file=sys.stderr)
+            raise ValueError("Unsupported snapshot version {}".format(header["version"]))
+
+        self._contigs = header["contigs"]
+        self._arrays = {}
+        data_start = header_start + header_size
+        for name, array in header["arrays"].items():
+            self._arrays[name] = np.frombuffer(self._mmap, dtype=array["dtype"], count=array["count"],
+                                               offset=data_start + array["offset"])
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def __len__(self):
+        return len(self._arrays["transcript_start"])
+
+
+    def close(self):
+        # the arrays hold references to the mapped memory, which must be released first
+        self._arrays = {}
+        self._mmap.close()
+
+
+    @property
+    def contigs(self):
+        return list(self._contigs)
+
+
+    def _string(self, column, i):
+        offsets = self._arrays[column + "_offsets"]
+        return self._arrays[column + "_data"][offsets[i]:offsets[i + 1]].tobytes().decode("utf-8")
+
+
+    def _transcript(self, contig, gene_id, i):
+        arrays = self._arrays
+        t = Transcript(self._string("transcript_id", i), gene_id, contig,
+                       arrays["transcript_start"][i], arrays["transcript_end"][i],
+                       chr(arrays["transcript_strand"][i]))
+
+        first, last = arrays["transcript_exons"][i:i + 2]
+        for j in range(first, last):
+            t.add_exon(Exon(self._string("exon_id", j), contig, arrays["exon_start"][j], arrays["exon_end"][j]))
+
+        first, last = arrays["transcript_cds"][i:i + 2]
+        for j in range(first, last):
+            t.add_cds(CDS(contig, arrays["cds_start"][j], arrays["cds_end"][j]))
+
+        return t
+
+
+    def query(self, contig, start, end):
+        """
+        Find the transcripts of all genes overlapping a region
+
+        :param contig: Name of the contig
+        :param start: Start position of the region
+        :param end: End position of the region
+        :return: A list of Transcript objects
+        """
+        if contig not in self._contigs:
+            return []
+
+        arrays = self._arrays
+        first_gene, last_gene = self._contigs[contig]
+
+        # genes are sorted by start, alongside the running maximum of their ends
+        first = first_gene + np.searchsorted(arrays["gene_max_end"][first_gene:last_gene], start, side="left")
+        last = first_gene + np.searchsorted(arrays["gene_start"][first_gene:last_gene], end, side="right")
+
+        transcripts = []
+        for gene in range(first, last):
+            if arrays["gene_end"][gene] < start:
+                continue
+            gene_id = self._string("gene_id", gene)
+            for i in range(arrays["gene_transcripts"][gene], arrays["gene_transcripts"][gene + 1]):
+                transcripts.append(self._transcript(contig, gene_id, i))
+
+        return transcripts
@@ -0,0 +1,440 @@
+"""
+Region queries on bgzip compressed, tabix indexed annotation files
+
+A tabix index (.tbi) maps genomic bins to the compressed blocks of a BGZF file
+containing the features in each bin. A region query reads the index once, then
+decompresses only the blocks that may contain features overlapping the region,
+so the time taken doesn't depend on the size of the annotation.
+
+The index and BGZF reading are implemented here. Files with a CSI index
+(.csi) are read using pysam, if it is installed.
+
+Files can be prepared with htslib:
+
+    (grep ^"#" in.gtf; grep -v ^"#" in.gtf | sort -k1,1 -k4,4n) | bgzip > out.gtf.gz
+    tabix -p gff out.gtf.gz
+
+example usage
+>>> from gene_viz.tabix import TabixFile
+>>> with TabixFile("gencode.v27.basic.annotation.gtf.gz") as tabix:
+...     for line in tabix.fetch("chr22", 42124000, 42180000):
+...         print(line)
+"""
+import gzip
+import os
+import struct
+import sys
+import zlib
+
+from .features import Transcript, Exon, CDS
+from .gff import detect_format, read_transcripts, gff3_gene_types
+
+
+# tabix format flags
+tabix_generic = 0
+tabix_zero_based = 0x10000
+
+
+def region_bins(start, end):
+    """
+    The bins of the tabix binning scheme which may contain features overlapping a region
+
+    :param start: 0-based start of the region
+    :param end: 0-based, exclusive, end of the region
+    :return: A list of bin numbers
+    """
+    end -= 1
+    bins = [0]
+    for shift, offset in ((26, 1), (23, 9), (20, 73), (17, 585), (14, 4681)):
+        bins.extend(range(offset + (start >> shift), offset + (end >> shift) + 1))
+    return bins
+
+
+class TabixIndex(object):
+    """
+    The contents of a tabix (.tbi) index
+    """
+    def __init__(self, path):
+        """
+        :param path: Path to the .tbi file
+        """
+        with gzip.open(path, "rb") as f:
+            data = f.read()
+
+        magic, n_ref, self.format, self.col_seq, self.col_beg, self.col_end, meta, self.skip, l_nm = \
+            struct.unpack_from("<4s8i", data, 0)
+        if magic != b"TBI\x01":
+            print("{} is not a tabix index".format(path), file=sys.stderr)
+            raise ValueError("{} is not a tabix index".format(path))
+
+        self.meta = chr(meta)
+        offset = 36
+        names = data[offset:offset + l_nm].split(b"\x00")[:n_ref]
+        offset += l_nm
+
+        # for each contig, a dictionary of bin -> list of (begin, end) virtual offsets,
+        # and the linear index of the lowest offset in each 16kb window
+        self.contigs = {}
+        for name in names:
+            bins = {}
+            n_bin, = struct.unpack_from("<i", data, offset)
+            offset += 4
+            for _ in range(n_bin):
+                bin_number, n_chunk = struct.unpack_from("<Ii", data, offset)
+                offset += 8
+                chunks = struct.unpack_from("<{}Q".format(2 * n_chunk), data, offset)
+                offset += 16 * n_chunk
+                bins[bin_number] = list(zip(chunks[::2], chunks[1::2]))
+
+            n_intv, = struct.unpack_from("<i", data, offset)
+            offset += 4
+            linear = struct.unpack_from("<{}Q".format(n_intv), data, offset)
+            offset += 8 * n_intv
+
+            self.contigs[name.decode()] = (bins, linear)
+
+
+    def chunks(self, contig, start, end):
+        """
+        The ranges of the BGZF file which may contain features overlapping a region
+
+        :param contig: Name of the contig
+        :param start: 0-based start of the region
+        :param end: 0-based, exclusive, end of the region
+        :return: A sorted list of non-overlapping (begin, end) virtual offsets
+        """
+        if contig not in self.contigs:
+            return []
+
+        bins, linear = self.contigs[contig]
+        min_offset = linear[min(start >> 14, len(linear) - 1)] if len(linear) > 0 else 0
+
+        chunks = []
+        for bin_number in region_bins(start, end):
+            chunks.extend(chunk for chunk in bins.get(bin_number, ()) if chunk[1] > min_offset)
+        chunks.sort()
+
+        merged = []
+        for chunk in chunks:
+            if len(merged) > 0 and chunk[0] <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], chunk[1]))
+            else:
+                merged.append(chunk)
+        return merged
+
+
+class BgzfReader(object):
+    """
+    Random access to the lines of a BGZF file using virtual offsets
+    """
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._block_offset = None
+        self._block_size = 0
+        self._data = b""
+
+
+    def close(self):
+        self._file.close()
+
+
+    def _load_block(self, offset):
+        if offset == self._block_offset:
+            return
+
+        self._file.seek(offset)
+        header = self._file.read(12)
+        if len(header) < 12:
+            self._block_offset, self._block_size, self._data = offset, 0, b""
+            return
+        if header[:4] != b"\x1f\x8b\x08\x04":
+            print("Invalid BGZF block at offset {}".format(offset), file=sys.stderr)
+            raise ValueError("Invalid BGZF block at offset {}".format(offset))
+
+        extra_size, = struct.unpack_from("<H", header, 10)
+        extra = self._file.read(extra_size)
+
+        # the BC subfield holds the total block size - 1
+        block_size = None
+        position = 0
+        while position < extra_size:
+            si1, si2, length = struct.unpack_from("<BBH", extra, position)
+            if si1 == 66 and si2 == 67:
+                block_size, = struct.unpack_from("<H", extra, position + 4)
+                block_size += 1
+            position += 4 + length
+        if block_size is None:
+            print("Missing BGZF block size at offset {}".format(offset), file=sys.stderr)
+            raise ValueError("Missing BGZF block size at offset {}".format(offset))
+
+        compressed = self._file.read(block_size - 12 - extra_size)
+        self._data = zlib.decompress(compressed[:-8], -15)
+        self._block_offset = offset
+        self._block_size = block_size
+
+
+    def lines(self, begin, end):
+        """
+        Read the lines starting between two virtual offsets
+
+        :param begin: Virtual offset of the first line
+        :param end: Virtual offset to stop reading at
+        :return: A generator of lines, without line endings
+        """
+        block_offset, position = begin >> 16, begin & 0xffff
+        self._load_block(block_offset)
+
+        partial = b""
+        while self._block_size > 0:
+            if len(partial) == 0 and (block_offset << 16 | position) >= end:
+                break
+
+            newline = self._data.find(b"\n", position)
+            if newline < 0:
+                # the line continues in the next block
+                partial += self._data[position:]
+                block_offset += self._block_size
+                position = 0
+                self._load_block(block_offset)
+                continue
+
+            yield (partial + self._data[position:newline]).decode()
+            partial = b""
+            position = newline + 1
+            if position >= len(self._data):
+                block_offset += self._block_size
+                position = 0
+                self._load_block(block_offset)
+
+        if len(partial) > 0:
+            yield partial.decode()
+
+
+class TabixFile(object):
+    """
+    A bgzip compressed file with a tabix index
+    """
+    def __init__(self, path, index_path=None):
+        """
+        :param path: Path to the bgzip compressed file
+        :param index_path: Path to the tabix index, path + ".tbi" by default
+        """
+        self.path = path
+        self.index_path = index_path or path + ".tbi"
+        self.index = TabixIndex(self.index_path)
+        if self.index.format & 0xffff != tabix_generic:
+            print("Only generic tabix indexes are supported, not SAM or VCF", file=sys.stderr)
+            raise ValueError("Only generic tabix indexes are supported, not SAM or VCF")
+        self._reader = BgzfReader(path)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def close(self):
+        self._reader.close()
+
+
+    def reopen(self):
+        """
+        Open another handle on the file, sharing the index, for reading from another thread
+
+        :return: A TabixFile
+        """
+        other = TabixFile.__new__(TabixFile)
+        other.path, other.index_path, other.index = self.path, self.index_path, self.index
+        other._reader = BgzfReader(self.path)
+        return other
+
+
+    @property
+    def contigs(self):
+        return list(self.index.contigs)
+
+
+    def fetch(self, contig, start, end):
+        """
+        Read the lines of features overlapping a region
+
+        :param contig: Name of the contig
+        :param start: 1-based start position of the region
+        :param end: 1-based, inclusive, end position of the region
+        :return: A generator of lines, sorted by position
+        """
+        index = self.index
+        region_start, region_end = start - 1, end
+        zero_based = index.format & tabix_zero_based
+
+        for chunk_begin, chunk_end in index.chunks(contig, region_start, region_end):
+            for line in self._reader.lines(chunk_begin, chunk_end):
+                if line.startswith(index.meta):
+                    continue
+
+                fields = line.split("\t")
+                if fields[index.col_seq - 1] != contig:
+                    return
+
+                feature_start = int(fields[index.col_beg - 1])
+                if not zero_based:
+                    feature_start -= 1
+                feature_end = int(fields[index.col_end - 1]) if index.col_end > 0 else feature_start + 1
+
+                if feature_start >= region_end:
+                    return
+                if feature_end > region_start:
+                    yield line
+
+
+class _PysamTabixFile(object):
+    """
+    Adapter giving a pysam TabixFile the interface of TabixFile, used for CSI indexes
+    """
+    def __init__(self, path, index_path=None):
+        import pysam
+        self.path = path
+        self.index_path = index_path
+        self._tabix = pysam.TabixFile(path, index=index_path)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def close(self):
+        self._tabix.close()
+
+
+    def reopen(self):
+        return _PysamTabixFile(self.path, self.index_path)
+
+
+    @property
+    def contigs(self):
+        return list(self._tabix.contigs)
+
+
+    def fetch(self, contig, start, end):
+        if contig not in self._tabix.contigs:
+            return iter(())
+        return self._tabix.fetch(contig, start - 1, end)
+
+
+def open_tabix(path):
+    """
+    Open an indexed annotation file, using pysam for CSI indexes
+
+    :param path: Path to the bgzip compressed file
+    :return: A TabixFile
+    """
+    if os.path.exists(path + ".tbi"):
+        return TabixFile(path)
+
+    if os.path.exists(path + ".csi"):
+        try:
+            return _PysamTabixFile(path, path + ".csi")
+        except ImportError:
+            print("Unable to import pysam, which is required for CSI indexes", file=sys.stderr)
+            raise
+
+    print("No tabix index found for {}".format(path), file=sys.stderr)
+    raise ValueError("No tabix index found for {}".format(path))
+
+
+def annotation_format(path):
+    """
+    Determine whether an annotation file is GTF, GFF3 or BED
+
+    :param path: Path to the file
+    :return: "gtf", "gff3" or "bed"
+    """
+    name = path.lower()
+    for suffix in (".gz", ".bgz"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+
+    if name.endswith(".bed") or name.endswith(".bed12"):
+        return "bed"
+    return detect_format(path)
+
+
+def transcript_from_bed(line):
+    """
+    Create a transcript from a BED line, with exons from the blocks of BED12 lines
+
+    BED files have no gene ids, so the name is used as both the transcript and gene id.
+
+    :param line: A line of a BED file
+    :return: A Transcript object
+    """
+    fields = line.rstrip("\n").split("\t")
+    contig, chrom_start, chrom_end = fields[0], int(fields[1]), int(fields[2])
+    name = fields[3] if len(fields) > 3 else "{}:{}-{}".format(contig, chrom_start + 1, chrom_end)
+    strand = fields[5] if len(fields) > 5 and fields[5] in ("+", "-") else "+"
+
+    transcript = Transcript(name, name, contig, chrom_start + 1, chrom_end, strand)
+
+    if len(fields) >= 12:
+        sizes = [int(x) for x in fields[10].rstrip(",").split(",")]
+        offsets = [int(x) for x in fields[11].rstrip(",").split(",")]
+        for i, (size, offset) in enumerate(zip(sizes, offsets)):
+            exon_start = chrom_start + offset + 1
+            transcript.add_exon(Exon("{}.{}".format(name, i + 1), contig, exon_start, exon_start + size - 1))
+    else:
+        transcript.add_exon(Exon("{}.1".format(name), contig, chrom_start + 1, chrom_end))
+
+    if len(fields) >= 8:
+        thick_start, thick_end = int(fields[6]) + 1, int(fields[7])
+        for exon in transcript.exons:
+            if exon.start <= thick_end and exon.end >= thick_start:
+                transcript.add_cds(CDS(contig, max(exon.start, thick_start), min(exon.end, thick_end)))
+
+    return transcript
+
+
+def read_region(tabix, contig, start, end, fmt):
+    """
+    Read the transcripts of all genes overlapping a region from an indexed annotation file
+
+    Only the features overlapping the query are returned by the index, so for GTF
+    and GFF3 files the query is repeated over the extents of the genes found, until
+    all of their transcripts have been read.
+
+    :param tabix: A TabixFile
+    :param contig: Name of the contig
+    :param start: Start position of the region
+    :param end: End position of the region
+    :param fmt: "gtf", "gff3" or "bed"
+    :return: A list of Transcript objects
+    """
+    if fmt == "bed":
+        return [transcript_from_bed(line) for line in tabix.fetch(contig, start, end)]
+
+    fetch_start, fetch_end = start, end
+    while True:
+        lines = list(tabix.fetch(contig, fetch_start, fetch_end))
+        transcripts = list(read_transcripts(lines, contig, start, end, fmt=fmt, presorted=False))
+
+        # the genes overlapping the region may have transcripts which haven't been read yet
+        extents = [(t.start, t.end) for t in transcripts]
+        for line in lines:
+            fields = line.split("\t", 5)
+            if fields[2] in gff3_gene_types and int(fields[3]) <= end and int(fields[4]) >= start:
+                extents.append((int(fields[3]), int(fields[4])))
+        if len(extents) == 0:
+            return transcripts
+
+        genes_start = min(x[0] for x in extents)
+        genes_end = max(x[1] for x in extents)
+        if genes_start >= fetch_start and genes_end <= fetch_end:
+            return transcripts
+
+        fetch_start, fetch_end = min(fetch_start, genes_start), max(fetch_end, genes_end)
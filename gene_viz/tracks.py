@@ -0,0 +1,192 @@
+"""
+Several sets of transcripts in a single plot
+
+Showing each annotation set or sample as its own GenePlot, with linked x-ranges,
+gives every plot its own data sources and x-range callback, so a single zoom runs
+the callback and re-renders the glyphs once for each plot. TrackPlot instead
+stacks several named tracks of transcripts in one figure, drawn from one set of
+data sources with one range callback, so the cost of zooming doesn't grow with
+the number of tracks.
+
+Each track is packed separately, and drawn below the previous one, with its name
+drawn above it. The plot keeps a copy of each transcript, recording its track, so
+the same transcripts can be shown in several tracks.
+
+example usage
+>>> from gene_viz.tracks import TrackPlot
+>>> plot = TrackPlot(dict(pack=True))
+>>> plot.set_track("GENCODE", transcripts_from_gffutils(gencode_db, "chr22", 42124000, 42180000))
+>>> plot.set_track("RefSeq", transcripts_from_gffutils(refseq_db, "chr22", 42124000, 42180000))
+>>> plot.x_range = (42124000, 42180000)
+>>> plot.update()
+>>> show(plot.figure)
+"""
+from collections import OrderedDict
+from itertools import chain
+
+from bokeh.models import ColumnDataSource as CDS, LabelSet
+
+from .features import Transcript
+from .geometry import level_y
+from .gene_viz import GenePlot
+
+
+class TrackTranscript(Transcript):
+    """
+    A transcript shown in a track of a TrackPlot
+    """
+    __slots__ = ("track",)
+
+
+def track_transcript(transcript, track):
+    """
+    Copy a transcript into a track, sharing its exons and coding regions
+
+    :param transcript: A Transcript object
+    :param track: The name of the track
+    :return: A TrackTranscript
+    """
+    t = TrackTranscript(transcript.transcript_id, transcript.gene_id, transcript.contig, transcript.start,
+                        transcript.end, transcript.strand, transcript.exons, transcript.cds)
+    t.track = track
+    return t
+
+
+class TrackPlot(GenePlot):
+    """
+    A GenePlot showing several named tracks of transcripts
+    """
+    def __init__(self, prefs={}):
+        # the transcripts of each track, in the order that they are drawn
+        self._tracks = OrderedDict()
+
+        super(TrackPlot, self).__init__(prefs)
+
+        self._track_names = CDS(data=dict(name=[], y=[]))
+        self._figure.add_layout(
+            LabelSet(x=5, x_units="screen", y="y", text="name", source=self._track_names,
+                     text_font_size=self.prefs["track_name_font_size"], text_color=self.prefs["track_name_color"],
+                     text_font_style="bold", text_baseline="middle", visible=self.prefs["show_track_names"])
+        )
+
+
+    @property
+    def tracks(self):
+        """
+        The names of the tracks, from top to bottom
+        """
+        return list(self._tracks)
+
+
+    def track(self, name):
+        """
+        The transcripts of a track
+
+        :param name: The name of the track
+        :return: A list of TrackTranscript objects
+        """
+        return self._tracks[name]
+
+
+    def set_track(self, name, transcripts):
+        """
+        Set the transcripts of a track, adding the track below the others if it is new
+
+        :param name: The name of the track
+        :param transcripts: A list of Transcript objects
+        """
+        self._tracks[name] = [track_transcript(t, name) for t in transcripts]
+        self._combine_tracks()
+
+
+    def remove_track(self, name):
+        """
+        Remove a track
+
+        :param name: The name of the track
+        """
+        del self._tracks[name]
+        self._combine_tracks()
+
+
+    def _combine_tracks(self):
+        self._transcripts = list(chain.from_iterable(self._tracks.values()))
+        self._index = None
+        self._dirty_flag = True
+
+
+    @GenePlot.transcripts.setter
+    def transcripts(self, value):
+        # replaces all of the tracks with a single unnamed track
+        self._tracks.clear()
+        self.set_track("", value)
+
+
+    def add_transcripts(self, transcripts, track=""):
+        """
+        Add transcripts to a track, updating the index without rebuilding it
+
+        :param transcripts: A list of Transcript objects
+        :param track: The name of the track, which is added if it is new
+        """
+        added = [track_transcript(t, track) for t in transcripts]
+        self._tracks.setdefault(track, []).extend(added)
+        super(TrackPlot, self).add_transcripts(added)
+
+
+    def remove_transcripts(self, transcripts, track=""):
+        """
+        Remove transcripts from a track, updating the index without rebuilding it
+
+        :param transcripts: A list of Transcript objects, matched to those of the track by transcript_id
+        :param track: The name of the track
+        """
+        ids = set(t.transcript_id for t in transcripts)
+        removed = [t for t in self._tracks[track] if t.transcript_id in ids]
+        self._tracks[track] = [t for t in self._tracks[track] if t.transcript_id not in ids]
+        super(TrackPlot, self).remove_transcripts(removed)
+
+
+    def _assign_levels(self):
+        """
+        Pack each track separately, and stack the tracks from top to bottom
+        """
+        gap = self.prefs["track_gap"]
+        names, ys = [], []
+
+        first_level = 0
+        for name, transcripts in self._tracks.items():
+            # empty levels separate the tracks, and hold the track name
+            labelled = self.prefs["show_track_names"] and name != "" and gap > 0
+            if labelled or first_level > 0:
+                first_level += gap
+            if labelled:
+                names.append(name)
+                ys.append(level_y(first_level - 1, self.prefs))
+
+            self.pack(transcripts, self.prefs.get("pack", False), self.prefs.get("pack_method", "sorted"))
+            for t in transcripts:
+                t.draw_level += first_level
+
+            if len(transcripts) > 0:
+                first_level = max(t.draw_level for t in transcripts) + 1
+
+        # only send the names to the browser when they have moved
+        if self._track_names.data["name"] != names or self._track_names.data["y"] != ys:
+            self._track_names.data = dict(name=names, y=ys)
+
+
+    @staticmethod
+    def _transcript_key(transcript):
+        """
+        The key identifying a transcript between incremental updates
+        """
+        return transcript.track, transcript.transcript_id
+
+
+    @staticmethod
+    def _gene_key(transcript):
+        """
+        The key identifying the gene of a transcript, so that genes are merged within, but not across, tracks
+        """
+        return transcript.track, transcript.gene_id
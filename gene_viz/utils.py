@@ -3,10 +3,97 @@ Utilities and helpers
 """
 
 import sys
+import json
 from .features import Transcript, Exon, CDS
 
 
-def transcripts_from_gffutils(db, contig, start, end):
+# all genes in a region, with their transcripts, exons and coding regions, in a single query
+# against the tables of a gffutils database
+gffutils_bulk_query = """
+SELECT DISTINCT
+    genes.id, genes.attributes,
+    transcripts.id, transcripts.seqid, transcripts.start, transcripts.end, transcripts.strand, transcripts.attributes,
+    children.id, children.featuretype, children.seqid, children.start, children.end, children.attributes
+FROM features AS genes
+JOIN relations AS gene_relations
+    ON gene_relations.parent = genes.id
+JOIN features AS transcripts
+    ON transcripts.id = gene_relations.child AND transcripts.featuretype = 'transcript'
+LEFT JOIN relations AS transcript_relations
+    ON transcript_relations.parent = transcripts.id
+LEFT JOIN features AS children
+    ON children.id = transcript_relations.child AND children.featuretype IN ('exon', 'CDS')
+WHERE genes.featuretype = 'gene' AND genes.seqid = ? AND genes.start <= ? AND genes.end >= ? {bins}
+ORDER BY genes.start, genes.id, transcripts.start, transcripts.id, children.start
+"""
+
+# tables and columns used by gffutils_bulk_query
+gffutils_schema = dict(
+    features=("id", "seqid", "featuretype", "start", "end", "strand", "attributes", "bin"),
+    relations=("parent", "child"),
+)
+
+
+def _has_gffutils_schema(db):
+    """
+    Check that a gffutils database has the tables and columns needed for bulk queries
+    """
+    conn = getattr(db, "conn", None)
+    if conn is None:
+        return False
+
+    try:
+        for table, columns in gffutils_schema.items():
+            existing = set(row[1] for row in conn.execute("PRAGMA table_info({})".format(table)))
+            if not existing.issuperset(columns):
+                return False
+    except Exception:
+        return False
+
+    return True
+
+
+def _gffutils_attribute(attributes, key):
+    """
+    Get an attribute value from the json encoded attributes of a gffutils feature,
+    unwrapping single values in the same way as gffutils.constants.always_return_list = False
+    """
+    value = attributes[key]
+    return value[0] if isinstance(value, list) and len(value) == 1 else value
+
+
+def _transcripts_from_gffutils_bulk(db, contig, start, end, gffutils):
+    """
+    Create gene_viz transcript objects from a gffutils database using a single SQL query
+    """
+    bins = gffutils.bins.bins(int(start), int(end), one=False)
+    bin_clause = "AND genes.bin IN ({})".format(",".join(map(str, bins))) if len(bins) < 900 else ""
+
+    transcripts = {}
+    gene_ids = {}
+
+    for row in db.conn.execute(gffutils_bulk_query.format(bins=bin_clause), (contig, end, start)):
+        (gene, gene_attributes, transcript, transcript_seqid, transcript_start, transcript_end, transcript_strand,
+         transcript_attributes, child, featuretype, seqid, child_start, child_end, attributes) = row
+
+        if gene not in gene_ids:
+            gene_ids[gene] = _gffutils_attribute(json.loads(gene_attributes), "gene_id")
+
+        t = transcripts.get(transcript)
+        if t is None:
+            t = Transcript(_gffutils_attribute(json.loads(transcript_attributes), "transcript_id"), gene_ids[gene],
+                           transcript_seqid, transcript_start, transcript_end, transcript_strand)
+            transcripts[transcript] = t
+
+        if featuretype == "exon":
+            t.add_exon(Exon(_gffutils_attribute(json.loads(attributes), "exon_id"), seqid, child_start, child_end))
+        elif featuretype == "CDS":
+            t.add_cds(CDS(seqid, child_start, child_end))
+
+    return list(transcripts.values())
+
+
+def transcripts_from_gffutils(db, contig, start, end, bulk=True):
     """
     Utility function to create gene_viz transcript objects from a gffutils database
 
@@ -14,6 +101,9 @@ def transcripts_from_gffutils(db, contig, start, end):
     :param contig:  Name of contig to use in query
     :param start:   Start position of query
     :param end:     End position of query
+    :param bulk:    If True, fetch all features of the region with a single SQL query.
+                    Falls back to querying the children of each gene and transcript
+                    if the database schema is not recognised
     :return:        A list of gene_viz transcript objects
 
     example usage
@@ -30,6 +120,9 @@ def transcripts_from_gffutils(db, contig, start, end):
         print("Unable to import gff_utils", file=sys.stderr)
         raise
 
+    if bulk and _has_gffutils_schema(db):
+        return _transcripts_from_gffutils_bulk(db, contig, start, end, gffutils)
+
     gffutils.constants.always_return_list = False
 
     for gene in db.features_of_type("gene", limit=(contig, start, end)):
@@ -91,3 +184,80 @@ def transcripts_from_pyensembl(db, contig, start, end):
             transcript_list.append(t)
 
     return transcript_list
+
+
+def transcripts_from_gtf(path, contig, start, end):
+    """
+    Utility function to create gene_viz transcript objects directly from a GTF or GFF3 file
+
+    The file is streamed, without building a database, so it must be sorted by contig
+    and position with the features of each gene grouped together, as in the GENCODE
+    and Ensembl distributions. See gene_viz.gff for reading unsorted files.
+
+    :param path:    Path to a GTF or GFF3 file, optionally gzip compressed
+    :param contig:  Name of contig to use in query
+    :param start:   Start position of query
+    :param end:     End position of query
+    :return:        A list of gene_viz transcript objects
+
+    example usage
+    >>> from gene_viz.utils import transcripts_from_gtf
+    >>> transcripts = transcripts_from_gtf("gencode.v27.basic.annotation.gtf.gz", "chr2", 2210223, 2300331)
+    """
+    from .gff import read_transcripts
+
+    return list(read_transcripts(path, contig, start, end))
+
+
+def transcripts_from_tabix(db, contig, start, end):
+    """
+    Utility function to create gene_viz transcript objects from a bgzip compressed, tabix indexed
+    GTF, GFF3 or BED file
+
+    Only the compressed blocks containing the region are read, so the time taken doesn't
+    depend on the size of the file.
+
+    :param db:      A gene_viz.tabix.TabixFile, or the path to an indexed file
+    :param contig:  Name of contig to use in query
+    :param start:   Start position of query
+    :param end:     End position of query
+    :return:        A list of gene_viz transcript objects
+
+    example usage
+    >>> from gene_viz.tabix import open_tabix
+    >>> from gene_viz.utils import transcripts_from_tabix
+    >>> db = open_tabix("gencode.v27.basic.annotation.sorted.gtf.gz")
+    >>> transcripts = transcripts_from_tabix(db, "chr2", 2210223, 2300331)
+    """
+    from .tabix import open_tabix, annotation_format, read_region
+
+    if isinstance(db, str):
+        with open_tabix(db) as tabix:
+            return read_region(tabix, contig, start, end, annotation_format(db))
+
+    return read_region(db, contig, start, end, annotation_format(db.path))
+
+
+def transcripts_from_snapshot(db, contig, start, end):
+    """
+    Utility function to create gene_viz transcript objects from a snapshot file
+
+    :param db:      A gene_viz.snapshot.Snapshot, or the path to a snapshot file
+    :param contig:  Name of contig to use in query
+    :param start:   Start position of query
+    :param end:     End position of query
+    :return:        A list of gene_viz transcript objects
+
+    example usage
+    >>> from gene_viz.snapshot import Snapshot
+    >>> from gene_viz.utils import transcripts_from_snapshot
+    >>> db = Snapshot("gencode.v27.snapshot")
+    >>> transcripts = transcripts_from_snapshot(db, "chr2", 2210223, 2300331)
+    """
+    from .snapshot import Snapshot
+
+    if isinstance(db, str):
+        with Snapshot(db) as snapshot:
+            return snapshot.query(contig, start, end)
+
+    return db.query(contig, start, end)
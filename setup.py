@@ -28,14 +28,21 @@ setup(
     license="MIT",
     platforms=["linux"],
     packages=["gene_viz"],
-    python_requires='>=2.7',
+    python_requires='>=3.7',
     install_requires=[
         "bokeh",
-        "pandas",
+        "numpy",
         "webcolors",
         "pyinterval"
     ],
+    extras_require={
+        # exporting plot data as DataFrames
+        "dataframes": ["pandas"],
+    },
     entry_points={
+        "console_scripts": [
+            "gene-viz-batch = gene_viz.batch:main",
+        ],
     },
     classifiers=[
         "Development Status :: 3 - Alpha",
@@ -43,6 +50,7 @@ setup(
         "Intended Audience :: Science/Research",
         "Operating System :: POSIX :: Linux",
         "Programming Language :: Python",
+        "Programming Language :: Python :: 3",
         "Topic :: Scientific/Engineering",
         "License :: OSI Approved :: MIT License",
     ],
@@ -0,0 +1,68 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from gene_viz import aio
+from gene_viz.utils import transcripts_from_gffutils
+
+gffutils = pytest.importorskip("gffutils")
+
+
+data = os.path.join(os.path.dirname(__file__), "data")
+
+
+def summary(transcript):
+    return (transcript.transcript_id, transcript.gene_id, transcript.start, transcript.end,
+            [(x.exon_id, x.start, x.end) for x in transcript.exons], [(x.start, x.end) for x in transcript.cds])
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "annotation.db")
+    gffutils.create_db(os.path.join(data, "annotation.gtf"), path, disable_infer_genes=True,
+                       disable_infer_transcripts=True)
+    pragmas = dict(gffutils.constants.default_pragmas, cache_size=1234)
+    db = gffutils.FeatureDB(path, keep_order=True, pragmas=pragmas, sort_attribute_values=True,
+                            text_factory=str)
+    yield db
+    aio.close_thread_sources(db)
+    db.conn.close()
+
+
+def test_thread_copy_keeps_settings(db):
+    with ThreadPoolExecutor(1) as executor:
+        copy = executor.submit(aio.thread_source, db).result()
+        assert copy is not db
+        assert executor.submit(aio.thread_source, db).result() is copy
+
+        for name in ("keep_order", "pragmas", "sort_attribute_values", "default_encoding"):
+            assert getattr(copy, name) == getattr(db, name)
+        assert copy.conn.text_factory is db.conn.text_factory
+        cache_size = executor.submit(lambda: copy.conn.execute("PRAGMA cache_size").fetchone()[0]).result()
+        assert cache_size == 1234
+
+
+def test_load_in_threads(db):
+    expected = [summary(t) for t in transcripts_from_gffutils(db, "chr1", 1, 10000)]
+
+    async def load():
+        return await asyncio.gather(*[aio.load_transcripts(transcripts_from_gffutils, db, "chr1", 1, 10000, executor)
+                                      for _ in range(8)])
+
+    with ThreadPoolExecutor(3) as executor:
+        results = asyncio.run(load())
+        assert all([summary(t) for t in result] == expected for result in results)
+        assert 0 < len(aio._thread_sources[id(db)][1]) <= 3
+
+        copies = list(aio._thread_sources[id(db)][1].values())
+        aio.close_thread_sources(db)
+        assert id(db) not in aio._thread_sources
+        for copy in copies:
+            with pytest.raises(Exception):
+                copy.conn.execute("SELECT 1")
+
+        # new copies are opened after closing
+        results = asyncio.run(load())
+        assert all([summary(t) for t in result] == expected for result in results)
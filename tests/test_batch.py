@@ -0,0 +1,71 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from gene_viz import batch
+
+
+regions = [("a", "chr1", 1000, 2000), ("b", "chr1", 3000, 4000), ("c", "chr1", 5000, 6000)]
+
+
+def test_missing_source_raises(tmp_path):
+    source = str(tmp_path / "missing.gtf.gz")
+    with pytest.raises(FileNotFoundError):
+        batch.export_regions(source, regions, str(tmp_path / "out"), processes=2)
+
+
+def test_missing_source_raises_in_process(tmp_path):
+    source = str(tmp_path / "missing.gtf.gz")
+    with pytest.raises(FileNotFoundError):
+        batch.export_regions(source, regions, str(tmp_path / "out"), processes=1)
+
+
+def _open_in_parent_only(parent, open_source):
+    def wrapper(path):
+        if os.getpid() != parent:
+            raise OSError("cannot open {}".format(path))
+        return open_source(path)
+    return wrapper
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="needs workers forked from the test")
+def test_worker_open_failure_is_reported(tmp_path, monkeypatch):
+    source = tmp_path / "annotation.gtf"
+    source.write_text("")
+    monkeypatch.setattr(batch, "open_source", _open_in_parent_only(os.getpid(), batch.open_source))
+
+    results = batch.export_regions(str(source), regions, str(tmp_path / "out"), processes=2)
+
+    assert len(results) == len(regions)
+    for result in results:
+        assert "cannot open" in result["error"]
+
+
+def _slow_render(task):
+    time.sleep(0.5)
+    index, (name, contig, start, end) = task
+    return index, dict(name=name, region="{}:{}-{}".format(contig, start, end), error=None)
+
+
+class _Stop(Exception):
+    pass
+
+
+def _stop(result, completed, total):
+    raise _Stop()
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="needs workers forked from the test")
+def test_error_stops_the_pool(tmp_path, monkeypatch):
+    source = tmp_path / "annotation.gtf"
+    source.write_text("")
+    monkeypatch.setattr(batch, "_render", _slow_render)
+    many = [("r{}".format(i), "chr1", 1, 100) for i in range(40)]
+
+    started = time.time()
+    with pytest.raises(_Stop):
+        batch.export_regions(str(source), many, str(tmp_path / "out"), processes=2, progress=_stop)
+    # rather than the 10s taken to render every region
+    assert time.time() - started < 5
@@ -0,0 +1,170 @@
+import random
+
+import pytest
+
+from gene_viz.defaults import defaults
+from gene_viz.features import Transcript, Exon, CDS
+from gene_viz.geometry import coding_parts, exon_columns, exon_vertex_columns
+
+
+def cds_blocks(transcript):
+    """
+    The CDS of a transcript merged into sorted, non-overlapping closed intervals
+    """
+    blocks = []
+    for c in sorted(transcript.cds, key=lambda c: c.start):
+        if len(blocks) > 0 and c.start <= blocks[-1][1]:
+            blocks[-1][1] = max(blocks[-1][1], c.end)
+        else:
+            blocks.append([c.start, c.end])
+    return blocks
+
+
+def reference_exons(transcripts, ys, prefs):
+    """
+    The exon patches built one exon at a time, as before they were vectorized
+    """
+    coding_exon_half_height = prefs["coding_exon_height"] / 2
+    noncoding_exon_half_height = prefs["noncoding_exon_height"] / 2
+
+    xs, patch_ys, coding = [], [], []
+    for transcript, y in zip(transcripts, ys):
+        blocks = cds_blocks(transcript)
+        for exon in transcript.exons:
+            # the first CDS block overlapping the exon
+            overlap = [(max(exon.start, b[0]), min(exon.end, b[1])) for b in blocks
+                       if b[0] <= exon.end and b[1] >= exon.start]
+
+            if len(overlap) > 0:
+                cds = overlap[0]
+                vertices = [(exon.start, noncoding_exon_half_height),
+                            (cds[0], noncoding_exon_half_height),
+                            (cds[0], coding_exon_half_height),
+                            (cds[1], coding_exon_half_height),
+                            (cds[1], noncoding_exon_half_height),
+                            (exon.end, noncoding_exon_half_height)]
+            else:
+                vertices = [(exon.start, noncoding_exon_half_height),
+                            (exon.end, noncoding_exon_half_height)]
+
+            if vertices[0][0] == vertices[1][0]:
+                vertices = vertices[2:]
+            # a non-coding exon of zero length has no outline
+            if len(vertices) > 0 and vertices[-2][0] == vertices[-1][0]:
+                vertices = vertices[:-2]
+
+            vertices += [(v[0], -v[1]) for v in vertices[::-1]]
+            xs.append([v[0] for v in vertices])
+            patch_ys.append([y + v[1] for v in vertices])
+            coding.append(len(overlap) > 0)
+
+    return xs, patch_ys, coding
+
+
+def random_transcripts(seed, num_transcripts=300):
+    rng = random.Random(seed)
+    transcripts = []
+    for i in range(num_transcripts):
+        position = rng.randint(1, 100000)
+        t = Transcript("T{}".format(i), "G{}".format(i), "chr1", position, position)
+        for _ in range(rng.randint(0, 6)):
+            size = rng.choice((0, 1, rng.randint(2, 50)))
+            t.add_exon(Exon("", "chr1", position, position + size))
+            position += size + rng.choice((1, rng.randint(2, 50)))
+        t.end = position
+
+        exons = t.exons
+        kind = rng.random()
+        if kind < 0.2 or len(exons) == 0:
+            # non-coding
+            pass
+        elif kind < 0.5:
+            # CDS segments which start or end at an exon edge, or only touch an exon
+            for exon in exons:
+                choice = rng.randint(0, 3)
+                if choice == 0:
+                    t.add_cds(CDS("chr1", exon.start, exon.end))
+                elif choice == 1:
+                    t.add_cds(CDS("chr1", exon.end, exon.end + rng.randint(0, 5)))
+                elif choice == 2:
+                    t.add_cds(CDS("chr1", exon.start - rng.randint(0, 5), exon.start))
+        else:
+            # random, possibly overlapping, segments, some outside the exons
+            for _ in range(rng.randint(1, 4)):
+                start = rng.randint(t.start - 5, t.end + 5)
+                t.add_cds(CDS("chr1", start, start + rng.randint(0, 30)))
+        transcripts.append(t)
+
+    rng.shuffle(transcripts)
+    return transcripts
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_exon_columns_match_reference(seed):
+    transcripts = random_transcripts(seed)
+    ys = [random.Random(seed).uniform(-5, 50) for _ in transcripts]
+    prefs = dict(defaults)
+    xs, patch_ys, coding = reference_exons(transcripts, ys, prefs)
+
+    columns = exon_columns(transcripts, ys, prefs)
+    assert columns["x"] == xs
+    assert columns["y"] == patch_ys
+    assert len(columns["color"]) == len(xs)
+
+    assert coding_parts(transcripts)[4].tolist() == coding
+
+    # the same outlines as flat arrays of vertices
+    outlines, vertices = exon_vertex_columns(transcripts, ys, prefs)
+    for first, count, y, x, patch_y in zip(outlines["first"], outlines["count"], outlines["y"], xs, patch_ys):
+        assert vertices["x"][first:first + count] == x
+        assert [y + h for h in vertices["h"][first:first + count]] == patch_y
+
+
+def test_edges():
+    prefs = dict(defaults)
+    t = Transcript("T", "G", "chr1", 100, 400)
+    for start, end in ((100, 150), (200, 250), (300, 350), (380, 400)):
+        t.add_exon(Exon("", "chr1", start, end))
+    # ends at the start of the second exon, covers the third exactly, starts at the end of the fourth
+    for start, end in ((120, 200), (300, 350), (400, 420)):
+        t.add_cds(CDS("chr1", start, end))
+
+    c = prefs["coding_exon_height"] / 2
+    n = prefs["noncoding_exon_height"] / 2
+    columns = exon_columns([t], [0], prefs)
+    assert columns["x"] == [
+        [100, 120, 120, 150, 150, 120, 120, 100],
+        [200, 200, 200, 250, 250, 200, 200, 200],
+        [300, 350, 350, 300],
+        [380, 400, 400, 400, 400, 400, 400, 380],
+    ]
+    assert columns["y"] == [
+        [n, n, c, c, -c, -c, -n, -n],
+        [c, c, n, n, -n, -n, -c, -c],
+        [c, c, -c, -c],
+        [n, n, c, c, -c, -c, -n, -n],
+    ]
+
+
+def test_transcripts_kept_apart():
+    # a CDS at the end of the coordinate range of one transcript, and a non-coding
+    # exon at the start of the range in the next, mustn't be merged
+    prefs = dict(defaults)
+    transcripts = []
+    for i, cds in enumerate(((150, 200), None, (100, 110), None)):
+        t = Transcript("T{}".format(i), "G", "chr1", 100, 200)
+        t.add_exon(Exon("", "chr1", 100, 200))
+        if cds is not None:
+            t.add_cds(CDS("chr1", *cds))
+        transcripts.append(t)
+
+    xs, patch_ys, coding = reference_exons(transcripts, [0, 1, 2, 3], prefs)
+    assert coding == [True, False, True, False]
+    assert exon_columns(transcripts, [0, 1, 2, 3], prefs)["x"] == xs
+    assert coding_parts(transcripts)[4].tolist() == coding
+
+
+def test_no_exons():
+    assert exon_columns([], [], dict(defaults))["x"] == []
+    outlines, vertices = exon_vertex_columns([Transcript("T", "G", "chr1", 1, 10)], [0], dict(defaults))
+    assert outlines["count"] == [] and vertices["x"] == []
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from gene_viz.gff import read_transcripts
+
+
+data = os.path.join(os.path.dirname(__file__), "data")
+
+
+def summary(transcript):
+    return (transcript.transcript_id, transcript.gene_id, transcript.contig, transcript.start, transcript.end,
+            transcript.strand, sorted((x.exon_id, x.start, x.end) for x in transcript.exons),
+            sorted((x.start, x.end) for x in transcript.cds))
+
+
+def read(name, **kwargs):
+    return sorted(summary(t) for t in read_transcripts(os.path.join(data, name), **kwargs))
+
+
+@pytest.mark.parametrize("presorted", [True, False])
+def test_position_sorted_gff3(presorted):
+    # the first exon of each transcript comes before its mRNA
+    assert read("annotation.sorted.gff3", presorted=presorted) == read("annotation.gff3")
+
+
+@pytest.mark.parametrize("presorted", [True, False])
+def test_gtf_matches_gff3(presorted):
+    assert read("annotation.gtf", presorted=presorted) == read("annotation.gff3")
+
+
+@pytest.mark.parametrize("presorted", [True, False])
+def test_region(presorted):
+    # all transcripts of the genes overlapping the region, with all of their exons
+    transcripts = read("annotation.sorted.gff3", contig="chr1", start=4500, end=4600, presorted=presorted)
+    assert [t[0] for t in transcripts] == ["T1", "T2"]
+    assert transcripts == [t for t in read("annotation.gff3") if t[0] in ("T1", "T2")]
+
+
+def test_orphans_without_transcript():
+    lines = [
+        "chr1\ttest\texon\t100\t200\t.\t+\t.\tID=E1;Parent=missing\n",
+        "chr1\ttest\tgene\t100\t500\t.\t+\t.\tID=G1\n",
+        "chr1\ttest\tmRNA\t100\t500\t.\t+\t.\tID=T1;Parent=G1\n",
+        "chr1\ttest\texon\t100\t500\t.\t+\t.\tID=E2;Parent=T1,missing\n",
+        "chr2\ttest\tgene\t100\t500\t.\t+\t.\tID=G2\n",
+        "chr2\ttest\tmRNA\t100\t500\t.\t+\t.\tID=missing;Parent=G2\n",
+    ]
+    transcripts = sorted(summary(t) for t in read_transcripts(lines, fmt="gff3"))
+    assert transcripts == [
+        ("T1", "G1", "chr1", 100, 500, "+", [("E2", 100, 500)], []),
+        ("missing", "G2", "chr2", 100, 500, "+", [], []),
+    ]
@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.bench_import import heavy_packages, light_modules
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def imported_packages(code):
+    """
+    The top-level packages imported by running code in a new interpreter
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (root, os.environ.get("PYTHONPATH")))))
+    output = subprocess.run([sys.executable, "-c", code + "\nimport sys, json\nprint(json.dumps(sorted(sys.modules)))"],
+                            stdout=subprocess.PIPE, universal_newlines=True, check=True, env=env).stdout
+    return set(name.split(".")[0] for name in json.loads(output.splitlines()[-1]))
+
+
+@pytest.mark.parametrize("module", sorted(light_modules))
+def test_no_plotting_dependencies(module):
+    packages = imported_packages("import " + module)
+    heavy = sorted(p for p in heavy_packages if p in packages and p not in light_modules[module])
+    assert heavy == []
+
+
+def test_plot_classes_imported_on_use():
+    assert "bokeh" in imported_packages("import gene_viz\ngene_viz.GenePlot")
@@ -0,0 +1,153 @@
+import math
+import random
+from collections import Counter
+
+import numpy
+import pytest
+
+from gene_viz import GenePlot
+from gene_viz.features import Transcript, Exon, CDS
+
+from benchmarks.synthetic import synthetic_transcripts
+
+
+# how the rows of removed transcripts are hidden in each data source
+hidden = dict(
+    transcripts=lambda row: row["y0"] is None,
+    labels=lambda row: row["y"] is None,
+    exons=lambda row: row["x"] == [],
+    exon_blocks=lambda row: row["top"] is None,
+    exon_outlines=lambda row: row["count"] == 0,
+    introns=lambda row: row["y"] is None,
+)
+
+configurations = [
+    dict(binary_columns=True, exon_glyph="patches"),
+    dict(binary_columns=False, exon_glyph="patches"),
+    dict(binary_columns=True, exon_glyph="quads"),
+    dict(binary_columns=False, exon_glyph="quads"),
+]
+
+
+def plain(value):
+    if isinstance(value, numpy.ndarray):
+        return [plain(x) for x in value.tolist()]
+    if isinstance(value, (list, tuple)):
+        return [plain(x) for x in value]
+    if isinstance(value, numpy.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def drawn_rows(plot):
+    """
+    The rows drawn from each data source, in any order, leaving out the rows of removed transcripts.
+    Exon outlines are given with the vertices they refer to
+    """
+    rows = {}
+    for name, source in plot._gene_data.items():
+        columns = sorted(source.data)
+        values = [plain(source.data[column]) for column in columns]
+        table = [dict(zip(columns, row)) for row in zip(*values)]
+
+        if name in hidden:
+            table = [row for row in table if not hidden[name](row)]
+
+        if name == "exon_outlines":
+            vertices = {k: plain(v) for k, v in plot._gene_data["exon_vertices"].data.items()}
+            for row in table:
+                first = row.pop("first")
+                for k, v in vertices.items():
+                    row["vertex_" + k] = v[first:first + row["count"]]
+        elif name == "exon_vertices":
+            continue
+
+        rows[name] = Counter(repr(sorted(row.items())) for row in table)
+    return rows
+
+
+def rebuilt_rows(prefs, transcripts):
+    plot = GenePlot(dict(prefs, incremental=False))
+    plot.transcripts = transcripts
+    plot.update()
+    return drawn_rows(plot)
+
+
+def copy(transcript):
+    t = Transcript(transcript.transcript_id, transcript.gene_id, transcript.contig, transcript.start,
+                   transcript.end, transcript.strand)
+    for exon in transcript.exons:
+        t.add_exon(Exon(exon.exon_id, exon.contig, exon.start, exon.end))
+    for cds in transcript.cds:
+        t.add_cds(CDS(cds.contig, cds.start, cds.end))
+    return t
+
+
+def updates(seed):
+    """
+    Successive lists of transcripts, adding, removing and moving transcripts, and reusing a transcript id
+    """
+    rng = random.Random(seed)
+    transcripts = synthetic_transcripts(200, seed=seed)
+    extra = synthetic_transcripts(60, seed=seed + 1)
+    for t in extra:
+        t.transcript_id = "new_" + t.transcript_id
+    yield transcripts
+
+    # remove some transcripts
+    transcripts = [t for t in transcripts if rng.random() > 0.1]
+    yield transcripts
+
+    # add some transcripts
+    transcripts = sorted(transcripts + extra[:30], key=lambda t: t.start)
+    yield transcripts
+
+    # add and remove at once
+    transcripts = [t for t in transcripts if rng.random() > 0.05] + extra[30:]
+    yield transcripts
+
+    # the same id for a transcript of a different shape
+    changed = copy(transcripts[10])
+    changed.exons = changed.exons[:1]
+    changed.end = changed.exons[0].end
+    transcripts = transcripts[:10] + [changed] + transcripts[11:]
+    yield transcripts
+
+    # new draw levels only
+    transcripts = list(reversed(transcripts))
+    yield transcripts
+
+
+@pytest.mark.parametrize("pack", [True, False])
+@pytest.mark.parametrize("prefs", configurations, ids=lambda p: "{exon_glyph}-binary{binary_columns}".format(**p))
+def test_apply_matches_rebuild(prefs, pack):
+    prefs = dict(prefs, pack=pack)
+    plot = GenePlot(dict(prefs, incremental=True))
+
+    applied = []
+    apply = plot._source_rows.apply
+    plot._source_rows.apply = lambda *args: applied.append(apply(*args)) or applied[-1]
+
+    for transcripts in updates(1):
+        plot.transcripts = transcripts
+        plot.update()
+        assert drawn_rows(plot) == rebuilt_rows(prefs, transcripts)
+
+    # every update after the first was incremental
+    assert applied == [False] + [True] * (len(applied) - 1)
+    # and removed transcripts were hidden rather than rebuilt
+    assert len(plot._gene_data["transcripts"].data["y0"]) > len(transcripts)
+
+
+def test_rebuild_when_mostly_removed():
+    plot = GenePlot(dict(incremental=True))
+    transcripts = synthetic_transcripts(100)
+    plot.transcripts = transcripts
+    plot.update()
+
+    plot.transcripts = transcripts[:20]
+    plot.update()
+    assert len(plot._gene_data["transcripts"].data["y0"]) == 20
+    assert drawn_rows(plot) == rebuilt_rows({}, transcripts[:20])
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from gene_viz.features import Transcript
+from gene_viz.index import TranscriptIndex
+
+
+def random_transcripts(rng, num_transcripts, prefix="T", span=20000, max_size=2000):
+    transcripts = []
+    for i in range(num_transcripts):
+        start = rng.randint(1, span)
+        end = start + rng.choice((0, 1, rng.randint(0, max_size), rng.randint(0, 10 * max_size)))
+        transcripts.append(Transcript("{}{}".format(prefix, i), "G", "chr1", start, end))
+    return transcripts
+
+
+def scan(transcripts, start, end):
+    return set(id(t) for t in transcripts if t.start <= end and t.end >= start)
+
+
+def distance(transcript, position):
+    return max(0, transcript.start - position, position - transcript.end)
+
+
+def check(index, transcripts, rng):
+    assert len(index) == len(transcripts)
+    assert set(map(id, index)) == set(map(id, transcripts))
+
+    regions = [(p, p) for p in (0, 1, 20000, 50000)]
+    for _ in range(100):
+        start = rng.randint(-100, 25000)
+        regions.append((start, start + rng.choice((0, 1, 100, 5000))))
+    for start, end in regions:
+        found = index.overlapping(start, end)
+        assert set(map(id, found)) == scan(transcripts, start, end)
+        assert [t.start for t in found] == sorted(t.start for t in found)
+
+    for _ in range(100):
+        position = rng.randint(-1000, 45000)
+        nearest = index.nearest(position)
+        if len(transcripts) == 0:
+            assert nearest is None
+        else:
+            assert distance(nearest, position) == min(distance(t, position) for t in transcripts)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_linear_scan(seed):
+    rng = random.Random(seed)
+    transcripts = random_transcripts(rng, 500)
+    check(TranscriptIndex(transcripts), transcripts, rng)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_add_and_remove(seed):
+    rng = random.Random(seed)
+    transcripts = random_transcripts(rng, 300)
+    index = TranscriptIndex(transcripts)
+
+    for step in range(8):
+        # inserted one by one, or merged with a sort
+        added = random_transcripts(rng, rng.choice((1, 10, TranscriptIndex.max_inserts + 50)), "A{}_".format(step))
+        index.add(added)
+        transcripts = transcripts + added
+        check(index, transcripts, rng)
+
+        removed = rng.sample(transcripts, len(transcripts) // 4)
+        # transcripts that aren't indexed, including one with the same coordinates as one that is, are ignored
+        index.remove(removed + [Transcript("X", "G", "chr1", removed[0].start, removed[0].end)])
+        removed = set(map(id, removed))
+        transcripts = [t for t in transcripts if id(t) not in removed]
+        check(index, transcripts, rng)
+
+
+def test_empty():
+    rng = random.Random(0)
+    index = TranscriptIndex()
+    check(index, [], rng)
+
+    transcripts = random_transcripts(rng, 5)
+    index.add(transcripts)
+    index.remove(transcripts)
+    check(index, [], rng)
@@ -0,0 +1,42 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from gene_viz import GenePlot
+from gene_viz.geneplot_callbacks import lod_callback
+
+from benchmarks.synthetic import synthetic_transcripts
+
+
+def js_overview(plot_width, start, end, threshold):
+    """
+    Whether the browser side level of detail callback shows the overview
+    """
+    script = """
+var cb_obj = {start: %s, end: %s};
+var plot = {plot_width: %s, inner_width: %s};
+var detail_renderers = [{visible: true}];
+var overview_renderers = [{visible: false}];
+%s
+console.log(JSON.stringify(overview_renderers[0].visible));
+""" % (start, end, plot_width, plot_width - 50, lod_callback % threshold)
+    return json.loads(subprocess.check_output(["node", "-e", script]))
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+@pytest.mark.parametrize("plot_width", [400, 1000])
+def test_same_threshold_as_browser(plot_width):
+    threshold = 500
+    plot = GenePlot(dict(level_of_detail=True, lod_bp_per_pixel=threshold))
+    plot.transcripts = synthetic_transcripts(10)
+    plot.figure.plot_width = plot_width
+
+    limit = threshold * plot_width
+    for width in (limit - 1000, limit - 1, limit, limit + 1, limit + 1000):
+        plot.x_range = (1000, 1000 + width)
+        plot.update()
+        overview = plot._overview_renderers[0].visible
+        assert overview == (width > limit)
+        assert js_overview(plot_width, 1000, 1000 + width, threshold) == overview
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from gene_viz.features import Transcript
+from gene_viz.packing import packers, pack_sorted, pack_sweep
+
+
+def random_transcripts(seed, num_transcripts=300, span=5000, max_size=500):
+    # small coordinates, so that many transcripts share start and end positions
+    rng = random.Random(seed)
+    transcripts = []
+    for i in range(num_transcripts):
+        start = rng.randint(1, span)
+        end = start + rng.choice((0, 1, rng.randint(0, max_size)))
+        transcripts.append(Transcript("T{}".format(i), "G{}".format(i), "chr1", start, end))
+    return transcripts
+
+
+def overlaps(a, b):
+    # transcripts are closed intervals
+    return a.start <= b.end and b.start <= a.end
+
+
+def original_layout(transcripts):
+    """
+    The pairwise size-sorted packing which pack_sorted replaced
+    """
+    levels = {}
+    placed = []
+    for t1 in sorted(transcripts, key=lambda x: (x.size, x.start)):
+        level = 0
+        for t2 in placed:
+            if overlaps(t1, t2) and levels[id(t2)] >= level:
+                level = levels[id(t2)] + 1
+        levels[id(t1)] = level
+        placed.append(t1)
+    return [levels[id(t)] for t in transcripts]
+
+
+def max_depth(transcripts):
+    # the most transcripts overlapping any position
+    events = sorted([(t.start, 0) for t in transcripts] + [(t.end, 1) for t in transcripts])
+    depth = deepest = 0
+    for _, is_end in events:
+        depth += -1 if is_end else 1
+        deepest = max(deepest, depth)
+    return deepest
+
+
+@pytest.mark.parametrize("method", sorted(packers))
+@pytest.mark.parametrize("seed", range(20))
+def test_no_overlaps(method, seed):
+    transcripts = random_transcripts(seed)
+    packers[method](transcripts)
+
+    rows = {}
+    for t in transcripts:
+        rows.setdefault(t.draw_level, []).append(t)
+    for row in rows.values():
+        row.sort(key=lambda t: t.start)
+        for a, b in zip(row, row[1:]):
+            assert not overlaps(a, b)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_sorted_matches_original(seed):
+    transcripts = random_transcripts(seed)
+    pack_sorted(transcripts)
+    assert [t.draw_level for t in transcripts] == original_layout(transcripts)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_sweep_uses_fewest_levels(seed):
+    transcripts = random_transcripts(seed)
+    pack_sweep(transcripts)
+    assert max(t.draw_level for t in transcripts) + 1 == max_depth(transcripts)
+
+
+@pytest.mark.parametrize("method", sorted(packers))
+def test_empty_and_single(method):
+    packers[method]([])
+    transcripts = random_transcripts(0, num_transcripts=1)
+    packers[method](transcripts)
+    assert transcripts[0].draw_level == 0
@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from gene_viz.cache import genes_in_region
+from gene_viz.prefetch import RegionPrefetcher
+
+from benchmarks.synthetic import synthetic_transcripts
+
+
+transcripts = synthetic_transcripts(500)
+
+
+def loader(db, contig, start, end):
+    return genes_in_region(db, start, end)
+
+
+def test_windows():
+    with RegionPrefetcher(loader, transcripts, window_size=1000) as prefetcher:
+        assert prefetcher.window(100, 400) == (0, 1000)
+        assert prefetcher.window(600, 900) == (500, 1500)
+        # wider than half a window
+        assert prefetcher.window(100, 700) == (0, 2000)
+
+
+def test_load_matches_loader():
+    with RegionPrefetcher(loader, transcripts, window_size=20000) as prefetcher:
+        for start in range(1, 200000, 7000):
+            window = prefetcher.window(start, start + 5000)
+            ids = [t.transcript_id for t in prefetcher.load("chr1", start, start + 5000)]
+            assert sorted(ids) == sorted(t.transcript_id for t in loader(transcripts, "chr1", *window))
+            # give the prefetches time to finish, as between pans
+            for future in list(prefetcher._pending.values()):
+                future.result()
+        stats = prefetcher.stats
+        assert stats.requests == stats.hits + stats.late_hits + stats.misses
+        assert stats.hits > 0
+
+
+def test_cancelled_prefetch_is_counted():
+    # the only background thread is busy, so prefetches can't start
+    busy = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.submit(busy.wait)
+
+    try:
+        with RegionPrefetcher(loader, transcripts, window_size=10000, executor=executor) as prefetcher:
+            prefetcher.load("chr1", 20000, 21000)
+            assert prefetcher.stats.prefetched == 2
+            assert prefetcher.stats.cancelled == 0
+
+            # the window after the first was being prefetched, and is cancelled and loaded instead
+            prefetcher.load("chr1", 25000, 26000)
+            assert prefetcher.stats.misses == 2
+            assert prefetcher.stats.late_hits == 0
+            assert prefetcher.stats.cancelled >= 1
+            assert prefetcher.stats.cancelled == prefetcher.stats.prefetched - len(prefetcher._pending)
+    finally:
+        busy.set()
+        executor.shutdown()
@@ -0,0 +1,116 @@
+import json
+import random
+import struct
+
+import pytest
+
+from gene_viz.features import Transcript, Exon, CDS
+from gene_viz.snapshot import Snapshot, snapshot_magic, write_snapshot
+from gene_viz.utils import transcripts_from_snapshot
+
+from benchmarks.synthetic import synthetic_transcripts
+
+
+def summary(transcript):
+    return (transcript.transcript_id, transcript.gene_id, transcript.contig, transcript.start, transcript.end,
+            transcript.strand, [(x.exon_id, x.start, x.end) for x in transcript.exons],
+            [(x.start, x.end) for x in transcript.cds])
+
+
+def source_transcripts():
+    transcripts = synthetic_transcripts(300, contig="chr1") + synthetic_transcripts(50, contig="chr2", seed=1)
+
+    # a long gene, so that genes starting before a region can still overlap it after shorter genes have ended
+    long_gene = Transcript("long", "G_long", "chr1", 10, 2000000, "-")
+    long_gene.add_exon(Exon("exon_é", "chr1", 10, 20))
+    long_gene.add_exon(Exon("", "chr1", 1999990, 2000000))
+    long_gene.add_cds(CDS("chr1", 15, 20))
+    transcripts.append(long_gene)
+
+    # a gene of one base, on a contig of its own
+    point = Transcript("point", "G_point", "chr3", 500, 500)
+    point.add_exon(Exon("E", "chr3", 500, 500))
+    transcripts.append(point)
+    return transcripts
+
+
+def expected(transcripts, contig, start, end):
+    # the transcripts of the genes overlapping the region
+    genes = {}
+    for t in transcripts:
+        if t.contig == contig:
+            genes.setdefault(t.gene_id, []).append(t)
+    return sorted(summary(t) for members in genes.values()
+                  if min(t.start for t in members) <= end and max(t.end for t in members) >= start
+                  for t in members)
+
+
+@pytest.fixture(scope="module")
+def snapshot_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("snapshot") / "annotation.snapshot")
+    write_snapshot(path, source_transcripts())
+    return path
+
+
+def test_layout(snapshot_path):
+    with open(snapshot_path, "rb") as f:
+        data = f.read()
+    assert data[:len(snapshot_magic)] == snapshot_magic
+
+    header_size, = struct.unpack_from("<Q", data, len(snapshot_magic))
+    data_start = len(snapshot_magic) + 8 + header_size
+    assert data_start % 8 == 0
+
+    header = json.loads(data[len(snapshot_magic) + 8:data_start].decode("utf-8"))
+    assert sorted(header["contigs"]) == ["chr1", "chr2", "chr3"]
+    for array in header["arrays"].values():
+        assert array["offset"] % 8 == 0
+    assert len(data) % 8 == 0
+
+
+def test_whole_contigs(snapshot_path):
+    transcripts = source_transcripts()
+    with Snapshot(snapshot_path) as snapshot:
+        assert len(snapshot) == len(transcripts)
+        found = [t for contig in snapshot.contigs for t in snapshot.query(contig, 0, 2 ** 32 - 1)]
+    assert sorted(map(summary, found)) == sorted(map(summary, transcripts))
+
+
+def test_regions(snapshot_path):
+    transcripts = source_transcripts()
+    rng = random.Random(0)
+
+    regions = [("chr3", 499, 499), ("chr3", 500, 500), ("chr3", 501, 501), ("chr1", 1999999, 2000000),
+               ("chr1", 2000001, 3000000), ("chr1", 1, 9), ("chrX", 1, 10 ** 9), ("chr2", 0, 0)]
+    for t in rng.sample(transcripts, 50):
+        # the edges of transcripts
+        regions.extend([(t.contig, t.start, t.start), (t.contig, t.end, t.end),
+                        (t.contig, t.start - 1, t.start - 1), (t.contig, t.end + 1, t.end + 1)])
+    for _ in range(100):
+        start = rng.randint(1, 1500000)
+        regions.append((rng.choice(("chr1", "chr2")), start, start + rng.choice((0, 100, 10000, 100000))))
+
+    with Snapshot(snapshot_path) as snapshot:
+        for region in regions:
+            found = transcripts_from_snapshot(snapshot, *region)
+            assert sorted(map(summary, found)) == expected(transcripts, *region)
+
+    # opened by path
+    assert sorted(map(summary, transcripts_from_snapshot(snapshot_path, "chr3", 1, 1000))) == \
+        expected(transcripts, "chr3", 1, 1000)
+
+
+def test_empty(tmp_path):
+    path = str(tmp_path / "empty.snapshot")
+    write_snapshot(path, [])
+    with Snapshot(path) as snapshot:
+        assert len(snapshot) == 0
+        assert snapshot.contigs == []
+        assert snapshot.query("chr1", 1, 1000) == []
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / "annotation.gtf"
+    path.write_text("chr1\ttest\texon\t1\t10\t.\t+\t.\tgene_id \"G\";\n")
+    with pytest.raises(ValueError):
+        Snapshot(str(path))
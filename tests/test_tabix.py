@@ -0,0 +1,119 @@
+import os
+import random
+import shutil
+
+import pytest
+
+from gene_viz.gff import read_transcripts
+from gene_viz.tabix import TabixFile, open_tabix, read_region, transcript_from_bed
+from gene_viz.utils import transcripts_from_tabix
+
+pysam = pytest.importorskip("pysam")
+
+
+data = os.path.join(os.path.dirname(__file__), "data")
+
+fixtures = dict(gtf=("annotation.gtf", "gff"), gff3=("annotation.sorted.gff3", "gff"), bed=("annotation.bed", "bed"))
+
+regions = [
+    ("chr1", 1, 999), ("chr1", 1, 1000), ("chr1", 1000, 1000), ("chr1", 1500, 1999), ("chr1", 4500, 4600),
+    ("chr1", 5000, 5000), ("chr1", 5001, 5001), ("chr1", 6000, 7000), ("chr1", 6001, 9000), ("chr1", 1, 10 ** 8),
+    ("chr2", 1, 100), ("chr2", 901, 1000), ("chr2", 1, 10 ** 8), ("chr3", 1, 1000),
+]
+
+
+def summary(transcript):
+    return (transcript.transcript_id, transcript.gene_id, transcript.contig, transcript.start, transcript.end,
+            transcript.strand, sorted((x.exon_id, x.start, x.end) for x in transcript.exons),
+            sorted((x.start, x.end) for x in transcript.cds))
+
+
+def index(directory, name, preset, csi=False):
+    # tabix_index compresses the file, replacing it
+    path = os.path.join(str(directory), name)
+    shutil.copy(os.path.join(data, name), path)
+    return pysam.tabix_index(path, preset=preset, csi=csi, force=True)
+
+
+def overlapping_lines(path, contig, start, end, zero_based=False):
+    """
+    The lines of a file overlapping a region, by a linear scan
+    """
+    with open(path) as f:
+        lines = [line.rstrip("\n") for line in f if not line.startswith("#")]
+    columns = (1, 2) if zero_based else (3, 4)
+    return [line for line in lines if line.split("\t")[0] == contig
+            and int(line.split("\t")[columns[0]]) + zero_based <= end and int(line.split("\t")[columns[1]]) >= start]
+
+
+def expected(fmt, contig, start, end):
+    name = fixtures[fmt][0]
+    if fmt == "bed":
+        transcripts = [transcript_from_bed(line) for line in
+                       overlapping_lines(os.path.join(data, name), contig, start, end, zero_based=True)]
+    else:
+        transcripts = read_transcripts(os.path.join(data, name), contig, start, end, presorted=False)
+    return sorted(summary(t) for t in transcripts)
+
+
+@pytest.fixture(scope="module", params=sorted(fixtures))
+def indexed(request, tmp_path_factory):
+    name, preset = fixtures[request.param]
+    return request.param, index(tmp_path_factory.mktemp("tabix"), name, preset)
+
+
+@pytest.mark.parametrize("region", regions)
+def test_fetch(indexed, region):
+    fmt, path = indexed
+    with TabixFile(path) as tabix, pysam.TabixFile(path) as reference:
+        lines = list(tabix.fetch(*region))
+        contig, start, end = region
+        assert lines == overlapping_lines(os.path.join(data, fixtures[fmt][0]), *region, zero_based=fmt == "bed")
+        if contig in reference.contigs:
+            assert lines == list(reference.fetch(contig, start - 1, end))
+
+
+@pytest.mark.parametrize("region", regions)
+def test_read_region(indexed, region):
+    fmt, path = indexed
+    with TabixFile(path) as tabix:
+        transcripts = read_region(tabix, *region, fmt=fmt)
+    assert sorted(summary(t) for t in transcripts) == expected(fmt, *region)
+
+
+def test_whole_file(indexed):
+    # every transcript, with all of its exons and CDS
+    fmt, path = indexed
+    transcripts = transcripts_from_tabix(path, "chr1", 1, 10 ** 8) + transcripts_from_tabix(path, "chr2", 1, 10 ** 8)
+    assert [len(t.exons) for t in sorted(transcripts, key=lambda t: t.transcript_id)] == [3, 2, 2, 2]
+    assert sorted(summary(t) for t in transcripts) == expected(fmt, "chr1", 1, 10 ** 8) + expected(fmt, "chr2", 1, 10 ** 8)
+
+
+def test_csi(tmp_path):
+    path = index(tmp_path, "annotation.sorted.gff3", "gff", csi=True)
+    with open_tabix(path) as tabix:
+        for region in regions:
+            assert sorted(summary(t) for t in read_region(tabix, *region, fmt="gff3")) == expected("gff3", *region)
+
+
+def test_many_blocks(tmp_path):
+    # enough features to span many BGZF blocks, and bins at every level of the binning scheme
+    rng = random.Random(1)
+    lines = []
+    for contig in ("chr1", "chr2"):
+        starts = sorted(rng.randrange(1, 200000000) for _ in range(20000))
+        for i, start in enumerate(starts):
+            end = start + rng.choice((10, 1000, 100000, 3000000))
+            lines.append('{}\ttest\texon\t{}\t{}\t.\t+\t.\tgene_id "G{}"; transcript_id "T{}";'.format(
+                contig, start, end, i, i))
+    path = str(tmp_path / "many.gtf")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    indexed = pysam.tabix_index(path, preset="gff", keep_original=True, force=True)
+
+    with TabixFile(indexed) as tabix:
+        for _ in range(50):
+            contig = rng.choice(("chr1", "chr2"))
+            start = rng.randrange(1, 200000000)
+            end = start + rng.choice((1, 1000, 100000, 10000000))
+            assert list(tabix.fetch(contig, start, end)) == overlapping_lines(path, contig, start, end)